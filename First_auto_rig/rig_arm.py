@@ -1,9 +1,20 @@
 import importlib
-import maya.cmds as cmds
-import json
-import os
+import system.lazy as lazy
 import system.utils as utils
+import system.build_plan as build_plan
+import system.templates as templates
+import system.naming as naming
+import system.mirror as mirror
+import system.snapshot as snapshot
+import system.build_session as build_session
+import system.matrix_blend as matrix_blend
+import system.constraints as constraints
+import system.orient as orient
 importlib.reload(utils)
+importlib.reload(build_plan)
+
+#maya.cmds is only imported on first use so plan_arm can record a build outside of Maya
+cmds = lazy.lazy_import("maya.cmds")
 
 #Create variables above the Class level that can be read on Class import
 #This is also known as Attributes of a Class
@@ -12,74 +23,122 @@ class_name = 'Rig_Arm'
 num_joints = 3
 
 
+def resolve_positions(module_info, positions=None):
+	'''
+	The positions an arm is built at
+	Args:
+		module_info(Dict): The arm template
+		positions(List): Positions passed in (e.g. from a guide file), they win over the selection
+
+	Returns:
+		positions(List): The passed positions, else the selected joints, else the template positions
+	'''
+	if positions is not None:
+		return [list(i) for i in positions]
+	#Check if we have a selection of joints to get new positions from, read in one pass with a snapshot
+	selection = snapshot.snapshot_selection(node_type='joint')
+	if len(selection) == num_joints:
+		return selection.translations.tolist()
+	#Templates are read only, copy the positions so the build can edit them
+	return [list(i) for i in module_info['positions']]
+
+
 class Rig_Arm:
 	"""docstring for ClassName"""
 	
-	def __init__(self):
-		#Get the joint list from the arm json file
-		data_path = os.environ["RDOJO_DATA"] + "data/rig/arm.json"
-		#Use the read json function
-		data = utils.readJson(data_path)
-		#Load the json into a dictionary
-		self.module_info = json.loads(data)
+	def __init__(self, instance="Left_", positions=None, template="rig/arm"):
+		#Get the arm template from the registry, it's parsed once and only re-read when arm.json changes
+		self.module_info = templates.get_template(template)
 		'''NOTE: If we want to build the arm from some set of joints
 		in the scene, we could overwrite self.module_info['positions']'''
 		
 		#Make new Dictionary to store information about the arm rig
 		self.rig_info = {}
 
-		#Check if we have a selection of joints to get new positions from
-		if len(cmds.ls(sl = True, type = 'joint',)) == num_joints:
-			sel = cmds.ls(sl = True, type = 'joint')
-			positions = []
-			for i in sel:
-				positions.append(cmds.xform(i, q = True, ws = True, t = True))
-			self.rig_info['positions'] = positions
-		else:
-			self.rig_info['positions'] = self.module_info['positions']
+		self.rig_info['positions'] = resolve_positions(self.module_info, positions)
 		
 		'''Instead of using Else, we could just return a message saying the selection
 		doesn't meet the requirements for an arm'''
 
-		#Set a temporary variable to override the name of the side to determine Left or Right
-		self.instance = "Left_"
+		#The side prefix of every name, Left_ by default, see mirror() to build the other side
+		self.instance = instance
+		#Compile every name of the template for this instance once
+		self.names = naming.NameEngine(self.module_info, self.instance)
 
 		#Run rig_arm function
 		#self.rig_arm()
 
 
-	def rig_arm(self):
+	def build_names(self):
+		'''
+		Returns:
+			Every node name the arm build creates, used to check for clashes before anything is built
+		'''
+		names = []
+		for key in ['ik_joints', 'fk_joints', 'rig_joints']:
+			names.extend(self.names.resolve(key))
+		controls = self.names.resolve('fk_controls') + [self.names.name('ik_controls', 0), self.names.name('ik_controls', 2),
+														 self.names.format('{side}arm_settings_CTRL')]
+		names.extend(controls)
+		names.extend(["{}_GRP".format(i) for i in controls])
+		names.append(self.names.name('ik_controls', 1))
+		return names
+
+
+	def mirror(self, instance="Right_", plane="YZ"):
+		'''
+		Make the opposite arm from this arm's computed build data, nothing is queried from the scene
+		Args:
+			instance(String): The side prefix of the mirrored arm
+			plane(String): The mirror plane, "YZ", "XZ" or "XY"
+
+		Returns:
+			Rig_Arm: The mirrored arm, build it with rig_arm(use_plan=True)
+		'''
+		if getattr(self, 'plan', None) is None:
+			self.plan = self.plan_arm()
+
+		mirrored = Rig_Arm.__new__(Rig_Arm)
+		mirrored.module_info = self.module_info
+		mirrored.instance = instance
+		mirrored.names = naming.NameEngine(self.module_info, instance)
+		mirrored.plan = mirror.mirror_plan(self.plan, self.instance, instance, plane)
+		#Every name in the build data moves to the new side and the guide positions are reflected
+		mirrored.rig_info = mirror.rename_side(self.rig_info, self.instance, instance)
+		mirrored.rig_info['positions'] = mirror.mirror_positions(self.rig_info['positions'], plane).tolist()
+		return mirrored
+
+
+	#The whole arm is one undo step and nothing refreshes or re-evaluates until it's built
+	@build_session.build_session("rig_arm")
+	def rig_arm(self, use_plan=False):
+		#Make sure none of the names are taken so Maya doesn't rename anything behind our back
+		build_names = self.build_names()
+		self.names.check_collisions(build_names)
+
+		#Record the build as a plan and apply it in one modifier pass instead of issuing every command
+		if use_plan:
+			#A mirrored arm already carries its plan, everything else records it now
+			if getattr(self, 'plan', None) is None:
+				self.plan = self.plan_arm()
+			self.plan.apply()
+			naming.get_scene_index().reserve(build_names)
+			return
+
 		cmds.select(cl=True)
 		#################
 		##Create joints##
 		#################
 
-		#Create IK joints
-		self.rig_info['ik_joints'] = utils.createJoint(self.module_info['ik_joints'], self.rig_info['positions'], self.instance)
-		# Orient the joint with X down and Z facing positive in world Z
-		utils.re_orient_joints(joints=[self.rig_info['ik_joints'][0]],
+		#Create IK, FK and rig joints
+		for chain in ['ik_joints', 'fk_joints', 'rig_joints']:
+			self.rig_info[chain] = utils.createJoint(self.module_info[chain], self.rig_info['positions'], self.instance)
+			cmds.select(cl=True)
+		# Orient the joints with X down and Z facing positive in world Z, all three chains are solved in one pass
+		utils.re_orient_joints(joints=[self.rig_info[i][0] for i in ['ik_joints', 'fk_joints', 'rig_joints']],
 							   primary_orient=self.module_info["joint_orientation"],
 							   secondary_orient=self.module_info["secondary_axis_orient"],
-							   clean_zero=[self.rig_info['ik_joints'][-1]])
-		cmds.select(cl=True)
-
-		#Create FK joints
-		self.rig_info['fk_joints'] =utils.createJoint(self.module_info['fk_joints'], self.rig_info['positions'], self.instance)
-		# Orient the joint with X down and Z facing positive in world Z
-		utils.re_orient_joints(joints=[self.rig_info['fk_joints'][0]],
-							   primary_orient=self.module_info["joint_orientation"],
-							   secondary_orient=self.module_info["secondary_axis_orient"],
-							   clean_zero=[self.rig_info['fk_joints'][-1]])
-		cmds.select(cl=True)
-
-		#Create rig joints
-		self.rig_info['rig_joints'] =utils.createJoint(self.module_info['rig_joints'], self.rig_info['positions'], self.instance)
-		# Orient the joint with X down and Z facing positive in world Z
-		utils.re_orient_joints(joints=[self.rig_info['rig_joints'][0]],
-							   primary_orient=self.module_info["joint_orientation"],
-							   secondary_orient=self.module_info["secondary_axis_orient"],
-							   clean_zero=[self.rig_info['rig_joints'][-1]])
-		cmds.select(cl=True)
+							   clean_zero=[self.rig_info[i][-1] for i in ['ik_joints', 'fk_joints', 'rig_joints']])
 
 
 		#################
@@ -88,11 +147,11 @@ class Rig_Arm:
 
 
 		#1st Step: Create IK Handle
-		ikHandle_name = self.module_info['ik_controls'][1].replace('s_',self.instance)
+		ikHandle_name = self.names.name('ik_controls', 1)
 		self.rig_info['ik_handle'] = cmds.ikHandle(n=ikHandle_name, sj=self.rig_info['ik_joints'][0], ee=self.rig_info['ik_joints'][2], sol='ikRPsolver',p = 2, w = 1)
 
 		#2nd Step: Create IK control
-		self.rig_info['ik_controls'] = utils.createControl([[self.rig_info['positions'][2], self.module_info['ik_controls'][0].replace("s_", self.instance)]])[0]
+		self.rig_info['ik_controls'] = utils.createControl([[self.rig_info['positions'][2], self.names.name('ik_controls', 0)]])[0]
 		# Match the controls position to the joint it's controlling
 		cmds.matchTransform(self.rig_info['ik_controls'][0], self.rig_info['ik_joints'][-1])
 
@@ -109,7 +168,7 @@ class Rig_Arm:
 		pole_vector_position = utils.calculatePoleVectorPosition([self.rig_info['ik_joints'][0],self.rig_info['ik_joints'][1],self.rig_info['ik_joints'][2]])
 		
 		#create pole vector control
-		self.rig_info['pole_vector_control'] = utils.createControl([[pole_vector_position, self.module_info['ik_controls'][2].replace("s_", self.instance)]], flip=False)[0]
+		self.rig_info['pole_vector_control'] = utils.createControl([[pole_vector_position, self.names.name('ik_controls', 2)]], flip=False)[0]
 
 		#Create Pole Vector Constraint
 		cmds.poleVectorConstraint(self.rig_info['pole_vector_control'][1], self.rig_info['ik_handle'][0])
@@ -118,7 +177,7 @@ class Rig_Arm:
 		cmds.orientConstraint(self.rig_info['ik_controls'][1], self.rig_info['ik_joints'][2], mo = True)
 
 		#Make control arm settings to handle IK/FK switching
-		self.rig_info['set_control'] = utils.createControl([[self.rig_info['positions'][2], '{}arm_settings_CTRL'.format(self.instance)]], flip=False)[0]
+		self.rig_info['set_control'] = utils.createControl([[self.rig_info['positions'][2], self.names.format('{side}arm_settings_CTRL')]], flip=False)[0]
 		cmds.addAttr(self.rig_info['set_control'][1], longName = 'IK_FK', attributeType = 'double', keyable = True,
 					 															min = 0,
 					 															max = 1,
@@ -130,38 +189,51 @@ class Rig_Arm:
 		#################
 
 		#Create FK controls
-		self.rig_info['fk_controls'] = utils.createControl([[self.rig_info['fk_joints'][0], self.module_info['fk_controls'][0].replace('s_',self.instance)],
-															[self.rig_info['fk_joints'][1], self.module_info['fk_controls'][1].replace('s_',self.instance)],
-															[self.rig_info['fk_joints'][2], self.module_info['fk_controls'][2].replace('s_',self.instance)]])
+		self.rig_info['fk_controls'] = utils.createControl([[self.rig_info['fk_joints'][0], self.names.name('fk_controls', 0)],
+															[self.rig_info['fk_joints'][1], self.names.name('fk_controls', 1)],
+															[self.rig_info['fk_joints'][2], self.names.name('fk_controls', 2)]])
 		cmds.select(cl=True)
 
 		#Parent FK controls
 		cmds.parent(self.rig_info['fk_controls'][1][0],self.rig_info['fk_controls'][0][1][0])
 		cmds.parent(self.rig_info['fk_controls'][2][0],self.rig_info['fk_controls'][1][1][0])
 
-		# Constrain FK controls to the FK joint chain
-		for index, ctrl in enumerate(self.rig_info["fk_controls"]):
-			cmds.parentConstraint(ctrl[1][0], self.rig_info["fk_joints"][index])
-
-
-		# Constrain IK and FK rigs to rig joints (IK chain first)
-		ik_fk_constraints = []
-		for i, jnt in enumerate(self.rig_info['ik_joints']):
-			constraint = cmds.parentConstraint(jnt, self.rig_info['fk_joints'][i], self.rig_info["rig_joints"][i],
-								  													maintainOffset = 1,
-								  													weight = 1)
-			ik_fk_constraints.append(constraint)
-		# Save the constraints to a list
-		self.rig_info["ik_fk_constraints"] = ik_fk_constraints
-
 		# Save out the attributes to be used for the ik/fk switching
 		ik_fk_switch_attr = "{}.IK_FK".format(self.rig_info['set_control'][1][0])
 
-		fk_attrs = ["{}.{}".format(i[0], cmds.listAttr(i)[-1]) for i in ik_fk_constraints]
-		fk_visibility_attrs = ["{}.visibility".format(i[1][0]) for i in self.rig_info["fk_controls"]]
-		fk_attrs.extend(fk_visibility_attrs)
+		if matrix_blend.use_matrix():
+			# Drive the FK joints and rig joints through their offsetParentMatrix, the switch drives the blends directly
+			for index, ctrl in enumerate(self.rig_info["fk_controls"]):
+				matrix_blend.matrix_constraint(ctrl[1][0], self.rig_info["fk_joints"][index], maintain_offset=False)
+
+			ik_fk_constraints = []
+			for i, jnt in enumerate(self.rig_info['ik_joints']):
+				ik_fk_constraints.append(matrix_blend.matrix_blend(jnt, self.rig_info['fk_joints'][i],
+																		   self.rig_info["rig_joints"][i], weight_attr=ik_fk_switch_attr))
+			self.rig_info["ik_fk_constraints"] = ik_fk_constraints
+			fk_attrs = []
+			ik_attrs = []
+		else:
+			# Constrain FK controls to the FK joint chain
+			for index, ctrl in enumerate(self.rig_info["fk_controls"]):
+				cmds.parentConstraint(ctrl[1][0], self.rig_info["fk_joints"][index])
+
+			# Constrain IK and FK rigs to rig joints (IK chain first)
+			ik_fk_constraints = []
+			fk_attrs = []
+			ik_attrs = []
+			for i, jnt in enumerate(self.rig_info['ik_joints']):
+				constraint, weights = constraints.constrain("parentConstraint", [jnt, self.rig_info['fk_joints'][i]],
+															self.rig_info["rig_joints"][i], maintainOffset = 1, weight = 1)
+				ik_fk_constraints.append(constraint)
+				# Weight plugs come back in target order, IK first
+				ik_attrs.append(weights[0])
+				fk_attrs.append(weights[1])
+			# Save the constraints to a list
+			self.rig_info["ik_fk_constraints"] = ik_fk_constraints
+
+		fk_attrs.extend(["{}.visibility".format(i[1][0]) for i in self.rig_info["fk_controls"]])
 
-		ik_attrs = ["{}.{}".format(i[0], cmds.listAttr(i)[-2]) for i in ik_fk_constraints]
 		ik_visibility_attrs = ["{}.visibility".format(self.rig_info["ik_controls"][1][0])]
 		ik_visibility_attrs.append("{}.visibility".format(self.rig_info["pole_vector_control"][1][0]))
 		ik_attrs.extend(ik_visibility_attrs)
@@ -169,6 +241,110 @@ class Rig_Arm:
 		# Connect the relevant attributes for IK/FK switching
 		utils.connectBlendColors(ik_fk_switch_attr, fk_attrs, ik_attrs, instance=self.instance)
 
+		naming.get_scene_index().reserve(build_names)
+
+
+	def plan_arm(self):
+		'''
+		Record the same build as rig_arm as a flat list of operations without touching the scene
+		Returns:
+			plan(BuildPlan): The recorded build, apply it with plan.apply()
+		'''
+		plan = build_plan.BuildPlan("{}arm".format(self.instance))
+		positions = self.rig_info['positions']
+
+		#################
+		##Create joints##
+		#################
+
+		orients, translates = orient.chain_values(positions, self.module_info["joint_orientation"],
+												  self.module_info["secondary_axis_orient"])
+		for chain in ['ik_joints', 'fk_joints', 'rig_joints']:
+			names = self.names.resolve(chain)
+			self.rig_info[chain] = plan.create_joint_chain(names, positions)
+			# Orient the joint with X down and Z facing positive in world Z, solved here instead of a joint edit command
+			for i, name in enumerate(names):
+				plan.set_attr("{}.translate".format(name), translates[i].tolist())
+				plan.set_attr("{}.jointOrient".format(name), orients[i].tolist())
+
+
+		#################
+		##Create IK Rig##
+		#################
+
+		#1st Step: Create IK Handle
+		ikHandle_name = self.names.name('ik_controls', 1)
+		plan.command("ikHandle", n=ikHandle_name, sj=self.rig_info['ik_joints'][0], ee=self.rig_info['ik_joints'][2],
+					 sol='ikRPsolver', p=2, w=1)
+		self.rig_info['ik_handle'] = [ikHandle_name]
+
+		#2nd Step: Create IK control matched to the wrist
+		self.rig_info['ik_controls'] = plan.create_control(self.names.name('ik_controls', 0),
+														   match=self.rig_info['ik_joints'][-1])
+
+		#3rd Step: Parent IK handle to the control
+		plan.parent(ikHandle_name, self.rig_info['ik_controls'][1][0])
+
+		#Pole vector position straight from the guide positions, no scene query needed
+		pole_vector_position = utils.poleVectorFromPositions(positions[0], positions[1], positions[2])
+		self.rig_info['pole_vector_control'] = plan.create_control(self.names.name('ik_controls', 2),
+																   position=pole_vector_position, flip=False)
+		plan.command("poleVectorConstraint", self.rig_info['pole_vector_control'][1][0], ikHandle_name)
+
+		#Orient constrain IK wrist joint to IK control
+		plan.command("orientConstraint", self.rig_info['ik_controls'][1][0], self.rig_info['ik_joints'][2], mo=True)
+
+		#Make control arm settings to handle IK/FK switching
+		self.rig_info['set_control'] = plan.create_control(self.names.format('{side}arm_settings_CTRL'),
+														   position=positions[2], flip=False)
+		ik_fk_switch_attr = plan.add_attr(self.rig_info['set_control'][1][0], 'IK_FK', min=0, max=1, default=0)
+
+
+		#################
+		##Create FK Rig##
+		#################
+
+		self.rig_info['fk_controls'] = [plan.create_control(self.names.name('fk_controls', i),
+															match=jnt) for i, jnt in enumerate(self.rig_info['fk_joints'])]
+
+		#Parent FK controls
+		plan.parent(self.rig_info['fk_controls'][1][0], self.rig_info['fk_controls'][0][1][0])
+		plan.parent(self.rig_info['fk_controls'][2][0], self.rig_info['fk_controls'][1][1][0])
+
+		# Constrain FK controls to the FK joint chain
+		for index, ctrl in enumerate(self.rig_info["fk_controls"]):
+			plan.command("parentConstraint", ctrl[1][0], self.rig_info["fk_joints"][index])
+
+		# Constrain IK and FK rigs to rig joints (IK chain first), naming the constraints so the weights are known up front
+		ik_fk_constraints = []
+		for i, jnt in enumerate(self.rig_info['ik_joints']):
+			constraint = "{}_parentConstraint1".format(self.rig_info["rig_joints"][i])
+			plan.command("parentConstraint", jnt, self.rig_info['fk_joints'][i], self.rig_info["rig_joints"][i],
+						 n=constraint, maintainOffset=True, weight=1)
+			ik_fk_constraints.append(constraint)
+		self.rig_info["ik_fk_constraints"] = ik_fk_constraints
+
+		# Weight attributes are named after the targets: the IK target is W0 and the FK target is W1
+		fk_attrs = ["{}.{}W1".format(e, self.rig_info['fk_joints'][i]) for i, e in enumerate(ik_fk_constraints)]
+		fk_attrs.extend(["{}.visibility".format(i[1][0]) for i in self.rig_info["fk_controls"]])
+
+		ik_attrs = ["{}.{}W0".format(e, self.rig_info['ik_joints'][i]) for i, e in enumerate(ik_fk_constraints)]
+		ik_attrs.append("{}.visibility".format(self.rig_info["ik_controls"][1][0]))
+		ik_attrs.append("{}.visibility".format(self.rig_info["pole_vector_control"][1][0]))
+
+		# Connect the relevant attributes for IK/FK switching, same network as utils.connectBlendColors
+		bcNode = plan.create_node("blendColors", "{}_{}_blendColors".format(self.instance, ik_fk_switch_attr.replace(".", "_")))
+		for i in ["R", "G", "B"]:
+			plan.set_attr("{}.color1{}".format(bcNode, i), 0.0)
+			plan.set_attr("{}.color2{}".format(bcNode, i), 1.0)
+		plan.connect(ik_fk_switch_attr, "{}.blender".format(bcNode))
+		for i in fk_attrs:
+			plan.connect(ik_fk_switch_attr, i)
+		for i in ik_attrs:
+			plan.connect("{}.outputR".format(bcNode), i)
+
+		return plan
+
 
 
 print("IT'S ALIIIIIIVE")
\ No newline at end of file
@@ -149,6 +149,11 @@ cmds.connectAttr('mdNode_LegStretch.outputX', 'mdNode_AnkleStretch.input1X')
 cmds.connectAttr('mdNode_KneeStretch.outputX', 'left_ik_joint_knee.tx')
 cmds.connectAttr('mdNode_AnkleStretch.outputX', 'left_ik_joint_ankle.tx')
 
+#Fold the leg length into the knee and ankle multipliers and pack them into one node
+import system.node_network as node_network
+node_network.optimize_network(['adlNode_LegStretch', 'clampNode_LegStretch', 'mdNode_LegStretch',
+                               'mdNode_KneeStretch', 'mdNode_AnkleStretch'])
+
 '''Step 7: Create the Foot Roll'''
 #Add a "Roll Break" and "Foot Roll" attribute to the leg control
 cmds.addAttr('left_ik_leg_control', shortName = "Roll_Break", longName = "Roll_Break", defaultValue = 0, keyable = True)
@@ -1,8 +1,23 @@
-import pymel.core as pm
+import system.lazy as lazy
+import system.naming as naming
+import system.hierarchy as hierarchy
+import system.build_session as build_session
+
+# PyMEL and NumPy are only imported the first time a component uses them
+pm = lazy.lazy_import("pymel.core")
+pole_vector = lazy.lazy_import("system.pole_vector")
+control_shapes = lazy.lazy_import("system.control_shapes")
+mel_curves = lazy.lazy_import("system.mel_curves")
+node_network = lazy.lazy_import("system.node_network")
+ribbon = lazy.lazy_import("system.ribbon")
+scene_snapshot = lazy.lazy_import("system.snapshot")
+chain_clone = lazy.lazy_import("system.chain_clone")
+matrix_blend = lazy.lazy_import("system.matrix_blend")
+constraints = lazy.lazy_import("system.constraints")
+orient = lazy.lazy_import("system.orient")
 
 rig_chains = ["_BLEND", "_FK", "_IK", "_REVERSE"]
 type = ["_JNT", "_CTRL", "_GRP"]
-spine_chain = pm.selected()
 
 
 def split_name(string, split_string, insert):
@@ -18,114 +33,106 @@ def split_name(string, split_string, insert):
 
     return new_name
 
+def get_world_translation(node, snapshot=None):
+    '''
+    Returns the world translation of a node, read from a scene snapshot when one is given and holds the node
+    Args:
+        node: The node to get the translation of
+        snapshot(SceneSnapshot): Optional snapshot from system.snapshot
+    '''
+    if snapshot is not None and node in snapshot:
+        return pm.datatypes.Vector(*snapshot.translation(node))
+    return node.getTranslation(space="world")
+
 def new_joint_chain(type_name, existing_chain=None):
 
     if existing_chain:
         pm.duplicate(existing_chain)
 
-def list_joint_chain(base_joint):
+def list_joint_chain(base_joint, strict=False):
     '''
-    Returns a list of all joints in a chain from parent to child
+    Returns a list of all joints in a chain from parent to child, read from the cached hierarchy index
     Args:
         base_joint: The top joint in a chain
+        strict: Raise an error if the chain branches instead of returning every descendant
     '''
-    full_chain = base_joint.listRelatives(allDescendents=True, type="joint")
-    full_chain.append(base_joint)
-    full_chain.reverse()
-
-    return full_chain
-
-def fk_ik_ribbon(joint_chain):
-    '''
-    Needs:
-        A duplicate of the spine chain for the FK
-        A top and bottom control joint
-        A lofted surface equal to the spine chain
-        (Manual) A rebuilt surface with double the resolution of the spine chain/surface
-        (Manual) Hair follicles on the rebuilt surface
-            U count the same number of edges as the surface
-            Edge bounded
-            Static
-    Returns:
-
-    '''
-
-    if joint_chain:
-        # Duplicate the existing bind chain and save the full chain for the FK
-        fk_joint_chain = pm.duplicate(joint_chain)
-        fk_joint_chain = list_joint_chain(fk_joint_chain[0])
-        # Rename joints in chain
-        for i in fk_joint_chain:
-            split_name(i, "_JNT", "_FK")
-
-        # Create a chest control joint
-        chest_ctrl_joint = pm.duplicate(fk_joint_chain)
-        split_name(chest_ctrl_joint, "_JNT", "_CTRL")
-        # Unparent the hip control joint from the chest control joint
-        hip_ctrl_joint = list_joint_chain(chest_ctrl_joint[0])[-1]
-        pm.parent(hip_ctrl_joint, world=True)
-        # Delete remaining joints
-        pm.delete(list_joint_chain(chest_ctrl_joint[0])[1])
+    return [pm.PyNode(i) for i in hierarchy.get_index().chain(base_joint, strict=strict)]
 
-def loft_surface(joint_chain):
+@build_session.build_session("fk_ik_ribbon")
+def fk_ik_ribbon(joint_chain, joint_count=None, width=12, side=None, stretch=True, optimize=True):
     '''
-    Create a lofted surface from a joint chain
+    Create a ribbon spine along a joint chain, its control joints follow an FK chain duplicated from it
     Args:
-        joint_chain: The base joint of the chain for the curve to base its positions from
+        joint_chain: The joints of the spine, base first
+        joint_count: Ribbon joints, the length of the chain by default, e.g. 50 for a tail
+        width: Width of the ribbon surface
+        side: The direction across the ribbon, the normal of the plane the chain bends in by default
+        stretch: Scale the ribbon joints with the length of the ribbon
+        optimize: Fold and pack the squash and stretch nodes
 
     Returns:
-
+        Ribbon node names (dict), FK control groups (list), FK chain (list)
     '''
-    # Get the current joint chain and save its positions to a list
-    if joint_chain:
-        positions = [i.getTranslation(space="world") for i in joint_chain]
-        print(positions)
-
-    # Create the curve with CVs at the positions of the control joints
-    curve_name = joint_chain[0].name()
-    curve_name.replace("JNT", "CRV")
-    curve = pm.curve(point=positions, n=curve_name)
+    if not joint_chain:
+        raise RuntimeError("Please provide the joints of the spine")
 
-    # Duplicate, move the curves to set up the loft
-    curve_dupe_01 = curve.duplicate()
-    curve_dupe_01[0].setTranslation([6, 0, 0])
-    curve_dupe_02 = curve.duplicate()
-    curve_dupe_02[0].setTranslation([-6, 0, 0])
+    # Solve the whole ribbon from one snapshot of the chain
+    positions = scene_snapshot.SceneSnapshot(joint_chain).positions(joint_chain)
+    layout = ribbon.ribbon_layout(positions, joint_count or len(joint_chain), width=width, side=side)
+    ribbon_nodes = ribbon.build_ribbon(joint_chain[0].name().replace("_JNT", ""), layout)
 
-    # Loft the curves to create the high-res surface
-    surface, loft_constructor = pm.loft(curve_dupe_02[0], curve_dupe_01[0], uniform=True, autoReverse=True,
-                                        sectionSpans=1, polygon = 0, range=0, )
+    # Duplicate the chain for the FK and drive the hip, mid and chest control joints with it
+    fk_grps, fk_chain = create_fk_rig(joint_chain[:1])
+    drivers = [fk_chain[0], fk_chain[len(fk_chain) // 2], fk_chain[-1]]
+    for driver, control in zip(drivers, ribbon_nodes["controls"]):
+        pm.parentConstraint(driver, control, maintainOffset=True)
 
-    # Switch parameter range to 0 to 1
-    pm.rebuildSurface(surface, constructionHistory=True, replaceOriginal=True, rebuildType=0, endKnots=1, keepRange=0,
-                      keepCorners=0, spansU=0, degreeU=3, spansV=0, degreeV=3, tolerance=0, fitRebuild=0, direction=2)
+    if stretch:
+        scale_ribbon_squash_and_stretch(pm.PyNode(ribbon_nodes["curve"]),
+                                        [pm.PyNode(i) for i in ribbon_nodes["joints"]], optimize=optimize)
 
-    # Create a cluster at the top of the surface
-    # Create a cluster at the bottom of the surface
+    return ribbon_nodes, fk_grps, fk_chain
 
-    # Create follicles along the surface
-    # Create joints and parent them under the follicles
+def loft_surface(joint_chain, snapshot=None, width=12, side=None):
+    '''
+    Create a ribbon surface from a joint chain, see system/ribbon.py for the full ribbon
+    Args:
+        joint_chain: The joints of the chain for the surface to base its positions from
+        snapshot: Optional scene snapshot to read the joint positions from
+        width: Width of the surface
+        side: The direction across the surface, the normal of the plane the chain bends in by default
 
-    # Manually add transform groups in the appropriate spots to test the cluster movement
+    Returns:
+        The surface transform
+    '''
+    positions = [list(get_world_translation(i, snapshot)) for i in joint_chain]
+    layout = ribbon.ribbon_layout(positions, len(joint_chain), width=width, side=side)
+    surface_name = joint_chain[0].name().replace("_JNT", "_SRF")
+    naming.check_collisions([surface_name])
+    surface = ribbon.create_surface(surface_name, layout)
+    naming.get_scene_index().reserve([surface_name])
 
+    return pm.PyNode(surface)
 
 
-def scale_ribbon_squash_and_stretch(curve, joints):
+def scale_ribbon_squash_and_stretch(curve, joints, optimize=False):
     '''
     Needs:
         Curve
         1 curveinfo and 3 multiply divide nodes
+    Args:
+        optimize(Bool): Fold and pack the utility nodes once they're connected
     Returns:
-
+        The optimizer report when optimize is on
     '''
     curve_shape = curve.getShape()
     curve_info = pm.createNode("curveInfo")
-    curve_shape.worldMatrix >> curve_info.input1X
+    curve_shape.worldSpace[0] >> curve_info.inputCurve
 
     # Create the multiply divide nodes and make the connections from the curve and to the bind joints
     curve_diff = pm.createNode("multiplyDivide")
     curve_diff.operation.set(2)
-    curve_diff.input2X.set(curve_info.arcLength)
+    curve_diff.input2X.set(curve_info.arcLength.get())
     curve_info.arcLength >> curve_diff.input1X
     # Aim axis is assumed to be X
     for i in joints:
@@ -139,54 +146,31 @@ def scale_ribbon_squash_and_stretch(curve, joints):
     curve_sqrt_invert = pm.createNode("multiplyDivide")
     curve_sqrt_invert.operation.set(2)
     curve_sqrt_invert.input1X.set(1)
-    curve_sqrt_power.output1X >> curve_sqrt_invert.input2X
+    curve_sqrt_power.outputX >> curve_sqrt_invert.input2X
     # Horizontal scale axes assumed to be Y and Z
     for i in joints:
         curve_sqrt_invert.outputX >> i.scaleY
         curve_sqrt_invert.outputX >> i.scaleZ
 
+    if optimize:
+        return node_network.optimize_network([curve_info, curve_diff, curve_sqrt_power, curve_sqrt_invert])
+
 
-def create_fk_rig(base_joint, fk_ctrl_size=30):
+@build_session.build_session("create_fk_rig")
+def create_fk_rig(base_joint, fk_ctrl_size=30, fk_chain=None):
     '''
 
     Args:
         base_joint:
+        fk_chain: An FK chain already cloned from base_joint (see clone_rig_chains), cloned here by default
 
     Returns:
         fk control group (list), fk joint names (list)
 
     '''
-    # Check if base joint includes one joint or a three joint chain
-    # Save IK chain names
-    fk_chain_names = []
-    if len(base_joint) == 1:
-        for i in list_joint_chain(base_joint[0]):
-            if "_JNT" in i.name():
-                fk_chain_names.append(split_name(i, "_JNT", rig_chains[1]))
-            else:
-                fk_chain_names.append("{}{}{}".format(i, rig_chains[1], type[0]))
-        # Create FK chain
-        fk_chain = list_joint_chain(pm.duplicate(base_joint[0], renameChildren=True)[0])
-        pm.parent(fk_chain[0], world=True)
-
-    elif len(base_joint) == 3:
-        for i in base_joint:
-            if "_JNT" in i.name():
-                fk_chain_names.append(split_name(i, "_JNT", rig_chains[1]))
-            else:
-                fk_chain_names.append("{}{}{}".format(i, rig_chains[1], type[0]))
-        # Create FK chain
-        fk_chain = duplicate_joint_chain(base_joint)
-        pm.parent(fk_chain[0], world=True)
-
-    else:
-        raise RuntimeError("Please provide either one joint or a three joint chain")
-
-
-    # Rename the FK chain
-    print(fk_chain_names)
-    for i, e in enumerate(fk_chain):
-        e.rename(fk_chain_names[i])
+    # Create the FK chain
+    if fk_chain is None:
+        fk_chain = clone_rig_chains(base_joint, [rig_chains[1]])[0]
 
     # Create controls for the FK chain and parent their zero transforms to each other
     fk_grps = []
@@ -213,53 +197,37 @@ def create_fk_rig(base_joint, fk_ctrl_size=30):
 
         # Constrain the FK chain to the controls
         for i, e in enumerate(fk_grps):
-            pm.parentConstraint(e.getChildren(), fk_chain[i])
+            if matrix_blend.use_matrix():
+                matrix_blend.matrix_constraint(e.getChildren()[0], fk_chain[i], maintain_offset=False)
+            else:
+                pm.parentConstraint(e.getChildren(), fk_chain[i])
 
     return fk_grps, fk_chain
 
-def create_ik_rig(base_joint):
-    # Save IK chain names
-    ik_chain_names = []
-    if len(base_joint) == 1:
-        for i in list_joint_chain(base_joint[0]):
-            if "_JNT" in i.name():
-                ik_chain_names.append(split_name(i, "_JNT", rig_chains[2]))
-            else:
-                ik_chain_names.append("{}{}{}".format(i, rig_chains[2], type[0]))
-        # Create IK chain
-        ik_chain = list_joint_chain(pm.duplicate(base_joint[0], renameChildren=True)[0])
-        pm.parent(ik_chain[0], world=True)
-
-    elif len(base_joint) == 3:
-        for i in base_joint:
-            if "_JNT" in i.name():
-                ik_chain_names.append(split_name(i, "_JNT", rig_chains[2]))
-            else:
-                ik_chain_names.append("{}{}{}".format(i, rig_chains[2], type[0]))
-        # Create FK chain
-        ik_chain = duplicate_joint_chain(base_joint)
-        pm.parent(ik_chain[0], world=True)
+@build_session.build_session("create_ik_rig")
+def create_ik_rig(base_joint, pv_distance=10, ik_chain=None):
+    '''
 
-    else:
-        raise RuntimeError("Please provide either one joint or a three joint chain")
+    Args:
+        base_joint:
+        pv_distance: How far the pole vector sits from the elbow/knee
+        ik_chain: An IK chain already cloned from base_joint (see clone_rig_chains), cloned here by default
 
-    # Rename the IK chain
-    for i, e in enumerate(ik_chain):
-        e.rename(ik_chain_names[i])
+    Returns:
+        IK chain (list), IK control, pole vector zero group
+    '''
+    # Create the IK chain
+    if ik_chain is None:
+        ik_chain = clone_rig_chains(base_joint, [rig_chains[2]])[0]
 
     # Create IK control and parent it to the zero transform
     new_trans = ik_chain[-1].getTranslation(space="world")
     new_rot = ik_chain[-1].getRotation(space="world")
 
-    ik_ctrl = pm.curve(d=1, p=[(0.5, 0.5, 0.5), (0.5, -0.5, 0.5), (-0.5, -0.5, 0.5), (-0.5, 0.5, 0.5), (0.5, 0.5, 0.5),
-                               (0.5, 0.5, -0.5), (0.5, -0.5, -0.5), (0.5, -0.5, 0.5), (-0.5, -0.5, 0.5),
-                               (-0.5, -0.5, -0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (-0.5, 0.5, -0.5),
-                               (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (-0.5, 0.5, 0.5)],
-                       k=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15])
-    ik_ctrl.rename(ik_chain[-1].name().replace("_JNT", type[1]))
-
-    ik_ctrl.scale.set([30, 30, 30])
-    pm.makeIdentity(ik_ctrl, t=0, r=0, s=1, apply=True)
+    # Create the IK and pole vector controls in one pass
+    ik_ctrl_name = ik_chain[-1].name().replace("_JNT", type[1])
+    ik_ctrl, pv_ctrl = [pm.PyNode(i) for i in control_shapes.create_shapes([
+        ("cube", ik_ctrl_name, 30), ("sphere", ik_ctrl_name.replace("_CTRL", "_PV"), 7)])]
 
     ik_ctrl.setTranslation(new_trans, space="world")
     #ik_ctrl.setRotation(new_rot, space="world")
@@ -272,37 +240,11 @@ def create_ik_rig(base_joint):
     ik_handle = pm.ikHandle(sj=ik_chain[0], ee=ik_chain[-1], sol='ikRPsolver', p=2, w=1,
                             name="{}{}".format(ik_chain[-1].name(), "_ikHandle"))[0]
 
-    # Create pole vector
-    pv_ctrl = pm.curve(d=1, p=[(0, 3.21, 0), (0, 2.96, 1.23), (0, 2.27, 2.27), (0, 1.23, 2.96), (0, 0, 3.21),
-                               (0, -1.23, 2.96), (0, -2.27, 2.27), (0, -2.97, 1.23), (0, -3.21, 0), (0, -2.96, -1.23),
-                               (0, -2.27, -2.27), (0, -1.23, -2.96), (0, 0, -3.21), (0, 1.23, -2.96), (0, 2.27, -2.27),
-                               (0, 2.96, -1.23), (0, 3.21, 0), (-0.87, 2.96, 0.97), (-1.60, 2.27, 1.60),
-                               (-2.09, 1.23, 2.09), (-2.27, 0, 2.27), (-2.09, -1.23, 2.09), (-1.60, -2.27, 1.60),
-                               (-0.87, -2.96, 0.87), (0, -3.21, 0), (0.87, -2.97, -0.87), (1.60, -2.27, -1.60),
-                               (2.09, -1.23, -2.09), (2.27, 0, -2.27), (2.09, 1.23, -2.09), (1.60, 2.27, -1.60),
-                               (0.87, 2.86, -0.87), (0, 3.21, 0), (-1.23, 2.97, 0), (-2.27, 2.27, 0), (-2.97, 1.23, 0),
-                               (-3.21, 0, 0), (-2.97, -1.23, 0), (-2.27, -2.27, 0), (-1.23, -2.96, 0), (0, -3.21, 0),
-                               (1.23, -2.97, 0), (2.27, -2.27, 0), (2.97, -1.23, 0), (3.21, 0, 0), (2.97, 1.23, 0),
-                               (2.27, 2.27, 0), (1.23, 29.7, 0), (0, 3.21, 0), (-0.87, 2.97, -0.87),
-                               (-1.60, 2.27, -1.60), (-2.09, 1.23, -2.09), (-2.27, 0, -2.27), (-2.09, -1.23, -2.09),
-                               (-1.60, -2.27, -1.60), (-0.87, -2.96, -0.87), (0, -3.21, 0), (0.87, -2.97, 0.87),
-                               (1.60, -2.27, 1.60), (2.09, -1.23, 2.09), (2.27, 0, 2.27), (2.09, 1.23, 2.09),
-                               (1.60, 2.27, 1.60), (0.87, 2.97, 0.87), (0, 3.21, 0), (1.23, 2.97, 0), (2.27, 2.27, 0),
-                               (2.97, 1.23, 0), (3.21, 0, 0), (2.27, 0, 2.27), (0, 0, 3.21), (-2.27, 0, 2.27),
-                               (-3.21, 0, 0), (-2.27, 0, -2.27), (0, 0, -3.21), (2.27, 0, -2.27), (3.21, 0, 0),
-                               (2.27, 0, 2.27), (0, 0, 3.21)], name=ik_ctrl.name().replace("_CTRL", "_PV"))
-    pm.select(pv_ctrl + ".cv[47]")
-    pm.delete()
-    pm.select(clear=True)
-
-    pv_ctrl.scale.set([7, 7, 7])
-    pm.makeIdentity(pv_ctrl, t=0, r=0, s=1, apply=True)
-
     # Create zero group
     pv_grp = pm.group(empty=True, name="{}{}".format(pv_ctrl.name(), "_ZERO_GRP"))
     pm.parent(pv_ctrl, pv_grp)
     # Move the pole vector
-    pv_position = calculatePoleVectorPosition(ik_chain, pv_distance=10)
+    pv_position = calculatePoleVectorPosition(ik_chain, pv_distance=pv_distance)
     pv_grp.setTranslation(pv_position, space="world")
     # Constrain the pole vector and ik wrist to their controls
     pm.poleVectorConstraint(pv_ctrl, ik_handle)
@@ -323,6 +265,7 @@ def create_ik_rig(base_joint):
     return ik_chain, ik_ctrl, pv_grp
 
 
+@build_session.build_session("fk_ik_hinge")
 def fk_ik_hinge(base_joint):
     '''
 
@@ -333,42 +276,20 @@ def fk_ik_hinge(base_joint):
         FK Chain, IK Chain, IK Handle, Blend Chain
     '''
 
-    # Check if the argument has a single joint or a three joint chain
-    # Save the final blend joint chain names
-    blend_chain_names = []
-    if len(base_joint) == 1:
-        for i in list_joint_chain(base_joint[0]):
-            if "_JNT" in i.name():
-                blend_chain_names.append(split_name(i, "_JNT", rig_chains[0]))
-            else:
-                blend_chain_names.append("{}{}{}".format(i, rig_chains[0], type[0]))
-        # Create blend chain
-        blend_chain = list_joint_chain(pm.duplicate(base_joint[0], renameChildren=True)[0])
-
-    elif len(base_joint) == 3:
-        for i in base_joint:
-            if "_JNT" in i.name():
-                blend_chain_names.append(split_name(i, "_JNT", rig_chains[0]))
-            else:
-                blend_chain_names.append("{}{}{}".format(i, rig_chains[0], type[0]))
-        # Create blend chain
-        blend_chain = duplicate_joint_chain(base_joint)
-        pm.parent(blend_chain[0], world=True)
+    # Create ctrl joint group, the chains are created under it so nothing they drive is reparented afterwards
+    ctrl_jnt_grp_trans = base_joint[0].getTranslation(space="world")
+    ctrl_jnt_grp_rot = base_joint[0].getRotation(space="world")
 
-    else:
-        raise RuntimeError("Please provide either one joint or a three joint chain")
+    ctrl_jnt_grp = pm.group(empty=True, name="{}{}".format(base_joint[0].name(), type[2]))
+    ctrl_jnt_grp.setTranslation(ctrl_jnt_grp_trans, space="world")
+    ctrl_jnt_grp.setRotation(ctrl_jnt_grp_rot, space="world")
 
-    # Rename the blend chain
-    for i, e in enumerate(blend_chain):
-        e.rename(blend_chain_names[i])
+    # Create the blend, FK and IK chains in one pass
+    blend_chain, fk_chain, ik_chain = clone_rig_chains(base_joint, rig_chains[:3], parent=ctrl_jnt_grp)
 
-    blend_ctrl_points = [[1, 0, -1.0], [1, 0, 1], [0, 1.391788, 0], [1, 0, -1.0], [-1.0, 0, -1.0], [0, 1.391788, 0],
-                         [1, 0, 1], [-1.0, 0, 1], [0, 1.391788, 0], [-1.0, 0, -1.0], [-1.0, 0, 1]]
     # Create blend control
-    blend_ctrl = pm.curve(degree=1, point=blend_ctrl_points, name="{}{}{}".format(blend_chain[-1].name(),
-                                                                                  rig_chains[0], type[1]))
-    blend_ctrl.scale.set([15, 15, 15])
-    pm.makeIdentity(blend_ctrl, t=0, r=0, s=1, apply=True)
+    blend_ctrl = pm.PyNode(control_shapes.create_control("pyramid", "{}{}{}".format(blend_chain[-1].name(),
+                                                                                    rig_chains[0], type[1]), 15))
 
     # Create zero group
     blend_grp = pm.group(empty=True, name="{}{}".format(blend_ctrl.name(), "_ZERO_GRP"))
@@ -388,60 +309,46 @@ def fk_ik_hinge(base_joint):
     blend_ctrl.addAttr("FK_IK", attributeType="double", min=0, max=1, defaultValue=1)
     blend_ctrl.FK_IK.set(keyable=True)
 
-    # Create FK chain
-    fk_grps, fk_chain = create_fk_rig(base_joint)
+    # Rig the FK and IK chains
+    fk_grps, fk_chain = create_fk_rig(base_joint, fk_chain=fk_chain)
 
-    # Create IK chain
-    ik_chain, ik_ctrl, pv_grp = create_ik_rig(base_joint)
+    ik_chain, ik_ctrl, pv_grp = create_ik_rig(base_joint, ik_chain=ik_chain)
 
-    # Parent constrain the blend chain to the ik and fk chains
-    blend_constraints = [pm.parentConstraint(fk_chain[i], ik_chain[i], e, maintainOffset=True) for i, e in enumerate(blend_chain)]
     # Create the reverse node
     reverse_node = pm.createNode("reverse", name = "{}_reverse".format(blend_ctrl))
     # Connect blend control FK IK attribute to reverse node
     blend_ctrl.FK_IK >> reverse_node.inputX
-    # Connect blend control FK IK attribute to the IK attribute on the parent constraints
-    # Connect blend control reverse node to the FK attribute on the parent constraints
-    for i, e in enumerate(blend_constraints):
-        blend_ctrl.FK_IK >> e.listAttr()[-1]
-        reverse_node.outputX >> e.listAttr()[-2]
-        reverse_node.outputX >> fk_grps[i].getChildren()[0].visibility
+
+    if matrix_blend.use_matrix():
+        # Blend the blend chain between the fk and ik chains, the FK IK attribute is the blend weight
+        for i, e in enumerate(blend_chain):
+            matrix_blend.matrix_blend(fk_chain[i], ik_chain[i], e, weight_attr=blend_ctrl.FK_IK.name())
+    else:
+        # Parent constrain the blend chain to the ik and fk chains
+        # Connect blend control FK IK attribute to the IK weight on the parent constraints
+        # Connect blend control reverse node to the FK weight on the parent constraints
+        for i, e in enumerate(blend_chain):
+            fk_weight, ik_weight = constraints.constrain("parentConstraint", [fk_chain[i], ik_chain[i]], e,
+                                                         maintainOffset=True)[1]
+            pm.connectAttr(blend_ctrl.FK_IK, ik_weight)
+            pm.connectAttr(reverse_node.outputX, fk_weight)
+
+    for i in fk_grps:
+        reverse_node.outputX >> i.getChildren()[0].visibility
 
     blend_ctrl.FK_IK >> ik_ctrl.visibility
     blend_ctrl.FK_IK >> pv_grp.getChildren()[0].visibility
 
-    # Create ctrl joint group
-    ctrl_jnt_grp_trans = base_joint[0].getTranslation(space="world")
-    ctrl_jnt_grp_rot = base_joint[0].getRotation(space="world")
-
-    ctrl_jnt_grp = pm.group(empty=True, name="{}{}".format(base_joint[0].name(), type[2]))
-    ctrl_jnt_grp.setTranslation(ctrl_jnt_grp_trans, space="world")
-    ctrl_jnt_grp.setRotation(ctrl_jnt_grp_rot, space="world")
-
-    pm.parent(blend_chain[0], ctrl_jnt_grp)
-    pm.parent(fk_chain[0], ctrl_jnt_grp)
-    pm.parent(ik_chain[0], ctrl_jnt_grp)
     pm.hide(ctrl_jnt_grp)
 
     return ik_chain, fk_chain, blend_chain
 
 
-def calculatePoleVectorPosition(joints, pv_distance=5):
+def calculatePoleVectorPosition(joints, pv_distance=5, snapshot=None):
 
     if isinstance(joints, list) and len(joints) == 3:
-        startVector = joints[0].getTranslation(space="world")
-        midVector = joints[1].getTranslation(space="world")
-        endVector = joints[2].getTranslation(space="world")
-
-        startEnd = endVector - startVector
-        startMid = midVector - startVector
-        dotP = startMid.dot(startEnd)
-        proj = float(dotP) / float(startEnd.length())
-        startEndN = startEnd.normal()
-        projV = startEndN * proj
-        arrowV = startMid - projV
-        arrowV *= pv_distance
-        finalV = arrowV + midVector
+        positions = [list(get_world_translation(i, snapshot)) for i in joints]
+        finalV = pm.datatypes.Vector(*pole_vector.calculate_pole_vector_positions(positions, pv_distance=pv_distance))
     else:
         raise RuntimeError("Please select three joints in a chain")
 
@@ -449,30 +356,27 @@ def calculatePoleVectorPosition(joints, pv_distance=5):
 
 
 def parse_curve_points(curve_string):
-    # Split each point in the string
-    p_split = curve_string.split("-p")
-    # Remove the knot values
-    p_split[-1] = p_split[-1].split("-k", 1)[0]
-    # Remove the empty space at the front
-    p_split.remove("")
-    # Split each point into lists
-    space_split = [i.split() for i in p_split]
-
-    for i, e in enumerate(space_split):
-        for each, point in enumerate(e):
-            if len(point) == 1:
-                space_split[i][each] = int(point)
-            else:
-                space_split[i][each] = float(point)
+    '''
+    Get the points of a MEL curve command
+    Args:
+        curve_string: A "curve -d 1 -p 0 0 0 -p ... -k 0 ..." string, the leading "curve" is optional
 
-    return space_split
+    Returns:
+        Points (list) of [x, y, z] floats
+    '''
+    return mel_curves.parse_curve(curve_string).points.tolist()
 
 
-def addStretchyIK(base_joint):
+@build_session.build_session("addStretchyIK")
+def addStretchyIK(base_joint, snapshot=None, optimize=False):
     '''
     Create stretchy IK using the side lengths of the triangle made up of the IK joints
     Args:
         ctrl_joints: List of control joints
+        snapshot: Optional scene snapshot to read the joint positions from
+        optimize(Bool): Fold and pack the utility nodes once they're connected
+    Returns:
+        The optimizer report when optimize is on
     '''
     ctrl_joints = list_joint_chain(base_joint)
 
@@ -485,8 +389,8 @@ def addStretchyIK(base_joint):
     arm_length = upperarm_length+lowerarm_length
 
     # Create locators at the shoulder and wrist
-    start_pos = ctrl_joints[0].getTranslation(space="world")
-    end_pos = ctrl_joints[-1].getTranslation(space="world")
+    start_pos = get_world_translation(ctrl_joints[0], snapshot)
+    end_pos = get_world_translation(ctrl_joints[-1], snapshot)
 
     start_loc_name = split_name(ctrl_joints[0].name(), type[0], "_stretch")
     end_loc_name = split_name(ctrl_joints[-1].name(), type[0], "_stretch")
@@ -570,6 +474,10 @@ def addStretchyIK(base_joint):
     stretchy_blendColors.outputR >> ctrl_joints[1].translateX
     stretchy_blendColors.outputG >> ctrl_joints[2].translateX
 
+    if optimize:
+        return node_network.optimize_network([arm_distance, arm_divider, upperarm_multiplier, lowerarm_multiplier,
+                                              upperarm_condition, lowerarm_condition, stretchy_blendColors])
+
 def save_duplicate_chain_names(base_joint):
     pass
     chain_names = [i.name() for i in list_joint_chain(base_joint[0])]
@@ -580,8 +488,9 @@ def save_duplicate_chain_names(base_joint):
             i = "{}{}{}".format(i.name(), rig_chains[1], type[0])
 
 
+@build_session.build_session("create_reverse_foot")
 def create_reverse_foot(ankle_ik_joint, ankle_ik_ctrl, inner_offset=30, outer_offset=30, toetip_offset=1, heel_offset=1,
-                        height_offset=10):
+                        height_offset=10, snapshot=None):
     '''
     Create a reverse foot setup on a three joint ik foot
     Args:
@@ -591,6 +500,7 @@ def create_reverse_foot(ankle_ik_joint, ankle_ik_ctrl, inner_offset=30, outer_of
         outer_offset:
         toetip_offset:
         heel_offset:
+        snapshot: Optional scene snapshot to read the foot joint positions from
 
     Returns:
         None
@@ -604,9 +514,9 @@ def create_reverse_foot(ankle_ik_joint, ankle_ik_ctrl, inner_offset=30, outer_of
     # Save foot chain and joint positions
     ik_foot_chain = list_joint_chain(ankle_ik_joint[0])
 
-    toe_pos = ik_foot_chain[-1].getTranslation(space="world")
-    ball_pos = ik_foot_chain[1].getTranslation(space="world")
-    ankle_pos = ik_foot_chain[0].getTranslation(space="world")
+    toe_pos = get_world_translation(ik_foot_chain[-1], snapshot)
+    ball_pos = get_world_translation(ik_foot_chain[1], snapshot)
+    ankle_pos = get_world_translation(ik_foot_chain[0], snapshot)
 
     in_bank_pos = [i for i in ball_pos]
     in_bank_pos[1] -= height_offset
@@ -673,15 +583,13 @@ def create_reverse_foot(ankle_ik_joint, ankle_ik_ctrl, inner_offset=30, outer_of
     for i, e in enumerate(reverse_foot_chain):
         e.setTranslation(reverse_foot_chain_pos[i], space="world")
 
-    # Orient the reverse foot joints to the same direction in the Y axis
-    pm.select(clear=True)
-    temp_orient = pm.joint(name="temp")
-    temp_orient.setTranslation((ball_pos - ankle_pos) * (toetip_offset + 0.2) + ankle_pos, space="world")
-    for i in reverse_foot_chain:
-        pm.delete(pm.aimConstraint(temp_orient, i, aimVector=[0,0,1], worldUpType="vector", worldUpVector= [0, 1, 0],
-                                   skip= ["x", "z"]))
-        pm.makeIdentity(i, t=False, r=True, s=False, apply=True)
-    pm.delete(temp_orient)
+    # Orient the reverse foot joints to the same direction in the Y axis, Z aims at a point past the ball turning
+    # around Y only, solved for every joint at once and written to the joint orients
+    aim_target = list((ball_pos - ankle_pos) * (toetip_offset + 0.2) + ankle_pos)
+    aims = [[aim_target[0] - i[0], 0, aim_target[2] - i[2]] for i in reverse_foot_chain_pos]
+    rotations, valid = orient.aim_rotations(aims, [0, 1, 0], "zyx")
+    orients = [list(e) if valid[i] else [0, 0, 0] for i, e in enumerate(orient.euler_xyz(rotations))]
+    orient.apply_orients(reverse_foot_chain, orients)
 
 
     # Rename the reverse joint chain
@@ -756,6 +664,7 @@ def create_reverse_foot(ankle_ik_joint, ankle_ik_ctrl, inner_offset=30, outer_of
 
 
 # TODO: Add space switch on pole vectors
+@build_session.build_session("add_space_switch")
 def add_space_switch(attr_ctrl, attr_name="Inherit_Transforms", parent_world=None, parent_local=None, target_grp=None):
     '''
     Add space switching to a control
@@ -766,7 +675,9 @@ def add_space_switch(attr_ctrl, attr_name="Inherit_Transforms", parent_world=Non
         parent_local: The world or lower level parent space
         target_grp: The control group or object to move between parent spaces
     Returns:
-
+        switch(Dict): The same keys with either backend, "switch" is the switch attribute and "nodes" every node
+            created. The matrix backend adds its matrix_blend keys ("blend", "weight"), the constraint backend adds
+            "constraint", "weights" (world and local weight plugs) and "reverse"
     '''
     # Save the control and save parent objects if selected
     attr_ctrl = attr_ctrl[0]
@@ -777,17 +688,28 @@ def add_space_switch(attr_ctrl, attr_name="Inherit_Transforms", parent_world=Non
     if not target_grp:
         target_grp = pm.selected()[2]
 
-    parent_constraint = pm.parentConstraint(parent_world, parent_local, target_grp, maintainOffset=True)
-
     # Add the switching attribute to the control and create the needed reverse node
     attr_ctrl.addAttr(attr_name, attributeType="double", min=0, max=1, defaultValue=1)
-    attr_ctrl.listAttr()[-1].set(keyable=True)
+    switch_attr = attr_ctrl.attr(attr_name)
+    switch_attr.set(keyable=True)
+
+    if matrix_blend.use_matrix():
+        # The attribute at 1 follows the local parent, at 0 the world parent
+        switch = matrix_blend.matrix_blend(parent_world, parent_local, target_grp, weight_attr=switch_attr.name())
+        switch["switch"] = switch_attr.name()
+        return switch
+
+    constraint, weights = constraints.constrain("parentConstraint", [parent_world, parent_local], target_grp,
+                                                maintainOffset=True)
+    world_weight, local_weight = weights
     reverse_node = pm.createNode("reverse", name="{}_{}_reverse".format(attr_ctrl.name(), attr_name))
 
     # Connect the attributes to the constraint
-    attr_ctrl.listAttr()[-1] >> parent_constraint.listAttr()[-1]
-    attr_ctrl.listAttr()[-1] >> reverse_node.inputX
-    reverse_node.outputX >> parent_constraint.listAttr()[-2]
+    switch_attr >> reverse_node.inputX
+    pm.connectAttr(switch_attr, local_weight)
+    pm.connectAttr(reverse_node.outputX, world_weight)
+    return {"switch": switch_attr.name(), "constraint": constraint, "weights": weights,
+            "reverse": reverse_node.name(), "nodes": [constraint, reverse_node.name()]}
 
 def create_wrist_correctives():
     ## Add wrist corrective joint functionality ##
@@ -837,6 +759,7 @@ def create_wrist_correctives():
     tran_scalefactor_multDL.output >> wrist_corr_zero_grp.translateY
 
 
+@build_session.build_session("add_hand_settings")
 def add_hand_settings(hand_settings_ctrl, finger_ctrls=None):
     '''
     Adds attributes for controlling finger rotation to a designated settings control curve
@@ -899,32 +822,28 @@ def update_obj_names(obj, obj_type, chain_type=None, suffix=type[0]):
     Returns:
         new_names(List): List of updated names
     '''
-    new_names = []
-    for i in obj:
-        if suffix in i.name():
-            new_names.append(split_name(i, suffix, chain_type))
-        else:
-            new_names.append("{}{}{}".format(i, chain_type, obj_type))
-
     # Check if the argument has a single object or a joint chain
-    # Save the final blend joint chain names
-    new_names = []
     if len(obj) == 1:
-        for i in list_joint_chain(obj[0]):
-            if suffix in i.name():
-                new_names.append(split_name(i, suffix, chain_type))
-            else:
-                new_names.append("{}{}{}".format(i, chain_type, obj_type))
+        obj = list_joint_chain(obj[0])
+    elif len(obj) != 3:
+        raise RuntimeError("Please provide either one joint or a three joint chain")
 
-    elif len(obj) == 3:
-        for i in obj:
-            if suffix in i.name():
-                new_names.append(split_name(i, suffix, chain_type))
-            else:
-                new_names.append("{}{}{}".format(i, chain_type, obj_type))
+    return naming.chain_names(obj, chain_type, suffix=suffix, obj_type=obj_type)
 
-    else:
+def clone_rig_chains(base_joint, chain_types, parent=None):
+    '''
+    Copies of a chain for each chain type, created in one pass with their final names (see system/chain_clone.py)
+    Args:
+        base_joint: Either one joint for it and every joint below it, or a three joint chain
+        chain_types: Entries of rig_chains, one per copy
+        parent: The parent of the copies, the world by default
+
+    Returns: A list of joints for each chain type
+    '''
+    if len(base_joint) not in (1, 3):
         raise RuntimeError("Please provide either one joint or a three joint chain")
+    copies = chain_clone.clone_chain_types(base_joint, chain_types, parent)
+    return [[pm.PyNode(i) for i in copy] for copy in copies]
 
 def duplicate_joint_chain(joint_chain):
     '''
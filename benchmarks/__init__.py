@@ -0,0 +1 @@
+#benchmarks init file
\ No newline at end of file
@@ -0,0 +1,51 @@
+'''
+Compare the cmds and OpenMaya backends of utils.createJoint and utils.createControl on 10/100/1000 joint chains
+Run with mayapy from the repository root:
+    mayapy -m benchmarks.bench_backends
+'''
+
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAIN_LENGTHS = [10, 100, 1000]
+
+
+def build_chain(utils, length):
+    names = ["s_bench_{:04d}_JNT".format(i) for i in range(length)]
+    positions = [[float(i), 0.0, 0.0] for i in range(length)]
+
+    start = time.perf_counter()
+    joints = utils.createJoint(names, positions, "Left_")
+    joint_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    utils.createControl([[jnt, jnt.replace("_JNT", "_CTRL")] for jnt in joints])
+    control_time = time.perf_counter() - start
+
+    return joint_time, control_time
+
+
+def main():
+    import maya.standalone
+    maya.standalone.initialize()
+
+    sys.path.insert(0, REPO_ROOT)
+    import maya.cmds as cmds
+    import system.utils as utils
+
+    print("{:<10}{:>8}{:>12}{:>12}".format("backend", "joints", "joints(s)", "controls(s)"))
+    for length in CHAIN_LENGTHS:
+        for backend in ["cmds", "openmaya"]:
+            cmds.file(new=True, force=True)
+            utils.setBackend(backend)
+            joint_time, control_time = build_chain(utils, length)
+            print("{:<10}{:>8}{:>12.4f}{:>12.4f}".format(backend, length, joint_time, control_time))
+    utils.setBackend("cmds")
+
+    maya.standalone.uninitialize()
+
+
+if __name__ == "__main__":
+    main()
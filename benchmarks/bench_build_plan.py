@@ -0,0 +1,78 @@
+'''
+Compare Rig_Arm.rig_arm built command by command against the recorded plan applied in one modifier pass, and check
+both builds put every control in the same place
+Run with mayapy from the repository root:
+    mayapy -m benchmarks.bench_build_plan
+'''
+
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_build(use_plan, repeats=10):
+    import maya.cmds as cmds
+    import First_auto_rig.rig_arm as rig_arm
+
+    timings = []
+    for i in range(repeats):
+        cmds.file(new=True, force=True)
+        arm = rig_arm.Rig_Arm()
+        start = time.perf_counter()
+        arm.rig_arm(use_plan=use_plan)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def control_matrices(use_plan):
+    '''
+    World matrices of every control and control group of an arm build, keyed by name
+    '''
+    import maya.cmds as cmds
+    import First_auto_rig.rig_arm as rig_arm
+
+    cmds.file(new=True, force=True)
+    arm = rig_arm.Rig_Arm()
+    arm.rig_arm(use_plan=use_plan)
+    controls = arm.rig_info["fk_controls"] + [arm.rig_info[i] for i in ["ik_controls", "pole_vector_control",
+                                                                           "set_control"]]
+    names = [name for ctrl in controls for name in [ctrl[0], ctrl[1][0]]]
+    return dict((name, cmds.getAttr(name + ".worldMatrix[0]")) for name in names)
+
+
+def check_controls(tolerance=1e-4):
+    '''
+    Returns:
+        mismatches(List): The controls the plan build puts somewhere else than the cmds build
+    '''
+    expected = control_matrices(False)
+    planned = control_matrices(True)
+    return [name for name, matrix in expected.items()
+            if max(abs(a - b) for a, b in zip(matrix, planned[name])) > tolerance]
+
+
+def main():
+    import maya.standalone
+    maya.standalone.initialize()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("RDOJO_DATA", REPO_ROOT + "/")
+
+    import First_auto_rig.rig_arm as rig_arm
+    plan = rig_arm.Rig_Arm().plan_arm()
+    print("Plan operations: {}".format(plan.count()))
+
+    mismatches = check_controls()
+    print("Control world matrices: {}".format("match" if not mismatches else "MISMATCH " + ", ".join(mismatches)))
+
+    for label, use_plan in [("cmds", False), ("plan", True)]:
+        timings = time_build(use_plan)
+        print("{:<6} best {:.4f}s  mean {:.4f}s".format(label, min(timings), sum(timings) / len(timings)))
+
+    maya.standalone.uninitialize()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+'''
+Measure what build sessions save on a full arm (Rig_Arm.rig_arm) and leg (fk_ik_hinge + create_reverse_foot) build,
+with sessions off and with every undo mode, and check a failed build rolls back every node it made, the OpenMaya ones
+included.
+Run with mayapy from the repository root:
+    mayapy -m benchmarks.bench_build_session
+or from the script editor to include viewport refresh:
+    import benchmarks.bench_build_session as bench; bench.run()
+'''
+
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# label: (sessions enabled, undo mode)
+MODES = [("no session", False, "chunk"), ("undo chunk", True, "chunk"), ("undo off", True, "off")]
+
+
+def build_arm():
+    import First_auto_rig.rig_arm as rig_arm
+    rig_arm.Rig_Arm(positions=[[-7.253066, 0, 0.590704], [-1.365397, 0, -0.939316], [4.193028, 0, 0.861846]]).rig_arm()
+
+
+def build_leg():
+    import First_auto_rig.temp_utils_and_components as components
+    import benchmarks.bench_components as bench_components
+
+    leg = bench_components.build_chain(["L_leg_hip_JNT", "L_leg_knee_JNT", "L_leg_ankle_JNT"],
+                                       bench_components.LEG_POSITIONS[:3])
+    components.fk_ik_hinge(leg[:1])
+    chain, ctrl = bench_components.ik_leg()
+    components.create_reverse_foot([chain[2]], [ctrl])
+
+
+def time_build(build, enabled, undo, repeats):
+    import maya.cmds as cmds
+    import system.build_session as build_session
+
+    build_session.ENABLED = enabled
+    timings = []
+    for i in range(repeats):
+        cmds.file(new=True, force=True)
+        cmds.flushUndo()
+        cmds.undoInfo(state=True)
+        # Builders open their own sessions, the outer one only sets the undo mode they all run in
+        start = time.perf_counter()
+        with build_session.build_session("bench", undo=undo):
+            build()
+        timings.append(time.perf_counter() - start)
+    build_session.ENABLED = True
+    return timings
+
+
+class _Abort(Exception):
+    pass
+
+
+def check_rollback(build):
+    '''
+    Run a build in a rollback session that fails once the build is done
+    Returns:
+        leftovers(List): The nodes the rollback left in the scene
+    '''
+    import maya.cmds as cmds
+    import system.build_session as build_session
+
+    cmds.file(new=True, force=True)
+    cmds.flushUndo()
+    cmds.undoInfo(state=True)
+    before = set(cmds.ls())
+    try:
+        with build_session.build_session("bench_rollback", rollback=True):
+            build()
+            raise _Abort()
+    except _Abort:
+        pass
+    return sorted(set(cmds.ls()) - before)
+
+
+def run(repeats=5):
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("RDOJO_DATA", REPO_ROOT + "/")
+
+    print("{:<8}{:<12}{:>10}{:>10}{:>10}".format("build", "mode", "best(s)", "mean(s)", "speedup"))
+    for name, build in [("arm", build_arm), ("leg", build_leg)]:
+        baseline = None
+        for label, enabled, undo in MODES:
+            timings = time_build(build, enabled, undo, repeats)
+            best = min(timings)
+            baseline = baseline or best
+            print("{:<8}{:<12}{:>10.4f}{:>10.4f}{:>9.2f}x".format(name, label, best, sum(timings) / len(timings),
+                                                                  baseline / best))
+
+    for name, build in [("arm", build_arm), ("leg", build_leg)]:
+        leftovers = check_rollback(build)
+        print("{} rollback: {}".format(name, "clean" if not leftovers else "LEFT " + ", ".join(leftovers)))
+
+
+def main():
+    import maya.standalone
+    maya.standalone.initialize()
+    run()
+    maya.standalone.uninitialize()
+
+
+if __name__ == "__main__":
+    main()
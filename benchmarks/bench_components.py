@@ -0,0 +1,602 @@
+'''
+Per component rig evaluation benchmark.
+Every component is built in a clean scene and measured on its own: nodes created, connections made, build time and
+evaluation time per frame under the parallel evaluation manager, with its controls animated so every frame evaluates.
+Results are written to a versioned JSON file, pass a previous file as --baseline to fail on regressions.
+
+Run with mayapy from the repository root:
+    mayapy -m benchmarks.bench_components --output components.json --baseline old_components.json
+Without Maya, --standin counts nodes and connections from a recorded BuildPlan of every component instead of
+measuring. Rig_Arm.rig_arm records its own plan (Rig_Arm.plan_arm), which solves joint orients with numpy, it's
+reported as skipped without numpy. The PyMEL components are recorded by the stand-in plans below:
+    python -m benchmarks.bench_components --standin
+The exit code is 1 when a component regressed, failed or was skipped.
+'''
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bump when the layout of the results changes, files with another schema are never compared
+SCHEMA_VERSION = 1
+
+FRAMES = 100
+
+# Nodes made by the commands a plan queues, the constraint/ikHandle commands also make connections we can't count
+COMMAND_NODES = {"ikHandle": 2, "parentConstraint": 1, "orientConstraint": 1, "pointConstraint": 1,
+                 "poleVectorConstraint": 1}
+
+ARM_NAMES = ["L_shoulder_JNT", "L_elbow_JNT", "L_wrist_JNT"]
+ARM_POSITIONS = [[-7.253066, 0, 0.590704], [-1.365397, 0, -0.939316], [4.193028, 0, 0.861846]]
+LEG_NAMES = ["L_hip_IK_JNT", "L_knee_IK_JNT", "L_ankle_IK_JNT", "L_ball_IK_JNT", "L_toe_IK_JNT"]
+LEG_POSITIONS = [[10, 90, 0], [10, 50, 3], [10, 10, 0], [10, 2, 10], [10, 0, 18]]
+FINGERS = ["thumb", "index", "middle", "ring", "pinky"]
+
+
+##################
+##Scene building##
+##################
+
+def build_chain(names, positions):
+    '''
+    Create an oriented joint chain in a clean selection and return the PyNodes
+    '''
+    import maya.cmds as cmds
+    import pymel.core as pm
+
+    cmds.select(clear=True)
+    joints = [cmds.joint(name=name, position=position) for name, position in zip(names, positions)]
+    cmds.joint(joints[0], edit=True, orientJoint="xyz", secondaryAxisOrient="yup", children=True, zeroScaleOrient=True)
+    cmds.select(clear=True)
+    return [pm.PyNode(i) for i in joints]
+
+
+def arm_chain():
+    return build_chain(ARM_NAMES, ARM_POSITIONS)
+
+
+def ik_leg():
+    '''
+    A leg chain with an IK handle under a control, what create_reverse_foot expects
+    '''
+    import pymel.core as pm
+
+    chain = build_chain(LEG_NAMES, LEG_POSITIONS)
+    handle = pm.ikHandle(startJoint=chain[0], endEffector=chain[2], solver="ikRPsolver", name="L_leg_ikHandle")[0]
+    ctrl = pm.circle(name="L_ankle_IK_CTRL")[0]
+    ctrl.setTranslation(chain[2].getTranslation(space="world"), space="world")
+    pm.parent(handle, ctrl)
+    return chain, ctrl
+
+
+##############
+##Components##
+##############
+
+# Every component has a setup, run outside of the measurement, and a build returning the plugs to animate
+
+def setup_arm():
+    return {"base": arm_chain()}
+
+
+def build_fk_ik_hinge(context):
+    import First_auto_rig.temp_utils_and_components as components
+    components.fk_ik_hinge([context["base"][0]])
+    return None
+
+
+def build_fk_rig(context):
+    import First_auto_rig.temp_utils_and_components as components
+    components.create_fk_rig([context["base"][0]])
+    return None
+
+
+def build_ik_rig(context):
+    import First_auto_rig.temp_utils_and_components as components
+    components.create_ik_rig([context["base"][0]])
+    return None
+
+
+def setup_stretchy_ik():
+    import First_auto_rig.temp_utils_and_components as components
+    ik_chain, ik_ctrl, pv_grp = components.create_ik_rig(arm_chain()[:1])
+    return {"ik_chain": ik_chain, "ik_ctrl": ik_ctrl}
+
+
+def build_stretchy_ik(context):
+    import First_auto_rig.temp_utils_and_components as components
+    components.addStretchyIK(context["ik_chain"][0])
+    ctrl = context["ik_ctrl"].name()
+    return ["{}.translateX".format(ctrl), "{}.translateY".format(ctrl), "{}.Stretchy_IK".format(ctrl)]
+
+
+def setup_reverse_foot():
+    chain, ctrl = ik_leg()
+    return {"ankle": chain[2], "ctrl": ctrl}
+
+
+def build_reverse_foot(context):
+    import First_auto_rig.temp_utils_and_components as components
+    components.create_reverse_foot([context["ankle"]], [context["ctrl"]])
+    ctrl = context["ctrl"].name()
+    return ["{}.{}".format(ctrl, i) for i in ["translateY", "Heel_Roll", "Toe_Roll", "Ball_Roll", "Bank"]]
+
+
+def setup_space_switch():
+    import pymel.core as pm
+    world = pm.group(empty=True, name="world_space_GRP")
+    local = pm.group(empty=True, name="local_space_GRP")
+    local.setTranslation([10, 0, 0])
+    target = pm.group(empty=True, name="target_ZERO_GRP")
+    ctrl = pm.circle(name="space_CTRL")[0]
+    return {"world": world, "local": local, "target": target, "ctrl": ctrl}
+
+
+def build_space_switch(context):
+    import First_auto_rig.temp_utils_and_components as components
+    components.add_space_switch([context["ctrl"]], parent_world=context["world"], parent_local=context["local"],
+                                target_grp=context["target"])
+    return ["{}.Inherit_Transforms".format(context["ctrl"]), "{}.rotateY".format(context["world"]),
+            "{}.translateY".format(context["local"])]
+
+
+def setup_hand_settings():
+    import pymel.core as pm
+    fingers = []
+    for finger in FINGERS:
+        for i in range(3):
+            ctrl = pm.circle(name="L_{}_{:02d}_CTRL".format(finger, i))[0]
+            zero = pm.group(ctrl, name="L_{}_{:02d}_CTRL_ZERO_GRP".format(finger, i))
+            zero.setTranslation([i * 3.0, 0, len(fingers)], space="world")
+            fingers.append(ctrl)
+    return {"ctrl": pm.circle(name="L_hand_settings_CTRL")[0], "fingers": fingers}
+
+
+def build_hand_settings(context):
+    import First_auto_rig.temp_utils_and_components as components
+    components.add_hand_settings([context["ctrl"]], finger_ctrls=context["fingers"])
+    return ["{}.{}_Curl".format(context["ctrl"], i) for i in ["Thumb", "Index", "Middle", "Ring", "Pinky"]]
+
+
+def build_rig_arm(context):
+    import First_auto_rig.rig_arm as rig_arm
+    rig_arm.Rig_Arm(positions=ARM_POSITIONS).rig_arm()
+    return None
+
+
+def plan_rig_arm():
+    import First_auto_rig.rig_arm as rig_arm
+    return rig_arm.Rig_Arm(positions=ARM_POSITIONS).plan_arm()
+
+
+##################
+##Stand-in plans##
+##################
+
+# The PyMEL components can't record a plan, these record the nodes and connections each one makes on the setup scene
+# above, node for node. Keep them in step with First_auto_rig/temp_utils_and_components.py
+
+def _new_plan(name):
+    import system.build_plan as build_plan
+    return build_plan.BuildPlan(name)
+
+
+def _plan_chain(plan, names, chain_type, positions, parent=None):
+    # chain_clone: one joint per source joint, named by chain type
+    import system.naming as naming
+
+    chain = naming.chain_names(names, chain_type)
+    for name, position in zip(chain, positions):
+        parent = plan.create_joint(name, position, parent=parent)
+    return chain
+
+
+def _plan_circle(plan, name):
+    # pm.circle: a transform, its curve shape and the makeNurbCircle history
+    ctrl = plan.create_node("transform", name, dag=True)
+    shape = plan.create_node("nurbsCurve", name + "Shape", parent=ctrl)
+    circle = plan.create_node("makeNurbCircle", name + "_makeNurbCircle")
+    plan.connect(circle + ".outputCurve", shape + ".create")
+    return ctrl
+
+
+def _plan_shape(plan, name):
+    # control_shapes: a transform and one curve shape, no history
+    plan.create_node("nurbsCurve", name + "Shape", parent=plan.create_node("transform", name, dag=True))
+    return name
+
+
+def _plan_locator(plan, name):
+    plan.create_node("locator", name + "Shape", parent=plan.create_node("transform", name, dag=True))
+    return name
+
+
+def _plan_fk_rig(plan, fk_chain):
+    grps = []
+    for joint in fk_chain:
+        ctrl = _plan_circle(plan, joint.replace("_JNT", "_CTRL"))
+        grp = plan.create_node("transform", ctrl + "_ZERO_GRP", dag=True)
+        plan.command("matchTransform", grp, joint)
+        plan.parent(ctrl, grp)
+        if grps:
+            plan.parent(grp, grps[-1][:-len("_ZERO_GRP")])
+        grps.append(grp)
+        plan.command("parentConstraint", ctrl, joint)
+    return grps
+
+
+def _plan_ik_rig(plan, ik_chain):
+    ik_ctrl = _plan_shape(plan, ik_chain[-1].replace("_JNT", "_CTRL"))
+    pv_ctrl = _plan_shape(plan, ik_ctrl.replace("_CTRL", "_PV"))
+    ik_grp = plan.create_node("transform", ik_ctrl + "_ZERO_GRP", dag=True)
+    plan.parent(ik_ctrl, ik_grp)
+    handle = ik_chain[-1] + "_ikHandle"
+    plan.command("ikHandle", n=handle, sj=ik_chain[0], ee=ik_chain[-1], sol="ikRPsolver", p=2, w=1)
+    pv_grp = plan.create_node("transform", pv_ctrl + "_ZERO_GRP", dag=True)
+    plan.parent(pv_ctrl, pv_grp)
+    plan.command("poleVectorConstraint", pv_ctrl, handle)
+    plan.command("orientConstraint", ik_ctrl, ik_chain[-1])
+    plan.parent(handle, ik_ctrl)
+    ctrl_grp = plan.create_node("transform", ik_ctrl.split("_CTRL")[0] + "_GRP", dag=True)
+    plan.parent(ik_grp, ctrl_grp)
+    plan.parent(pv_grp, ctrl_grp)
+    return ik_ctrl, pv_ctrl
+
+
+def plan_fk_rig():
+    plan = _new_plan("create_fk_rig")
+    _plan_fk_rig(plan, _plan_chain(plan, ARM_NAMES, "_FK", ARM_POSITIONS))
+    return plan
+
+
+def plan_ik_rig():
+    plan = _new_plan("create_ik_rig")
+    _plan_ik_rig(plan, _plan_chain(plan, ARM_NAMES, "_IK", ARM_POSITIONS))
+    return plan
+
+
+def plan_fk_ik_hinge():
+    plan = _new_plan("fk_ik_hinge")
+    group = plan.create_node("transform", ARM_NAMES[0] + "_GRP", dag=True)
+    blend, fk, ik = [_plan_chain(plan, ARM_NAMES, i, ARM_POSITIONS, parent=group) for i in ["_BLEND", "_FK", "_IK"]]
+    blend_ctrl = _plan_shape(plan, blend[-1] + "_BLEND_CTRL")
+    blend_grp = plan.create_node("transform", blend_ctrl + "_ZERO_GRP", dag=True)
+    plan.parent(blend_ctrl, blend_grp)
+    plan.command("pointConstraint", blend[-1], blend_grp, maintainOffset=True)
+    switch = plan.add_attr(blend_ctrl, "FK_IK", min=0, max=1, default=1)
+
+    fk_grps = _plan_fk_rig(plan, fk)
+    ik_ctrl, pv_ctrl = _plan_ik_rig(plan, ik)
+    reverse = plan.create_node("reverse", blend_ctrl + "_reverse")
+    plan.connect(switch, reverse + ".inputX")
+    for i, joint in enumerate(blend):
+        constraint = joint + "_parentConstraint1"
+        plan.command("parentConstraint", fk[i], ik[i], joint, n=constraint, maintainOffset=True)
+        plan.connect(switch, "{}.{}W1".format(constraint, ik[i]))
+        plan.connect(reverse + ".outputX", "{}.{}W0".format(constraint, fk[i]))
+    for grp in fk_grps:
+        plan.connect(reverse + ".outputX", grp[:-len("_ZERO_GRP")] + ".visibility")
+    plan.connect(switch, ik_ctrl + ".visibility")
+    plan.connect(switch, pv_ctrl + ".visibility")
+    plan.set_attr(group + ".visibility", False)
+    return plan
+
+
+def plan_stretchy_ik():
+    # The setup already built the IK rig, only the stretch network is planned
+    plan = _new_plan("addStretchyIK")
+    ik_chain = [i.replace("_JNT", "_IK_JNT") for i in ARM_NAMES]
+    ik_ctrl = ik_chain[-1].replace("_JNT", "_CTRL")
+    start = _plan_locator(plan, ik_chain[0].replace("_JNT", "_stretch_JNT"))
+    end = _plan_locator(plan, ik_chain[-1].replace("_JNT", "_stretch_JNT"))
+    distance = plan.create_node("distanceBetween", ik_chain[-1] + "_distanceBetween")
+    plan.connect(start + "Shape.worldPosition[0]", distance + ".point1")
+    plan.connect(end + "Shape.worldPosition[0]", distance + ".point2")
+    divider = plan.create_node("multiplyDivide", distance + "_divide")
+    plan.connect(distance + ".distance", divider + ".input1X")
+    blend = plan.create_node("blendColors", ik_ctrl + "_blendColors")
+    plan.parent(ik_chain[-1] + "_ikHandle", end)
+    plan.parent(end, ik_ctrl)
+    plan.connect(plan.add_attr(ik_ctrl, "Stretchy_IK", min=0, max=1, default=0), blend + ".blender")
+    for i, channel in enumerate("RG"):
+        multiplier = plan.create_node("multDoubleLinear", ik_chain[i] + "_multDoubleLinear")
+        condition = plan.create_node("condition", ik_chain[i] + "_condition")
+        plan.connect(divider + ".outputX", multiplier + ".input1")
+        plan.connect(distance + ".distance", condition + ".firstTerm")
+        plan.connect(multiplier + ".output", condition + ".colorIfTrueR")
+        plan.connect(condition + ".outColorR", "{}.color1{}".format(blend, channel))
+        plan.connect("{}.output{}".format(blend, channel), ik_chain[i + 1] + ".translateX")
+    return plan
+
+
+def plan_reverse_foot():
+    plan = _new_plan("create_reverse_foot")
+    foot = LEG_NAMES[2:]
+    ctrl = "L_ankle_IK_CTRL"
+    in_bank, out_bank, toe_tap = [plan.create_node("transform", "L_{}_GRP".format(i), dag=True)
+                                  for i in ["inner_bank", "outer_bank", "toe_tap"]]
+    plan.parent(out_bank, in_bank)
+    names = ["L_heel_REVERSE_JNT"] + [i.replace("_IK", "_REVERSE") for i in reversed(foot)]
+    positions = [LEG_POSITIONS[2], LEG_POSITIONS[4], LEG_POSITIONS[3], LEG_POSITIONS[2]]
+    reverse = plan.create_joint_chain(names, positions)
+    ball_handle, toe_handle = "L_ball_ikHandle", "L_toe_ikHandle"
+    plan.command("ikHandle", n=ball_handle, sj=foot[0], ee=foot[1], sol="ikSCsolver", p=2, w=1)
+    plan.command("ikHandle", n=toe_handle, sj=foot[1], ee=foot[2], sol="ikSCsolver", p=2, w=1)
+    plan.parent("L_leg_ikHandle", reverse[-1])
+    plan.parent(ball_handle, reverse[-2])
+    plan.parent(toe_handle, toe_tap)
+    plan.parent(toe_tap, reverse[-3])
+    plan.parent(reverse[0], out_bank)
+    plan.parent(in_bank, ctrl)
+
+    attrs = {i: plan.add_attr(ctrl, i) for i in ["Heel_Twist", "Heel_Roll", "Toe_Twist", "Toe_Roll", "Ball_Roll",
+                                                 "Toe_Tap", "Bank"]}
+    for attr, plug in [("Heel_Twist", reverse[0] + ".rotateY"), ("Heel_Roll", reverse[0] + ".rotateX"),
+                       ("Toe_Twist", reverse[1] + ".rotateY"), ("Toe_Roll", reverse[1] + ".rotateX"),
+                       ("Ball_Roll", reverse[2] + ".rotateX"), ("Toe_Tap", toe_tap + ".rotateX")]:
+        plan.connect(attrs[attr], plug)
+    condition = plan.create_node("condition", "L_bank_condition")
+    for plug in ["firstTerm", "colorIfTrueR", "colorIfFalseG"]:
+        plan.connect(attrs["Bank"], "{}.{}".format(condition, plug))
+    for side, channel, group in [("inner", "G", in_bank), ("outer", "R", out_bank)]:
+        invert = plan.create_node("multDoubleLinear", "L_{}_bank_invert_mult".format(side))
+        plan.connect("{}.outColor{}".format(condition, channel), invert + ".input1")
+        plan.connect(invert + ".output", group + ".rotateZ")
+    return plan
+
+
+def plan_space_switch():
+    plan = _new_plan("add_space_switch")
+    switch = plan.add_attr("space_CTRL", "Inherit_Transforms", min=0, max=1, default=1)
+    constraint = "target_ZERO_GRP_parentConstraint1"
+    plan.command("parentConstraint", "world_space_GRP", "local_space_GRP", "target_ZERO_GRP", n=constraint,
+                 maintainOffset=True)
+    reverse = plan.create_node("reverse", "space_CTRL_Inherit_Transforms_reverse")
+    plan.connect(switch, reverse + ".inputX")
+    plan.connect(switch, constraint + ".local_space_GRPW1")
+    plan.connect(reverse + ".outputX", constraint + ".world_space_GRPW0")
+    return plan
+
+
+def plan_hand_settings():
+    plan = _new_plan("add_hand_settings")
+    ctrl = "L_hand_settings_CTRL"
+    plan.command("addAttr", ctrl, longName="FINGERS", attributeType="enum", enumName="---", keyable=True)
+    for finger in FINGERS:
+        attr = plan.add_attr(ctrl, finger.capitalize() + "_Curl")
+        for i in range(3):
+            finger_ctrl = "L_{}_{:02d}_CTRL".format(finger, i)
+            buffer = plan.create_node("transform", finger_ctrl + "_BUFF_GRP", parent=finger_ctrl + "_ZERO_GRP")
+            plan.parent(finger_ctrl, buffer)
+            plan.connect(attr, buffer + ".rotateZ")
+    return plan
+
+
+# name: (setup, build, plan recorder for the stand-in)
+COMPONENTS = {
+    "fk_ik_hinge": (setup_arm, build_fk_ik_hinge, plan_fk_ik_hinge),
+    "create_fk_rig": (setup_arm, build_fk_rig, plan_fk_rig),
+    "create_ik_rig": (setup_arm, build_ik_rig, plan_ik_rig),
+    "addStretchyIK": (setup_stretchy_ik, build_stretchy_ik, plan_stretchy_ik),
+    "create_reverse_foot": (setup_reverse_foot, build_reverse_foot, plan_reverse_foot),
+    "add_space_switch": (setup_space_switch, build_space_switch, plan_space_switch),
+    "add_hand_settings": (setup_hand_settings, build_hand_settings, plan_hand_settings),
+    "Rig_Arm.rig_arm": (lambda: {}, build_rig_arm, plan_rig_arm),
+}
+# Components whose plan needs NumPy (joint orients are solved with it)
+NUMPY_PLANS = ["Rig_Arm.rig_arm"]
+
+
+###############
+##Measurement##
+###############
+
+def count_connections(nodes):
+    '''
+    Count every connection into or out of the nodes, each connection once
+    '''
+    import maya.cmds as cmds
+
+    connections = set()
+    for source in [True, False]:
+        pairs = cmds.listConnections(nodes, source=source, destination=not source, connections=True, plugs=True) or []
+        for i in range(0, len(pairs), 2):
+            connections.add((pairs[i + 1], pairs[i]) if source else (pairs[i], pairs[i + 1]))
+    return len(connections)
+
+
+def animate(plugs, frames):
+    '''
+    Key the plugs from 0 to 1 (or 0 to 10 for transforms) over the frame range so every frame evaluates
+    '''
+    import maya.cmds as cmds
+
+    for plug in plugs:
+        if not cmds.getAttr(plug, settable=True):
+            continue
+        end = 10.0 if plug.rsplit(".", 1)[-1].startswith(("translate", "rotate")) else 1.0
+        cmds.setKeyframe(plug, time=1, value=0.0)
+        cmds.setKeyframe(plug, time=frames, value=end)
+
+
+def time_evaluation(frames):
+    '''
+    Returns:
+        The mean evaluation time per frame in seconds under the parallel evaluation manager
+    '''
+    import maya.cmds as cmds
+
+    cmds.playbackOptions(minTime=1, maxTime=frames)
+    cmds.evaluationManager(mode="parallel")
+    cmds.evaluationManager(invalidate=True)
+    # One pass to build the evaluation graph, it isn't part of the per frame cost
+    for frame in range(1, frames + 1):
+        cmds.currentTime(frame, update=True)
+
+    start = time.perf_counter()
+    for frame in range(1, frames + 1):
+        cmds.currentTime(frame, update=True)
+    return (time.perf_counter() - start) / frames
+
+
+def measure_component(name, frames=FRAMES):
+    import maya.cmds as cmds
+
+    setup, build, plan = COMPONENTS[name]
+    cmds.file(new=True, force=True)
+    context = setup()
+    before = set(cmds.ls(long=True))
+
+    start = time.perf_counter()
+    drivers = build(context)
+    build_time = time.perf_counter() - start
+
+    created = [i for i in cmds.ls(long=True) if i not in before]
+    if drivers is None:
+        # Animate every control the component made
+        drivers = ["{}.{}".format(i, attr) for i in cmds.ls(created, type="transform")
+                   if i.endswith("_CTRL") for attr in ["rotateZ", "translateY"]]
+    animate(drivers, frames)
+
+    return {"status": "ok", "nodes": len(created), "connections": count_connections(created) if created else 0,
+            "build_time": build_time, "eval_time_per_frame": time_evaluation(frames), "frames": frames,
+            "drivers": len(drivers)}
+
+
+def standin_component(name):
+    '''
+    Structural counts from the component's recorded plan, nodes made inside queued commands are estimated
+    '''
+    if name in NUMPY_PLANS and importlib.util.find_spec("numpy") is None:
+        return {"status": "skipped", "reason": "recording the plan needs numpy"}
+    plan = COMPONENTS[name][2]()
+    counts = plan.count()
+    commands = [i["command"] for i in plan.operations if i["op"] == "command"]
+    return {"status": "ok", "nodes": len(plan.nodes()) + sum(COMMAND_NODES.get(i, 0) for i in commands),
+            "connections": counts.get("connect", 0), "operations": len(plan.operations), "commands": len(commands)}
+
+
+###########
+##Results##
+###########
+
+def revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       universal_newlines=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(components=None, standin=False, frames=FRAMES):
+    '''
+    Measure components, every component in COMPONENTS by default
+    Returns:
+        results(Dict): The versioned results
+    '''
+    results = {"schema": SCHEMA_VERSION, "mode": "standin" if standin else "maya", "revision": revision(),
+               "date": time.strftime("%Y-%m-%d %H:%M:%S"), "frames": None if standin else frames, "components": {}}
+    if not standin:
+        import maya.cmds as cmds
+        results["maya_version"] = cmds.about(version=True)
+
+    for name in components or list(COMPONENTS):
+        try:
+            if standin:
+                results["components"][name] = standin_component(name)
+            else:
+                results["components"][name] = measure_component(name, frames)
+        except Exception as error:
+            results["components"][name] = {"status": "failed", "error": "{}: {}".format(type(error).__name__, error)}
+    return results
+
+
+def compare(results, baseline, tolerance=0.1):
+    '''
+    Find regressions against a baseline: more nodes or connections, or evaluation more than tolerance slower
+    Returns:
+        regressions(List): One message per regression
+    '''
+    if baseline.get("schema") != results["schema"] or baseline.get("mode") != results["mode"]:
+        raise RuntimeError("Baseline is schema {} ({}), results are schema {} ({})".format(
+            baseline.get("schema"), baseline.get("mode"), results["schema"], results["mode"]))
+
+    regressions = []
+    for name, current in results["components"].items():
+        previous = baseline["components"].get(name)
+        if not previous or previous.get("status") != "ok":
+            continue
+        if current.get("status") != "ok":
+            regressions.append("{} {} (was ok)".format(name, current.get("status")))
+            continue
+        for key in ["nodes", "connections"]:
+            if current[key] > previous[key]:
+                regressions.append("{} {}: {} -> {}".format(name, key, previous[key], current[key]))
+        if "eval_time_per_frame" in previous:
+            if current["eval_time_per_frame"] > previous["eval_time_per_frame"] * (1.0 + tolerance):
+                regressions.append("{} eval_time_per_frame: {:.6f}s -> {:.6f}s".format(
+                    name, previous["eval_time_per_frame"], current["eval_time_per_frame"]))
+    return regressions
+
+
+def report(results):
+    print("{:<22}{:>8}{:>8}{:>12}{:>16}".format("component", "nodes", "conns", "build(s)", "eval/frame(ms)"))
+    for name, result in results["components"].items():
+        if result["status"] != "ok":
+            print("{:<22}{}".format(name, result.get("reason") or result.get("error")))
+            continue
+        build_time = "{:.4f}".format(result["build_time"]) if "build_time" in result else "-"
+        eval_time = "{:.3f}".format(result["eval_time_per_frame"] * 1000) if "eval_time_per_frame" in result else "-"
+        print("{:<22}{:>8}{:>8}{:>12}{:>16}".format(name, result["nodes"], result["connections"], build_time,
+                                                    eval_time))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the build and evaluation cost of every SPYDR component")
+    parser.add_argument("components", nargs="*", help="Components to measure, all of them by default")
+    parser.add_argument("--standin", action="store_true",
+                        help="Structural counts from recorded plans, without Maya")
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--output", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Previous results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed evaluation slowdown, 0.1 is 10%%")
+    args = parser.parse_args(argv)
+
+    unknown = [i for i in args.components if i not in COMPONENTS]
+    if unknown:
+        parser.error("Unknown components: {}".format(", ".join(unknown)))
+
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("RDOJO_DATA", REPO_ROOT + "/")
+    if not args.standin:
+        import maya.standalone
+        maya.standalone.initialize()
+
+    results = run(args.components, standin=args.standin, frames=args.frames)
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(results, outfile, indent=1)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as infile:
+            regressions = compare(results, json.load(infile), args.tolerance)
+        for i in regressions:
+            print("REGRESSION {}".format(i))
+
+    if not args.standin:
+        maya.standalone.uninitialize()
+    # A component that didn't measure hasn't been checked, that mustn't pass as a clean run
+    incomplete = [name for name, result in results["components"].items() if result["status"] != "ok"]
+    return 1 if regressions or incomplete else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
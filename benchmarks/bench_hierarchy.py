@@ -0,0 +1,71 @@
+'''
+Count how often the shared hierarchy index (system/hierarchy.py) walks the whole DAG during an arm build, in a scene
+padded with unrelated joint hierarchies so a full rebuild costs what it would in a production file.
+Run with mayapy from the repository root:
+    mayapy -m benchmarks.bench_hierarchy
+'''
+
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Unrelated chains of CHAIN_LENGTH joints already in the scene before the arm is built
+CHAINS = 200
+CHAIN_LENGTH = 10
+
+
+def pad_scene(chains=CHAINS, length=CHAIN_LENGTH):
+    import maya.cmds as cmds
+
+    for i in range(chains):
+        cmds.select(clear=True)
+        for j in range(length):
+            cmds.joint(name="pad{}_{}_JNT".format(i, j), position=(i, j, 0))
+    cmds.select(clear=True)
+
+
+def build_arm():
+    '''
+    Build Rig_Arm.rig_arm in a padded scene
+    Returns:
+        rebuilds, refreshes, seconds: Full DAG walks and subtree updates of the index during the build, and its time
+    '''
+    import maya.cmds as cmds
+    import First_auto_rig.rig_arm as rig_arm
+    import benchmarks.bench_components as bench_components
+    import system.hierarchy as hierarchy
+
+    cmds.file(new=True, force=True)
+    pad_scene()
+    index = hierarchy.get_index()
+    # Start from a built index, the walk after a new scene isn't part of the build
+    index.chain(cmds.ls(type="joint")[0])
+    rebuilds, refreshes = index.rebuilds, index.refreshes
+
+    start = time.perf_counter()
+    arm = rig_arm.Rig_Arm(positions=bench_components.ARM_POSITIONS)
+    arm.rig_arm()
+    seconds = time.perf_counter() - start
+    return index.rebuilds - rebuilds, index.refreshes - refreshes, seconds
+
+
+def main():
+    import maya.standalone
+    maya.standalone.initialize()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("RDOJO_DATA", REPO_ROOT + "/")
+
+    rebuilds, refreshes, seconds = build_arm()
+    print("Scene: {} padding joints".format(CHAINS * CHAIN_LENGTH))
+    print("Full rebuilds per build: {}".format(rebuilds))
+    print("Subtree updates per build: {}".format(refreshes))
+    print("Build time: {:.4f}s".format(seconds))
+
+    maya.standalone.uninitialize()
+
+
+if __name__ == "__main__":
+    main()
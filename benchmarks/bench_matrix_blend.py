@@ -0,0 +1,111 @@
+'''
+Compare the parentConstraint and matrix backends (system/matrix_blend.py) on a full arm build (Rig_Arm.rig_arm):
+the nodes each creates, the per frame evaluation cost with the FK/IK switch and every control animated, and that both
+pose the rig joints the same with the switch at 0 and at 1.
+Run with mayapy from the repository root:
+    mayapy -m benchmarks.bench_matrix_blend
+or from the script editor:
+    import benchmarks.bench_matrix_blend as bench; bench.run()
+'''
+
+import os
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BACKENDS = ["constraint", "matrix"]
+NODE_TYPES = ["parentConstraint", "multMatrix", "blendMatrix", "blendColors"]
+# Largest world matrix difference between the backends that still counts as the same pose
+TOLERANCE = 1e-4
+
+
+def build_arm(backend):
+    import maya.cmds as cmds
+    import First_auto_rig.rig_arm as rig_arm
+    import benchmarks.bench_components as bench_components
+    import system.matrix_blend as matrix_blend
+
+    cmds.file(new=True, force=True)
+    matrix_blend.set_backend(backend)
+    try:
+        before = set(cmds.ls())
+        arm = rig_arm.Rig_Arm(positions=bench_components.ARM_POSITIONS)
+        arm.rig_arm()
+        nodes = sorted(set(cmds.ls()) - before)
+    finally:
+        matrix_blend.set_backend("constraint")
+    return arm.rig_info, nodes
+
+
+def pose(rig_info):
+    '''
+    Move the FK and IK controls off their rest pose and read the rig joints with the switch at 0 (IK) and 1 (FK)
+    Returns:
+        (2, joints, 4, 4) array of rig joint world matrices
+    '''
+    import maya.cmds as cmds
+
+    for ctrl in rig_info["fk_controls"]:
+        cmds.setAttr(ctrl[1][0] + ".rotate", 10, 25, -15)
+    cmds.setAttr(rig_info["ik_controls"][1][0] + ".translate", 2, 3, -1)
+
+    switch = rig_info["set_control"][1][0] + ".IK_FK"
+    matrices = []
+    for value in [0, 1]:
+        cmds.setAttr(switch, value)
+        matrices.append([cmds.getAttr(i + ".worldMatrix[0]") for i in rig_info["rig_joints"]])
+    return np.array(matrices, dtype=np.float64).reshape(2, -1, 4, 4)
+
+
+def time_arm(rig_info, frames):
+    import benchmarks.bench_components as bench_components
+
+    plugs = [rig_info["set_control"][1][0] + ".IK_FK"]
+    plugs += [ctrl[1][0] + ".rotate" + axis for ctrl in rig_info["fk_controls"] for axis in "XYZ"]
+    plugs += [rig_info["ik_controls"][1][0] + ".translate" + axis for axis in "XYZ"]
+    bench_components.animate(plugs, frames)
+    return bench_components.time_evaluation(frames)
+
+
+def run(frames=None):
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("RDOJO_DATA", REPO_ROOT + "/")
+
+    import maya.cmds as cmds
+    import benchmarks.bench_components as bench_components
+
+    frames = frames or bench_components.FRAMES
+    results = {}
+    for backend in BACKENDS:
+        rig_info, nodes = build_arm(backend)
+        counts = {i: len(cmds.ls(nodes, type=i)) for i in NODE_TYPES}
+        connections = bench_components.count_connections(nodes)
+        matrices = pose(rig_info)
+        results[backend] = (len(nodes), counts, connections, matrices, time_arm(rig_info, frames))
+
+    print("{:<12}{:>8}{:>8}".format("backend", "nodes", "conns") + "".join("{:>18}".format(i) for i in NODE_TYPES) +
+          "{:>12}{:>10}".format("ms/frame", "speedup"))
+    baseline = results[BACKENDS[0]][4]
+    for backend in BACKENDS:
+        count, counts, connections, matrices, per_frame = results[backend]
+        print("{:<12}{:>8}{:>8}".format(backend, count, connections) +
+              "".join("{:>18}".format(counts[i]) for i in NODE_TYPES) +
+              "{:>12.4f}{:>9.2f}x".format(per_frame * 1000.0, baseline / per_frame))
+
+    difference = np.abs(results["matrix"][3] - results["constraint"][3]).max(axis=(1, 2, 3))
+    for value, diff in zip(["IK", "FK"], difference):
+        print("{} pose difference: {:.6f} ({})".format(value, diff, "match" if diff < TOLERANCE else "MISMATCH"))
+    return results
+
+
+def main():
+    import maya.standalone
+    maya.standalone.initialize()
+    run()
+    maya.standalone.uninitialize()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+'''
+Measure SPYDR startup cost: userSetup.py -> startup.py -> menu creation, with lazy loading and with every heavy
+module imported up front (SPYDR_EAGER_IMPORTS=1, the behaviour before lazy loading).
+Every run happens in a fresh mayapy process so nothing is already imported.
+Run with mayapy from the repository root:
+    mayapy -m benchmarks.bench_startup
+'''
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_stages():
+    '''
+    Time each startup stage in the current process and print the result as JSON
+    '''
+    timings = {}
+
+    start = time.perf_counter()
+    import maya.standalone
+    maya.standalone.initialize()
+    timings["maya_initialize"] = time.perf_counter() - start
+
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("RDOJO_DATA", REPO_ROOT + "/")
+    import maya.cmds as cmds
+
+    # userSetup.py and startup.py set units and import the menu modules
+    start = time.perf_counter()
+    cmds.currentUnit(time='ntsc')
+    cmds.currentUnit(linear='cm')
+    import py101_user_interface.rig_user_interface as rig_user_interface
+    import system.utils
+    import First_auto_rig.temp_utils_and_components
+    timings["startup_imports"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        import py101_user_interface.spydr_user_interface
+    except ImportError:
+        pass
+    timings["spydr_ui_import"] = time.perf_counter() - start
+
+    # Menus can only be created with a main window, in batch mode this stage is skipped
+    if not cmds.about(batch=True):
+        start = time.perf_counter()
+        rig_user_interface.RDojo_UI()
+        timings["menu_creation"] = time.perf_counter() - start
+
+    timings["pymel_loaded"] = "pymel.core" in sys.modules
+    timings["total"] = sum(v for k, v in timings.items() if isinstance(v, float))
+    print(json.dumps(timings))
+
+
+def run_process(eager, repeats=3):
+    env = dict(os.environ)
+    env["SPYDR_EAGER_IMPORTS"] = "1" if eager else "0"
+    results = []
+    for i in range(repeats):
+        output = subprocess.check_output([sys.executable, "-m", "benchmarks.bench_startup", "--stages"],
+                                         cwd=REPO_ROOT, env=env, universal_newlines=True)
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    if "--stages" in sys.argv:
+        run_stages()
+        return
+
+    for label, eager in [("eager", True), ("lazy", False)]:
+        results = run_process(eager)
+        best = min(results, key=lambda i: i["total"])
+        print("{:<6} best total {:.3f}s  pymel loaded: {}".format(label, best["total"], best["pymel_loaded"]))
+        for stage, value in sorted(best.items()):
+            if isinstance(value, float) and stage != "total":
+                print("    {:<20}{:.3f}s".format(stage, value))
+
+
+if __name__ == "__main__":
+    main()
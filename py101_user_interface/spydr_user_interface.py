@@ -1,9 +1,12 @@
 from PySide6 import QtWidgets, QtCore, QtGui
-import pymel.core
+import system.lazy as lazy
 from maya import OpenMayaUI as omui
 from shiboken6 import wrapInstance
 import logging
 
+# Only load PyMEL when a tool actually needs it, not when the menu is built
+pymel = lazy.lazy_import("pymel.core")
+
 print("IN SPYDR!")
 
 def getMayaMainWindow():
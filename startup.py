@@ -1,3 +1,4 @@
+import importlib
 import maya.cmds as cmds
 import os
 
@@ -15,6 +16,10 @@ cmds.currentUnit(linear = 'cm')
 #Set a system path to data files with the OS module
 os.environ["RDOJO_DATA"] = "C:/Users/MATTI/Documents/GitHub/RD_Python101/"
 
+#Profile every build when SPYDR_PROFILE is set to a trace path (see system/profiling.py)
+import system.profiling as profiling
+profiling.enable_from_environment()
+
 import py101_user_interface.rig_user_interface as ui
-reload(ui)
+importlib.reload(ui)
 ui.RDojo_UI()
\ No newline at end of file
@@ -0,0 +1,244 @@
+'''
+Headless batch rig builder.
+Spreads build jobs (scene + template + guide file) across a pool of worker processes. Every worker pre-warms its
+imports and templates once and is reused for many jobs. Per job timing and failures are written to a JSON report.
+
+Run with mayapy:
+    mayapy -m system.batch_build scene_a.ma scene_b.ma --guides guides.json --workers 4 --report report.json
+or from a job file, a JSON list of jobs with the keys of Job below:
+    mayapy -m system.batch_build --jobs jobs.json
+
+Without Maya the "standin" backend runs the same jobs without building anything, it loads and validates the
+template and guides and resolves the names, which is enough to test the pool and the reports.
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+import system.naming as naming
+import system.templates as templates
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Templates every worker loads before its first job
+WARM_TEMPLATES = ["rig/arm"]
+
+# The worker's backend, set once per process by _init_worker
+_backend = None
+
+
+def make_job(scene, template="rig/arm", guides=None, instance="Left_", mirror=None, output=None, use_plan=True):
+    '''
+    Describe one build
+    Args:
+        scene(String): The scene to open, None for a new scene
+        template(String): The module template name
+        guides(String): A JSON file with a "positions" list, the template positions are used without one
+        instance(String): The side prefix
+        mirror(String): Also build the mirrored side with this prefix, e.g. "Right_"
+        output(String): Where to save the built scene, the scene isn't saved without one
+        use_plan(Bool): Build through the recorded plan instead of one command per node
+
+    Returns:
+        job(Dict): The job
+    '''
+    return {"scene": scene, "template": template, "guides": guides, "instance": instance, "mirror": mirror,
+            "output": output, "use_plan": use_plan}
+
+
+def read_guides(guides):
+    if not guides:
+        return None
+    with open(guides, 'r') as infile:
+        return json.load(infile)["positions"]
+
+
+class MayaBackend(object):
+    '''
+    Builds jobs in mayapy
+    '''
+    name = "mayapy"
+
+    def warm(self):
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+        import maya.cmds
+        import First_auto_rig.rig_arm
+        import system.build_plan
+
+    def run(self, job, timings):
+        import maya.cmds as cmds
+        import First_auto_rig.rig_arm as rig_arm
+
+        start = time.perf_counter()
+        if job["scene"]:
+            cmds.file(job["scene"], open=True, force=True)
+        else:
+            cmds.file(new=True, force=True)
+        timings["open"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        arm = rig_arm.Rig_Arm(instance=job["instance"], positions=read_guides(job["guides"]), template=job["template"])
+        arm.rig_arm(use_plan=job["use_plan"])
+        if job["mirror"]:
+            arm.mirror(instance=job["mirror"]).rig_arm(use_plan=True)
+        timings["build"] = time.perf_counter() - start
+
+        result = {"nodes": len(cmds.ls())}
+        if job["output"]:
+            start = time.perf_counter()
+            cmds.file(rename=job["output"])
+            cmds.file(save=True, type="mayaAscii" if job["output"].endswith(".ma") else "mayaBinary", force=True)
+            timings["save"] = time.perf_counter() - start
+        return result
+
+
+class StandInBackend(object):
+    '''
+    Runs jobs without Maya: loads and validates the template and guides and resolves the names of both sides
+    '''
+    name = "standin"
+
+    def warm(self):
+        pass
+
+    def run(self, job, timings):
+        start = time.perf_counter()
+        module_info = templates.get_template(job["template"])
+        positions = read_guides(job["guides"]) or module_info["positions"]
+        if len(positions) != len(module_info["ik_joints"]):
+            raise RuntimeError("{} guide positions for {} joints".format(len(positions), len(module_info["ik_joints"])))
+
+        names = naming.NameEngine(module_info, job["instance"]).all_names()
+        if job["mirror"]:
+            names.extend(naming.NameEngine(module_info, job["mirror"]).all_names())
+        timings["build"] = time.perf_counter() - start
+
+        result = {"nodes": len(names)}
+        if job["output"]:
+            with open(job["output"], 'w') as outfile:
+                json.dump({"job": job, "names": names, "positions": [list(i) for i in positions]}, outfile, indent=1)
+        return result
+
+
+BACKENDS = {"mayapy": MayaBackend, "standin": StandInBackend}
+
+
+def default_backend():
+    try:
+        import maya.standalone
+        return "mayapy"
+    except ImportError:
+        return "standin"
+
+
+def _init_worker(backend_name, root):
+    '''
+    Runs once per worker process, everything loaded here is reused by every job the worker gets
+    '''
+    global _backend
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    # run_batch already fell back to RDOJO_DATA, the root it was given wins over the parent's environment
+    os.environ["RDOJO_DATA"] = root.rstrip("/\\") + "/"
+    _backend = BACKENDS[backend_name]()
+    _backend.warm()
+    for name in WARM_TEMPLATES:
+        templates.get_template(name)
+
+
+def run_job(job):
+    '''
+    Build one job in the current worker and report how it went, failures are reported rather than raised
+    '''
+    report = {"job": job, "pid": os.getpid(), "backend": _backend.name, "status": "ok", "timings": {}}
+    start = time.perf_counter()
+    try:
+        report["result"] = _backend.run(job, report["timings"])
+    except Exception as error:
+        report["status"] = "failed"
+        report["error"] = "{}: {}".format(type(error).__name__, error)
+        report["traceback"] = traceback.format_exc()
+    report["timings"]["total"] = time.perf_counter() - start
+    return report
+
+
+def run_batch(jobs, workers=None, backend=None, root=None, report=None):
+    '''
+    Run every job across a pool of reused worker processes
+    Args:
+        jobs(List): Jobs from make_job
+        workers(Int): Number of worker processes, defaults to the CPU count
+        backend(String): "mayapy" or "standin", defaults to mayapy when Maya can be imported
+        root(String): The data root holding the templates, defaults to RDOJO_DATA or the repository root
+        report(String): Optional path of the JSON report
+
+    Returns:
+        reports(List): One report per job, in job order
+    '''
+    backend = backend or default_backend()
+    root = root or os.environ.get("RDOJO_DATA") or REPO_ROOT
+    workers = max(1, min(workers or multiprocessing.cpu_count(), len(jobs) or 1))
+
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(backend, root))
+    try:
+        reports = pool.map(run_job, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    summary = {"backend": backend, "workers": workers, "jobs": len(jobs),
+               "failed": len([i for i in reports if i["status"] != "ok"]),
+               "wall_time": time.perf_counter() - start,
+               "build_time": sum(i["timings"].get("total", 0.0) for i in reports)}
+    if report:
+        with open(report, 'w') as outfile:
+            json.dump({"summary": summary, "jobs": reports}, outfile, indent=1)
+
+    print("Built {jobs} jobs on {workers} {backend} workers in {wall_time:.2f}s, {failed} failed".format(**summary))
+    for i in reports:
+        if i["status"] != "ok":
+            print("    FAILED {}: {}".format(i["job"]["scene"], i["error"]))
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build SPYDR rigs for many scenes in parallel")
+    parser.add_argument("scenes", nargs="*", help="Scenes to build rigs in")
+    parser.add_argument("--jobs", help="A JSON file with a list of jobs, used instead of scenes")
+    parser.add_argument("--template", default="rig/arm")
+    parser.add_argument("--guides", help="A JSON file with the guide positions")
+    parser.add_argument("--instance", default="Left_")
+    parser.add_argument("--mirror", help="Also build the mirrored side with this prefix")
+    parser.add_argument("--output-dir", help="Save every built scene in this folder")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--backend", choices=sorted(BACKENDS))
+    parser.add_argument("--report", help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    if args.jobs:
+        with open(args.jobs, 'r') as infile:
+            jobs = [make_job(**i) for i in json.load(infile)]
+    else:
+        jobs = []
+        for scene in args.scenes:
+            output = None
+            if args.output_dir:
+                output = os.path.join(args.output_dir, os.path.basename(scene))
+            jobs.append(make_job(scene, template=args.template, guides=args.guides, instance=args.instance,
+                                 mirror=args.mirror, output=output))
+    if not jobs:
+        parser.error("No scenes or jobs to build")
+
+    reports = run_batch(jobs, workers=args.workers, backend=args.backend, report=args.report)
+    return 1 if any(i["status"] != "ok" for i in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+'''
+A BuildPlan records a rig build as a flat list of operations instead of running cmds calls one by one.
+The recorded list can be inspected, diffed and saved, then applied to the scene in a single pass through
+one MDagModifier. Native parent operations keep world positions like cmds.parent, so the modifier is flushed before
+each one to read world matrices, everything else runs in one doIt.
+
+Every operation is a plain dictionary with an "op" key, so a plan is JSON serializable:
+    createNode  - {"op", "type", "name", "parent", "dag"}
+    createJoint - {"op", "name", "parent", "position"} (position is in world space)
+    setAttr     - {"op", "plug", "value"}
+    addAttr     - {"op", "node", "long_name", "attribute_type", "min", "max", "default", "keyable"}
+    connect     - {"op", "source", "destination"}
+    parent      - {"op", "child", "parent"}
+    command     - {"op", "command", "args", "flags"} (any MEL command, queued on the modifier)
+'''
+
+import difflib
+import json
+
+import system.build_session as build_session
+
+
+class BuildPlan(object):
+    '''
+    Records build operations and applies them in one modifier pass
+    '''
+    def __init__(self, name=""):
+        self.name = name
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def __iter__(self):
+        return iter(self.operations)
+
+    def _record(self, op, **kwargs):
+        operation = {"op": op}
+        operation.update(kwargs)
+        self.operations.append(operation)
+        return operation
+
+    ###############
+    ##Recording##
+    ###############
+
+    def create_node(self, node_type, name, parent=None, dag=False):
+        '''
+        Record the creation of a node
+        Args:
+            node_type(String): The Maya node type
+            name(String): The final name of the node
+            parent(String): An optional DAG parent, implies a DAG node
+            dag(Bool): Whether the node is a DAG node
+
+        Returns:
+            name(String): The name of the node
+        '''
+        self._record("createNode", type=node_type, name=name, parent=parent, dag=bool(dag or parent))
+        return name
+
+    def create_joint(self, name, position, parent=None):
+        '''
+        Record the creation of a joint at a world space position
+        Args:
+            name(String): The final name of the joint
+            position(List): World space position
+            parent(String): An optional parent joint
+
+        Returns:
+            name(String): The name of the joint
+        '''
+        self._record("createJoint", name=name, parent=parent, position=[float(i) for i in position])
+        return name
+
+    def create_joint_chain(self, names, positions):
+        '''
+        Record a joint chain where every joint is parented to the previous one, like utils.createJoint
+        Args:
+            names(List): Joint names from parent to child
+            positions(List): World space positions for each joint
+
+        Returns:
+            names(List): The joint names
+        '''
+        parent = None
+        for name, position in zip(names, positions):
+            parent = self.create_joint(name, position, parent=parent)
+        return list(names)
+
+    def set_attr(self, plug, value):
+        self._record("setAttr", plug=plug, value=value)
+
+    def add_attr(self, node, long_name, attribute_type="double", min=None, max=None, default=0.0, keyable=True):
+        self._record("addAttr", node=node, long_name=long_name, attribute_type=attribute_type, min=min, max=max,
+                     default=default, keyable=keyable)
+        return "{}.{}".format(node, long_name)
+
+    def connect(self, source, destination):
+        self._record("connect", source=source, destination=destination)
+
+    def parent(self, child, parent):
+        self._record("parent", child=child, parent=parent)
+
+    def command(self, command, *args, **flags):
+        '''
+        Record any MEL command that has no native modifier equivalent (ikHandle, constraints, matchTransform...)
+        Args:
+            command(String): The MEL command name
+            args: Positional arguments, usually node names
+            flags: Long or short flag names and their values, True for a flag without a value
+
+        '''
+        self._record("command", command=command, args=list(args), flags=flags)
+
+    def create_control(self, name, position=None, match=None, flip=True):
+        '''
+        Record a circle control under a group, the plan equivalent of utils.createControl
+        Args:
+            name(String): The name of the control
+            position(List): World space position of the group
+            match(String): A node to match the group transforms to, used instead of position
+            flip(Bool): Rotate the circle normal like utils.createControl
+
+        Returns:
+            [ctrl_group, [ctrl, make_circle]]: The same structure as utils.createControl
+        '''
+        ctrl_group = self.create_node("transform", "{}_GRP".format(name), dag=True)
+        ctrl = self.create_node("transform", name, parent=ctrl_group)
+        shape = self.create_node("nurbsCurve", "{}Shape".format(name), parent=ctrl)
+        make_circle = self.create_node("makeNurbCircle", "{}_makeNurbCircle".format(name))
+        self.connect("{}.outputCurve".format(make_circle), "{}.create".format(shape))
+        if flip:
+            self.set_attr("{}.normalX".format(make_circle), 90.0)
+        if match:
+            self.command("matchTransform", ctrl_group, match)
+        elif position is not None:
+            self.set_attr("{}.translate".format(ctrl_group), [float(i) for i in position])
+        return [ctrl_group, [ctrl, make_circle]]
+
+    ################
+    ##Inspection##
+    ################
+
+    def count(self):
+        '''
+        Returns:
+            A dictionary of operation counts keyed by op name
+        '''
+        counts = {}
+        for operation in self.operations:
+            counts[operation["op"]] = counts.get(operation["op"], 0) + 1
+        return counts
+
+    def nodes(self):
+        '''
+        Returns:
+            The names of every node the plan creates natively, in creation order
+        '''
+        return [i["name"] for i in self.operations if i["op"] in ("createNode", "createJoint")]
+
+    def lines(self):
+        '''
+        Returns:
+            One stable, human readable line per operation
+        '''
+        return [json.dumps(i, sort_keys=True) for i in self.operations]
+
+    def diff(self, other):
+        '''
+        Diff this plan against another plan
+        Args:
+            other(BuildPlan): The plan to compare with
+
+        Returns:
+            A list of unified diff lines
+        '''
+        return list(difflib.unified_diff(other.lines(), self.lines(), fromfile=other.name or "before",
+                                         tofile=self.name or "after", lineterm=""))
+
+    def to_json(self, fileName):
+        with open(fileName, 'w') as outfile:
+            json.dump({"name": self.name, "operations": self.operations}, outfile, indent=1)
+
+    @classmethod
+    def from_json(cls, fileName):
+        with open(fileName, 'r') as infile:
+            data = json.load(infile)
+        plan = cls(data.get("name", ""))
+        plan.operations = data["operations"]
+        return plan
+
+    ###########
+    ##Apply##
+    ###########
+
+    def apply(self):
+        '''
+        Queue every recorded operation on one MDagModifier and execute them with a single doIt, native parent
+        operations flush the modifier first to read world matrices
+
+        Returns:
+            nodes(Dict): The MObjectHandle of each natively created node keyed by its planned name
+        '''
+        import maya.api.OpenMaya as om2
+
+        modifier = build_session.record_modifier(om2.MDagModifier())
+        nodes = {}
+        positions = {}
+
+        for operation in self.operations:
+            op = operation["op"]
+            if op == "createNode":
+                parent = nodes[operation["parent"]].object() if operation["parent"] in nodes else om2.MObject.kNullObj
+                if operation["dag"]:
+                    node = modifier.createNode(operation["type"], parent)
+                else:
+                    node = om2.MDGModifier.createNode(modifier, operation["type"])
+                modifier.renameNode(node, operation["name"])
+                nodes[operation["name"]] = om2.MObjectHandle(node)
+
+            elif op == "createJoint":
+                parent = operation["parent"]
+                node = modifier.createNode("joint", nodes[parent].object() if parent in nodes else om2.MObject.kNullObj)
+                modifier.renameNode(node, operation["name"])
+                nodes[operation["name"]] = om2.MObjectHandle(node)
+                positions[operation["name"]] = operation["position"]
+                # Joints are created without orientation so the local translation is the offset from the parent
+                local = operation["position"]
+                if parent in positions:
+                    local = [a - b for a, b in zip(operation["position"], positions[parent])]
+                _set_plug(om2, modifier, _find_plug(om2, nodes, operation["name"] + ".translate"), local)
+
+            elif op == "setAttr":
+                plug = _find_plug(om2, nodes, operation["plug"])
+                if plug is not None:
+                    _set_plug(om2, modifier, plug, operation["value"])
+                else:
+                    value = operation["value"]
+                    values = value if isinstance(value, (list, tuple)) else [value]
+                    modifier.commandToExecute("setAttr {} {}".format(_mel_string(operation["plug"]),
+                                                                      " ".join(_mel_value(i) for i in values)))
+
+            elif op == "addAttr":
+                node = nodes.get(operation["node"])
+                if node is not None and operation["attribute_type"] == "double":
+                    attr_fn = om2.MFnNumericAttribute()
+                    attr = attr_fn.create(operation["long_name"], operation["long_name"],
+                                          om2.MFnNumericData.kDouble, operation["default"])
+                    if operation["min"] is not None:
+                        attr_fn.setMin(operation["min"])
+                    if operation["max"] is not None:
+                        attr_fn.setMax(operation["max"])
+                    attr_fn.keyable = operation["keyable"]
+                    modifier.addAttribute(node.object(), attr)
+                else:
+                    modifier.commandToExecute(_mel_command("addAttr", [operation["node"]], {
+                        "longName": operation["long_name"], "attributeType": operation["attribute_type"],
+                        "min": operation["min"], "max": operation["max"], "defaultValue": operation["default"],
+                        "keyable": operation["keyable"]}))
+
+            elif op == "connect":
+                source = _find_plug(om2, nodes, operation["source"])
+                destination = _find_plug(om2, nodes, operation["destination"])
+                if source is not None and destination is not None:
+                    modifier.connect(source, destination)
+                else:
+                    modifier.commandToExecute("connectAttr -f {} {}".format(_mel_string(operation["source"]),
+                                                                            _mel_string(operation["destination"])))
+
+            elif op == "parent":
+                child = nodes.get(operation["child"])
+                parent = nodes.get(operation["parent"])
+                if child is not None and parent is not None:
+                    # Like cmds.parent the child keeps its world position, the queued operations run first so
+                    # the world matrices include anything placed by a command (e.g. matchTransform)
+                    modifier.doIt()
+                    modifier.reparentNode(child.object(), parent.object())
+                    _keep_world(om2, modifier, child.object(), parent.object())
+                else:
+                    modifier.commandToExecute(_mel_command("parent", [operation["child"], operation["parent"]], {}))
+
+            elif op == "command":
+                modifier.commandToExecute(_mel_command(operation["command"], operation["args"], operation["flags"]))
+
+            else:
+                raise RuntimeError("Unknown build plan operation: {}".format(op))
+
+        modifier.doIt()
+        return nodes
+
+
+def _keep_world(om2, modifier, child, parent):
+    '''
+    Queue the local values that keep child where it is in the world once it's under parent
+    Joints take the rotation on their jointOrient, with their rotate and rotateAxis kept
+    '''
+    child_fn = om2.MFnDependencyNode(child)
+    parent_matrix = om2.MDagPath.getAPathTo(parent).inclusiveMatrix()
+    local = om2.MDagPath.getAPathTo(child).inclusiveMatrix() * parent_matrix.inverse()
+    transform = om2.MTransformationMatrix(local)
+
+    translation = transform.translation(om2.MSpace.kTransform)
+    plug = child_fn.findPlug("translate", False)
+    for i in range(3):
+        modifier.newPlugValueMDistance(plug.child(i), om2.MDistance(translation[i], om2.MDistance.kCentimeters))
+    scale = transform.scale(om2.MSpace.kTransform)
+    plug = child_fn.findPlug("scale", False)
+    for i in range(3):
+        modifier.newPlugValueDouble(plug.child(i), scale[i])
+
+    def euler(attr, order=om2.MEulerRotation.kXYZ):
+        rotate = child_fn.findPlug(attr, False)
+        return om2.MEulerRotation([rotate.child(i).asMAngle().asRadians() for i in range(3)], order)
+
+    rotate_order = child_fn.findPlug("rotateOrder", False).asInt()
+    if child.hasFn(om2.MFn.kJoint):
+        # Joint rotation is rotateAxis * rotate * jointOrient, the orient takes whatever the other two don't
+        channels = euler("rotateAxis").asMatrix() * euler("rotate", rotate_order).asMatrix()
+        rotation = om2.MTransformationMatrix(channels.inverse() * transform.asRotateMatrix()).rotation()
+        attr = "jointOrient"
+    else:
+        rotation = transform.rotation().reorder(rotate_order)
+        attr = "rotate"
+    plug = child_fn.findPlug(attr, False)
+    for i in range(3):
+        modifier.newPlugValueMAngle(plug.child(i), om2.MAngle(rotation[i], om2.MAngle.kRadians))
+
+
+def _find_plug(om2, nodes, plug_name):
+    '''
+    Find the plug of a natively created node, returns None when the plug has to go through a MEL command instead
+    (nodes created by commands, array elements and dynamic attributes that only exist after doIt)
+    '''
+    node_name, _, attr = plug_name.partition(".")
+    if node_name not in nodes or "[" in attr or "." in attr:
+        return None
+    try:
+        return om2.MFnDependencyNode(nodes[node_name].object()).findPlug(attr, False)
+    except RuntimeError:
+        return None
+
+
+def _set_plug(om2, modifier, plug, value):
+    attr = plug.attribute()
+    # Matrices are set whole from their 16 values, strings as string data
+    if attr.hasFn(om2.MFn.kMatrixAttribute) or (attr.hasFn(om2.MFn.kTypedAttribute) and
+                                                 om2.MFnTypedAttribute(attr).attrType() == om2.MFnData.kMatrix):
+        modifier.newPlugValue(plug, om2.MFnMatrixData().create(om2.MMatrix([float(i) for i in value])))
+        return
+    if attr.hasFn(om2.MFn.kTypedAttribute) and om2.MFnTypedAttribute(attr).attrType() == om2.MFnData.kString:
+        modifier.newPlugValueString(plug, str(value))
+        return
+
+    # Compound plugs like translate are set child by child
+    if isinstance(value, (list, tuple)):
+        for i, e in enumerate(value):
+            _set_plug(om2, modifier, plug.child(i), e)
+        return
+
+    if attr.hasFn(om2.MFn.kUnitAttribute):
+        unit_type = om2.MFnUnitAttribute(attr).unitType()
+        if unit_type == om2.MFnUnitAttribute.kAngle:
+            modifier.newPlugValueMAngle(plug, om2.MAngle(value, om2.MAngle.kDegrees))
+            return
+        if unit_type == om2.MFnUnitAttribute.kDistance:
+            modifier.newPlugValueMDistance(plug, om2.MDistance(value, om2.MDistance.uiUnit()))
+            return
+    elif attr.hasFn(om2.MFn.kEnumAttribute):
+        modifier.newPlugValueInt(plug, int(value))
+        return
+    elif attr.hasFn(om2.MFn.kNumericAttribute):
+        numeric_type = om2.MFnNumericAttribute(attr).numericType()
+        if numeric_type == om2.MFnNumericData.kBoolean:
+            modifier.newPlugValueBool(plug, bool(value))
+            return
+        if numeric_type in (om2.MFnNumericData.kByte, om2.MFnNumericData.kChar, om2.MFnNumericData.kShort,
+                            om2.MFnNumericData.kInt, om2.MFnNumericData.kLong):
+            modifier.newPlugValueInt(plug, int(value))
+            return
+    modifier.newPlugValueDouble(plug, float(value))
+
+
+def _mel_string(value):
+    return '"{}"'.format(str(value).replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def _mel_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return _mel_string(value)
+
+
+def _mel_command(command, args, flags):
+    '''
+    Build a MEL command string from a command name, positional arguments and flags
+    '''
+    parts = [command]
+    for flag, value in sorted(flags.items()):
+        if value is None or value is False:
+            continue
+        parts.append("-{}".format(flag))
+        if value is True:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        parts.extend(_mel_value(i) for i in values)
+    parts.extend(_mel_string(i) for i in args)
+    return " ".join(parts)
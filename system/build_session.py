@@ -0,0 +1,172 @@
+'''
+Build session: the scene state a rig build should run in.
+While a session is open the viewport doesn't refresh, the undo queue either records the whole build as one chunk or
+is turned off, the evaluation manager is switched to DG so it doesn't rebuild its graph after every new node and
+connection, and cycle checking is off. Everything is put back the way it was when the session ends, even if the
+build raises.
+
+    with build_session.build_session("Left_arm"):
+        ...
+or as a decorator, sessions opened inside a session do nothing so builders can call each other:
+    @build_session.build_session("fk_ik_hinge")
+    def fk_ik_hinge(base_joint):
+        ...
+Set SPYDR_BUILD_SESSION=0 (or ENABLED = False) to build without sessions, e.g. to measure what they save.
+
+Rollback (rollback=True with undo="chunk") covers:
+    - every maya.cmds and PyMEL edit, through the session's undo chunk
+    - OpenMaya edits registered with record_modifier (MDGModifier/MDagModifier) and record_nodes (nodes made by an
+      MFn create call), which the undo queue never sees. The builders in system/ register theirs, code that makes
+      its own modifiers has to do the same or its edits are left in the scene
+The undo chunk is undone first, then the registered edits from last to first, so cmds edits made on nodes an
+OpenMaya edit created are gone before those nodes are deleted.
+'''
+
+import contextlib
+import os
+
+ENABLED = os.environ.get("SPYDR_BUILD_SESSION", "1") != "0"
+
+UNDO_MODES = ["chunk", "off", "on"]
+
+# Sessions opened inside a session are no-ops
+_depth = 0
+# OpenMaya edits of the outermost session in the order they were made, modifiers and MObjectHandles of created nodes.
+# Only recorded while a real session that can roll back is open, disabled and nested sessions only count depth
+_api_edits = []
+_recording = False
+
+
+@contextlib.contextmanager
+def build_session(name="SPYDR_build", undo="chunk", refresh=False, evaluation="off", cycle_check=False,
+                  rollback=False):
+    '''
+    Open a build session
+    Args:
+        name(String): The undo chunk name
+        undo(String): "chunk" to undo the whole build in one step, "off" to not record it at all, "on" to leave
+                      the undo queue alone
+        refresh(Bool): Keep refreshing the viewport
+        evaluation(String): Evaluation manager mode for the build, "off" is DG evaluation, None leaves it alone
+        cycle_check(Bool): Keep checking for cycles on every connection
+        rollback(Bool): Undo the partial build if it raises, only with undo="chunk", see the module docstring for
+                        what it covers
+    '''
+    global _depth, _recording
+    if undo not in UNDO_MODES:
+        raise RuntimeError("Undo mode must be one of {}".format(", ".join(UNDO_MODES)))
+    if not ENABLED or _depth:
+        _depth += 1
+        try:
+            yield
+        finally:
+            _depth -= 1
+        return
+
+    import maya.cmds as cmds
+
+    _depth += 1
+    del _api_edits[:]
+    _recording = rollback and undo == "chunk"
+    restore = []
+    failed = False
+    try:
+        if not refresh:
+            cmds.refresh(suspend=True)
+            restore.append(lambda: cmds.refresh(suspend=False))
+
+        if undo == "chunk":
+            cmds.undoInfo(openChunk=True, chunkName=name)
+            restore.append(lambda: cmds.undoInfo(closeChunk=True))
+        elif undo == "off":
+            undo_state = cmds.undoInfo(query=True, state=True)
+            cmds.undoInfo(stateWithoutFlush=False)
+            restore.append(lambda: cmds.undoInfo(stateWithoutFlush=undo_state))
+
+        if evaluation is not None:
+            mode = cmds.evaluationManager(query=True, mode=True)[0]
+            if mode != evaluation:
+                cmds.evaluationManager(mode=evaluation)
+                # The graph is rebuilt once for the finished rig instead of after every change
+                restore.append(lambda: cmds.evaluationManager(invalidate=True))
+                restore.append(lambda: cmds.evaluationManager(mode=mode))
+
+        if not cycle_check:
+            cycle_state = cmds.cycleCheck(query=True, evaluation=True)
+            cmds.cycleCheck(evaluation=False)
+            restore.append(lambda: cmds.cycleCheck(evaluation=cycle_state))
+
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _depth -= 1
+        # Put everything back in reverse order, one failing restore doesn't stop the others
+        errors = []
+        for i in reversed(restore):
+            try:
+                i()
+            except Exception as error:
+                errors.append(error)
+        if failed and rollback and undo == "chunk":
+            cmds.undo()
+            _undo_api_edits()
+        _recording = False
+        del _api_edits[:]
+        if errors and not failed:
+            raise errors[0]
+
+
+def record_modifier(modifier):
+    '''
+    Register a modifier with the open rollback session so a rollback can undo it, call it before its first doIt.
+    Outside of a session with rollback on nothing is kept
+    Args:
+        modifier(MDGModifier): An MDGModifier or MDagModifier
+
+    Returns:
+        modifier(MDGModifier): The same modifier
+    '''
+    if _recording:
+        _api_edits.append(modifier)
+    return modifier
+
+
+def record_nodes(*nodes):
+    '''
+    Register nodes made outside a modifier, e.g. by MFnNurbsCurve.create, so a rollback can delete them. Outside of
+    a session with rollback on nothing is kept
+    Args:
+        nodes(MObject): The created nodes
+    '''
+    if _recording:
+        import maya.api.OpenMaya as om2
+        _api_edits.extend(om2.MObjectHandle(i) for i in nodes)
+
+
+def _undo_api_edits():
+    '''
+    Undo the registered OpenMaya edits from last to first, edits on nodes the undo chunk already removed are skipped
+    '''
+    import maya.api.OpenMaya as om2
+    import maya.cmds as cmds
+
+    failures = 0
+    for edit in reversed(_api_edits):
+        try:
+            if isinstance(edit, om2.MObjectHandle):
+                if edit.isValid():
+                    modifier = om2.MDagModifier()
+                    modifier.deleteNode(edit.object())
+                    modifier.doIt()
+            else:
+                edit.undoIt()
+        except RuntimeError:
+            failures += 1
+    if failures:
+        cmds.warning("Rollback couldn't undo {} OpenMaya edits, check the scene for leftovers".format(failures))
+
+
+def in_session():
+    return _depth > 0
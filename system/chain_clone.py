@@ -0,0 +1,167 @@
+'''
+Single pass joint chain cloning.
+Any number of copies of a chain (blend, FK, IK...) are created through one MDagModifier with their final names and
+parents, instead of duplicating, renaming and reparenting every copy joint by joint. The joint attributes of the
+source are read once and written to every copy. The root of each copy keeps the world transform of the source root,
+like a duplicate parented to the world.
+
+    blend, fk, ik = chain_clone.clone_chain_types(["L_arm_JNT"], ["_BLEND", "_FK", "_IK"])
+'''
+
+import system.build_session as build_session
+import system.naming as naming
+
+# Joint attributes copied to every clone, translate and jointOrient of the roots are solved from world matrices
+ATTRS = ["translate", "rotate", "jointOrient", "rotateAxis", "scale", "rotateOrder", "preferredAngle",
+         "segmentScaleCompensate", "radius", "inheritsTransform"]
+
+
+def source_chain(base_joint):
+    '''
+    The joints a copy is made of, like the components take them
+    Args:
+        base_joint(List): One joint for it and every joint below it, or an explicit chain of joints
+
+    Returns:
+        The full paths of the source joints
+    '''
+    import system.hierarchy as hierarchy
+
+    base_joint = [str(i) for i in base_joint]
+    if len(base_joint) == 1:
+        return hierarchy.get_index().chain(base_joint[0])
+    return [hierarchy.get_index().path(i) for i in base_joint]
+
+
+def _copy_plug(om2, modifier, source, target):
+    '''
+    Queue the value of one plug onto another, compounds child by child
+    '''
+    if source.isCompound:
+        for i in range(source.numChildren()):
+            _copy_plug(om2, modifier, source.child(i), target.child(i))
+        return
+    attr = source.attribute()
+    if attr.hasFn(om2.MFn.kUnitAttribute):
+        unit_type = om2.MFnUnitAttribute(attr).unitType()
+        if unit_type == om2.MFnUnitAttribute.kAngle:
+            modifier.newPlugValueMAngle(target, source.asMAngle())
+        elif unit_type == om2.MFnUnitAttribute.kDistance:
+            modifier.newPlugValueMDistance(target, source.asMDistance())
+        else:
+            modifier.newPlugValueDouble(target, source.asDouble())
+    elif attr.hasFn(om2.MFn.kEnumAttribute):
+        modifier.newPlugValueInt(target, source.asInt())
+    elif om2.MFnNumericAttribute(attr).numericType() == om2.MFnNumericData.kBoolean:
+        modifier.newPlugValueBool(target, source.asBool())
+    else:
+        modifier.newPlugValueDouble(target, source.asDouble())
+
+
+def _root_values(om2, path, source_fn, parent_matrix):
+    '''
+    Translate and jointOrient that keep a copied joint where its source is, under a new parent
+    '''
+    local = path.inclusiveMatrix() * parent_matrix.inverse()
+    transform = om2.MTransformationMatrix(local)
+    translate = transform.translation(om2.MSpace.kTransform)
+
+    # Joint rotation is rotateAxis * rotate * jointOrient, the orient takes whatever rotate and rotateAxis don't
+    def euler(attr, order=om2.MEulerRotation.kXYZ):
+        plug = source_fn.findPlug(attr, False)
+        return om2.MEulerRotation([plug.child(i).asMAngle().asRadians() for i in range(3)], order)
+
+    rotate = euler("rotate", source_fn.findPlug("rotateOrder", False).asInt()).asMatrix()
+    rotate_axis = euler("rotateAxis").asMatrix()
+    rotation = transform.asRotateMatrix()
+    orient = om2.MTransformationMatrix((rotate_axis * rotate).inverse() * rotation).rotation()
+    return translate, orient
+
+
+def clone_chains(joints, names, parent=None, linear=False):
+    '''
+    Create copies of a chain in one pass
+    Args:
+        joints(List): Source joint names, parents before children, joints whose parent isn't in the list are roots
+        names(List): One list of new names per copy, in the order of joints
+        parent(String): The parent of the copy roots, the world by default
+        linear(Bool): Parent every joint to the one before it, for explicit chains that skip joints in between
+
+    Returns:
+        copies(List): The joint names of every copy
+    '''
+    import maya.api.OpenMaya as om2
+
+    selection = om2.MSelectionList()
+    for joint in joints:
+        selection.add(str(joint))
+    paths = [selection.getDagPath(i) for i in range(len(joints))]
+    sources = [om2.MFnDependencyNode(i.node()) for i in paths]
+    full_paths = [i.fullPathName() for i in paths]
+    source_parents = [i.rsplit("|", 1)[0] for i in full_paths]
+    if linear:
+        parents = [None] + list(range(len(joints) - 1))
+    else:
+        parents = [full_paths.index(i) if i in full_paths else None for i in source_parents]
+
+    parent_obj = om2.MObject.kNullObj
+    parent_matrix = om2.MMatrix()
+    if parent is not None:
+        parent_selection = om2.MSelectionList()
+        parent_selection.add(str(parent))
+        parent_obj = parent_selection.getDependNode(0)
+        parent_matrix = parent_selection.getDagPath(0).inclusiveMatrix()
+
+    # Joints under a different parent than their source are solved once and shared by every copy
+    moved = {}
+    for i, p in enumerate(parents):
+        if p is None:
+            moved[i] = _root_values(om2, paths[i], sources[i], parent_matrix)
+        elif full_paths[p] != source_parents[i]:
+            moved[i] = _root_values(om2, paths[i], sources[i], paths[p].inclusiveMatrix())
+
+    modifier = build_session.record_modifier(om2.MDagModifier())
+    copies = []
+    for copy_names in names:
+        if len(copy_names) != len(joints):
+            raise RuntimeError("Expected {} names for the copy, got {}".format(len(joints), len(copy_names)))
+        created = []
+        for i, source in enumerate(sources):
+            joint = modifier.createNode("joint", created[parents[i]] if parents[i] is not None else parent_obj)
+            modifier.renameNode(joint, copy_names[i])
+            target = om2.MFnDependencyNode(joint)
+            for attr in ATTRS:
+                _copy_plug(om2, modifier, source.findPlug(attr, False), target.findPlug(attr, False))
+            if i in moved:
+                translate, orient = moved[i]
+                for axis in range(3):
+                    modifier.newPlugValueMDistance(target.findPlug("translate", False).child(axis),
+                                                   om2.MDistance(translate[axis], om2.MDistance.kCentimeters))
+                    modifier.newPlugValueMAngle(target.findPlug("jointOrient", False).child(axis),
+                                                om2.MAngle(orient[axis], om2.MAngle.kRadians))
+            created.append(joint)
+        copies.append(created)
+    modifier.doIt()
+
+    return [[om2.MFnDependencyNode(i).name() for i in copy] for copy in copies]
+
+
+def clone_chain_types(base_joint, chain_types, parent=None):
+    '''
+    Copies of a chain named by chain type, e.g. "L_arm_JNT" -> "L_arm_FK_JNT", names are checked for collisions
+    all at once before anything is created
+    Args:
+        base_joint(List): One joint for it and every joint below it, or an explicit chain of joints
+        chain_types(List): One chain type per copy, e.g. ["_BLEND", "_FK", "_IK"]
+
+    Returns:
+        copies(List): The joint names of every copy, in chain_types order
+    '''
+    joints = source_chain(base_joint)
+    short_names = [i.rsplit("|", 1)[-1] for i in joints]
+    names = [naming.chain_names(short_names, i) for i in chain_types]
+    naming.check_collisions([name for copy in names for name in copy])
+
+    copies = clone_chains(joints, names, parent, linear=len(base_joint) > 1)
+    naming.get_scene_index().reserve([name for copy in copies for name in copy])
+    return copies
@@ -0,0 +1,136 @@
+'''
+Constraint builder that hands back the target weight plugs.
+Weight plugs are read from the constraint's weightAliasList, one query per constraint, and cached by node, so wiring a
+switch into a constraint costs O(targets) instead of listing every attribute on it. Plugs come back in target order,
+the order the targets were given in, never by attribute position.
+
+    constraint, weights = constraints.constrain("parentConstraint", ["L_arm_IK_JNT", "L_arm_FK_JNT"], "L_arm_JNT",
+                                                maintainOffset=True)
+    cmds.connectAttr("L_arm_settings_CTRL.IK_FK", weights[1])
+'''
+
+CONSTRAINT_TYPES = ["parentConstraint", "pointConstraint", "orientConstraint", "scaleConstraint", "aimConstraint",
+                    "poleVectorConstraint"]
+
+
+class WeightCache(object):
+    '''
+    Target weight aliases keyed by the constraint's MObjectHandle, so a renamed constraint keeps its entry and a
+    constraint deleted and made again under the same name is queried again. Plug names are made with the current name
+    '''
+    def __init__(self):
+        self._aliases = {}
+
+    def weights(self, constraint):
+        import maya.api.OpenMaya as om2
+
+        node = _node(om2, constraint)
+        name = _name(om2, node)
+        key = om2.MObjectHandle(node).hashCode()
+        entry = self._aliases.get(key)
+        # Hash codes of deleted nodes get reused, the entry must still point at this node
+        if entry is None or not entry[0].isValid() or entry[0].object() != node:
+            entry = (om2.MObjectHandle(node), self._query(name))
+            self._aliases[key] = entry
+        return ["{}.{}".format(name, i) for i in entry[1]]
+
+    def _query(self, constraint):
+        import maya.cmds as cmds
+
+        constraint_type = cmds.nodeType(constraint)
+        if constraint_type not in CONSTRAINT_TYPES:
+            raise RuntimeError("{} is not a supported constraint, it's a {}".format(constraint, constraint_type))
+        return getattr(cmds, constraint_type)(constraint, query=True, weightAliasList=True) or []
+
+    def forget(self, constraint):
+        '''
+        Drop a constraint whose targets changed, it's queried again on next use
+        '''
+        import maya.api.OpenMaya as om2
+
+        try:
+            node = _node(om2, constraint)
+        except RuntimeError:
+            return
+        self._aliases.pop(om2.MObjectHandle(node).hashCode(), None)
+
+    def invalidate(self, *args):
+        self._aliases = {}
+
+
+def _node(om2, constraint):
+    selection = om2.MSelectionList()
+    try:
+        selection.add(str(constraint))
+    except RuntimeError:
+        raise RuntimeError("{} doesn't exist".format(constraint))
+    return selection.getDependNode(0)
+
+
+def _name(om2, node):
+    # Constraints are DAG nodes, the partial path stays unique when the short name isn't
+    if node.hasFn(om2.MFn.kDagNode):
+        return om2.MDagPath.getAPathTo(node).partialPathName()
+    return om2.MFnDependencyNode(node).name()
+
+
+_weight_cache = None
+
+
+def get_weight_cache():
+    '''
+    Get the shared weight plug cache, it is invalidated whenever a scene is opened or a new scene is made
+    '''
+    global _weight_cache
+    if _weight_cache is None:
+        _weight_cache = WeightCache()
+        try:
+            import maya.api.OpenMaya as om2
+            for message in [om2.MSceneMessage.kAfterOpen, om2.MSceneMessage.kAfterNew]:
+                om2.MSceneMessage.addCallback(message, _weight_cache.invalidate)
+        except ImportError:
+            pass
+    return _weight_cache
+
+
+def weight_plugs(constraint):
+    '''
+    The target weight plugs of a constraint
+    Returns:
+        plugs(List): "constraint.targetW0" style plug names in target order
+    '''
+    return get_weight_cache().weights(constraint)
+
+
+def weight_plug(constraint, index):
+    '''
+    The weight plug of one target, by its position in the target list
+    '''
+    plugs = weight_plugs(constraint)
+    if not -len(plugs) <= index < len(plugs):
+        raise IndexError("{} has {} targets, no target {}".format(constraint, len(plugs), index))
+    return plugs[index]
+
+
+def constrain(constraint_type, targets, driven, **kwargs):
+    '''
+    Create a constraint and get its weight plugs with it
+    Args:
+        constraint_type(String): The constraint command, e.g. "parentConstraint"
+        targets(List): The target nodes, in the order their weight plugs are returned
+        driven: The constrained node
+        kwargs: Passed on to the constraint command
+
+    Returns:
+        constraint(String): The constraint node
+        plugs(List): The weight plug of each target
+    '''
+    import maya.cmds as cmds
+
+    if constraint_type not in CONSTRAINT_TYPES:
+        raise RuntimeError("Unknown constraint type: {}".format(constraint_type))
+    constraint = getattr(cmds, constraint_type)(*[str(i) for i in list(targets) + [driven]], **kwargs)[0]
+    # Adding targets to an existing constraint returns that constraint, its old entry is stale
+    cache = get_weight_cache()
+    cache.forget(constraint)
+    return constraint, cache.weights(constraint)
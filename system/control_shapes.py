@@ -0,0 +1,161 @@
+'''
+Control shape library.
+Every control shape is kept as a preloaded (N, 3) float array of CVs. Scale and orientation are applied to the arrays
+before the curves are made, and any number of shapes is created in one pass through MFnNurbsCurve.create, so a control
+comes out of the library finished, without makeIdentity or CV cleanup afterwards.
+
+    ik_ctrl, pv_ctrl = control_shapes.create_shapes([("cube", "L_wrist_CTRL", 30), ("sphere", "L_wrist_PV", 7)])
+'''
+
+import numpy as np
+
+import system.build_session as build_session
+
+
+class Shape(object):
+    '''
+    CV positions of a control at unit size
+    Args:
+        points: (N, 3) CV positions
+        degree(Int): 1 for linear shapes, 3 for smooth ones
+        periodic(Bool): Closed smooth shape, the first degree CVs are repeated at the end when it's created
+        knots: Explicit knots, uniform knots are made when None
+    '''
+    def __init__(self, points, degree=1, periodic=False, knots=None):
+        self.points = np.array(points, dtype=np.float64).reshape(-1, 3)
+        self.degree = degree
+        self.periodic = periodic
+        self._knots = None if knots is None else np.array(knots, dtype=np.float64)
+
+    def cvs(self):
+        if self.periodic:
+            return np.concatenate([self.points, self.points[:self.degree]])
+        return self.points
+
+    def knots(self):
+        if self._knots is not None:
+            return self._knots
+        count = len(self.cvs()) + self.degree - 1
+        if self.periodic:
+            return np.arange(count, dtype=np.float64) - (self.degree - 1)
+        # Open curves repeat their end knots degree times
+        spans = len(self.points) - self.degree
+        return np.concatenate([np.zeros(self.degree - 1), np.arange(spans + 1), np.full(self.degree - 1, spans)])
+
+
+def _ring(radius, count, first, second, start=0.0, stop=2 * np.pi, endpoint=True):
+    '''
+    Points on a circle spanned by the unit vectors first and second, starting on first
+    '''
+    angles = np.linspace(start, stop, count + 1 if endpoint else count, endpoint=endpoint)
+    return radius * (np.cos(angles)[:, np.newaxis] * np.array(first) +
+                     np.sin(angles)[:, np.newaxis] * np.array(second))
+
+
+def _sphere(radius=3.21, segments=16):
+    '''
+    Four meridians through the poles, then a quarter arc down to the equator and around it, as one linear curve
+    '''
+    up = [0.0, 1.0, 0.0]
+    diagonal = np.sqrt(0.5)
+    meridians = [[0.0, 0.0, 1.0], [-diagonal, 0.0, diagonal], [-1.0, 0.0, 0.0], [-diagonal, 0.0, -diagonal]]
+    points = [_ring(radius, segments, up, i)[:-1] for i in meridians]
+    points.append(_ring(radius, segments // 4, up, [1.0, 0.0, 0.0], stop=np.pi / 2))
+    points.append(_ring(radius, segments, [1.0, 0.0, 0.0], [0.0, 0.0, 1.0])[1:])
+    return np.concatenate(points)
+
+
+SHAPES = {
+    "cube": Shape([[0.5, 0.5, 0.5], [0.5, -0.5, 0.5], [-0.5, -0.5, 0.5], [-0.5, 0.5, 0.5], [0.5, 0.5, 0.5],
+                   [0.5, 0.5, -0.5], [0.5, -0.5, -0.5], [0.5, -0.5, 0.5], [-0.5, -0.5, 0.5], [-0.5, -0.5, -0.5],
+                   [0.5, -0.5, -0.5], [0.5, 0.5, -0.5], [-0.5, 0.5, -0.5], [-0.5, -0.5, -0.5], [-0.5, 0.5, -0.5],
+                   [-0.5, 0.5, 0.5]]),
+    "sphere": Shape(_sphere()),
+    "pyramid": Shape([[1, 0, -1], [1, 0, 1], [0, 1.391788, 0], [1, 0, -1], [-1, 0, -1], [0, 1.391788, 0],
+                      [1, 0, 1], [-1, 0, 1], [0, 1.391788, 0], [-1, 0, -1], [-1, 0, 1]]),
+    # Eight CVs around the Z axis
+    "circle": Shape(_ring(1.0, 8, [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], endpoint=False), degree=3, periodic=True),
+    "square": Shape([[1, 0, 1], [1, 0, -1], [-1, 0, -1], [-1, 0, 1], [1, 0, 1]]),
+}
+
+
+def rotation_matrix(rotation):
+    '''
+    The XYZ rotate order matrix of euler rotations in degrees, for row vectors
+    '''
+    x, y, z = np.radians(rotation)
+    rx = np.array([[1, 0, 0], [0, np.cos(x), np.sin(x)], [0, -np.sin(x), np.cos(x)]])
+    ry = np.array([[np.cos(y), 0, -np.sin(y)], [0, 1, 0], [np.sin(y), 0, np.cos(y)]])
+    rz = np.array([[np.cos(z), np.sin(z), 0], [-np.sin(z), np.cos(z), 0], [0, 0, 1]])
+    return rx.dot(ry).dot(rz)
+
+
+def shape_points(shape, scale=1.0, rotation=None, offset=None):
+    '''
+    The CVs of a library shape, scaled, rotated and offset
+    Args:
+        shape(String): A SHAPES key, or a Shape
+        scale: A uniform scale or a per axis [x, y, z] scale
+        rotation(List): XYZ euler rotation in degrees
+        offset(List): Added after scale and rotation
+
+    Returns:
+        cvs: (N, 3) array, periodic shapes include the repeated CVs
+    '''
+    shape = SHAPES[shape] if isinstance(shape, str) else shape
+    points = shape.cvs() * np.asarray(scale, dtype=np.float64)
+    if rotation is not None:
+        points = points.dot(rotation_matrix(rotation))
+    if offset is not None:
+        points = points + np.asarray(offset, dtype=np.float64)
+    return points
+
+
+def create_shapes(specs, parent=None):
+    '''
+    Create controls from the library in one pass
+    Args:
+        specs(List): (shape, name) or (shape, name, scale) or (shape, name, scale, rotation) for each control
+        parent(String): An optional parent for every control
+
+    Returns:
+        controls(List): The names of the control transforms
+    '''
+    import maya.api.OpenMaya as om2
+
+    parent_obj = om2.MObject.kNullObj
+    if parent is not None:
+        selection = om2.MSelectionList()
+        selection.add(str(parent))
+        parent_obj = selection.getDependNode(0)
+
+    modifier = build_session.record_modifier(om2.MDagModifier())
+    transforms = []
+    for spec in specs:
+        transform = modifier.createNode("transform", parent_obj)
+        modifier.renameNode(transform, spec[1])
+        transforms.append(transform)
+    modifier.doIt()
+
+    curve_fn = om2.MFnNurbsCurve()
+    rename = build_session.record_modifier(om2.MDGModifier())
+    for spec, transform in zip(specs, transforms):
+        shape = SHAPES[spec[0]] if isinstance(spec[0], str) else spec[0]
+        cvs = shape_points(shape, *spec[2:])
+        form = om2.MFnNurbsCurve.kPeriodic if shape.periodic else om2.MFnNurbsCurve.kOpen
+        curve = curve_fn.create([om2.MPoint(*i) for i in cvs.tolist()], shape.knots().tolist(), shape.degree, form,
+                                False, False, transform)
+        build_session.record_nodes(curve)
+        rename.renameNode(curve, "{}Shape".format(spec[1]))
+    rename.doIt()
+
+    return [om2.MFnDependencyNode(i).name() for i in transforms]
+
+
+def create_control(shape, name, scale=1.0, rotation=None, parent=None):
+    '''
+    Create one control from the library
+    Returns:
+        control(String): The name of the control transform
+    '''
+    return create_shapes([(shape, name, scale, rotation)], parent)[0]
@@ -0,0 +1,184 @@
+'''
+Glyph cache for curve text controls.
+The outline of each character is generated once per font with textCurves, read into arrays and kept, so labelling
+hundreds of controls makes no type nodes after the first use of each character. Labels are assembled by offsetting
+the cached glyphs along X and creating all their contours as curve shapes under one transform.
+
+    label = curve_text.make_label("Thumb", name="L_thumb_LABEL")
+    curve_text.get_cache().save("arial_glyphs.npz")    # and GlyphCache.load to skip textCurves entirely
+'''
+
+import numpy as np
+
+import system.build_session as build_session
+
+DEFAULT_FONT = "Arial"
+
+_cache = None
+
+
+class Glyph(object):
+    '''
+    The contours of one character at the textCurves size
+    Args:
+        contours(List): (degree, form, cvs, knots) for each contour, cvs as an (N, 3) array
+        advance(Float): How far along X the next character starts
+    '''
+    def __init__(self, contours, advance):
+        self.contours = contours
+        self.advance = advance
+
+
+class GlyphCache(object):
+    '''
+    Glyphs keyed by (font, character)
+    '''
+    def __init__(self):
+        self.glyphs = {}
+
+    def __len__(self):
+        return len(self.glyphs)
+
+    def glyph(self, character, font=DEFAULT_FONT):
+        key = (font, character)
+        if key not in self.glyphs:
+            self.glyphs[key] = self._generate(character, font)
+        return self.glyphs[key]
+
+    def _generate(self, character, font):
+        '''
+        Read a character's outline from textCurves, an "I" is written after it to measure its advance
+        '''
+        import maya.cmds as cmds
+        import maya.api.OpenMaya as om2
+
+        top = cmds.textCurves(font=font, text=character + "I", constructionHistory=False)[0]
+        try:
+            characters = cmds.listRelatives(top, children=True, type="transform", fullPath=True) or []
+            advance = cmds.getAttr(characters[-1] + ".translateX") if characters else 0.0
+            shapes = cmds.listRelatives(characters[:-1], allDescendents=True, type="nurbsCurve", fullPath=True) or []
+
+            selection = om2.MSelectionList()
+            for shape in shapes:
+                selection.add(shape)
+            contours = []
+            for i in range(selection.length()):
+                curve = om2.MFnNurbsCurve(selection.getDagPath(i))
+                cvs = np.array([[p.x, p.y, p.z] for p in curve.cvPositions(om2.MSpace.kWorld)], dtype=np.float64)
+                contours.append((curve.degree, curve.form, cvs, np.array(curve.knots(), dtype=np.float64)))
+        finally:
+            cmds.delete(top)
+        return Glyph(contours, advance)
+
+    def layout(self, text, font=DEFAULT_FONT, size=1.0, spacing=0.0):
+        '''
+        Offset the glyphs of a label into place
+        Args:
+            text(String): The label
+            size(Float): Scale of the label, 1 is the textCurves size
+            spacing(Float): Extra space after each character, in label units before size
+
+        Returns:
+            contours(List): (degree, form, cvs, knots) for every contour of the label
+            width(Float): The label width
+        '''
+        contours = []
+        offset = 0.0
+        for character in text:
+            glyph = self.glyph(character, font)
+            for degree, form, cvs, knots in glyph.contours:
+                contours.append((degree, form, (cvs + [offset, 0.0, 0.0]) * size, knots))
+            offset += glyph.advance + spacing
+        return contours, max(offset - spacing, 0.0) * size
+
+    ########
+    ##File##
+    ########
+
+    def save(self, fileName):
+        '''
+        Write the cache as flat arrays, contour CVs and knots are concatenated with offsets
+        '''
+        keys, advances, glyph_offsets = [], [], [0]
+        degrees, forms, cv_offsets, knot_offsets = [], [], [0], [0]
+        cvs, knots = [], []
+        for (font, character), glyph in self.glyphs.items():
+            keys.append([font, character])
+            advances.append(glyph.advance)
+            for degree, form, contour_cvs, contour_knots in glyph.contours:
+                degrees.append(degree)
+                forms.append(form)
+                cvs.append(contour_cvs)
+                knots.append(contour_knots)
+                cv_offsets.append(cv_offsets[-1] + len(contour_cvs))
+                knot_offsets.append(knot_offsets[-1] + len(contour_knots))
+            glyph_offsets.append(len(degrees))
+
+        np.savez_compressed(fileName, keys=np.array(keys, dtype=np.str_).reshape(-1, 2),
+                            advances=np.array(advances, dtype=np.float64),
+                            glyph_offsets=np.array(glyph_offsets, dtype=np.int32),
+                            degrees=np.array(degrees, dtype=np.int32), forms=np.array(forms, dtype=np.int32),
+                            cv_offsets=np.array(cv_offsets, dtype=np.int32),
+                            knot_offsets=np.array(knot_offsets, dtype=np.int32),
+                            cvs=np.concatenate(cvs) if cvs else np.zeros((0, 3)),
+                            knots=np.concatenate(knots) if knots else np.zeros(0))
+
+    @classmethod
+    def load(cls, fileName):
+        cache = cls()
+        with np.load(fileName, allow_pickle=False) as data:
+            a = {i: data[i] for i in data.files}
+        for g, (font, character) in enumerate(a["keys"].tolist()):
+            contours = []
+            for c in range(a["glyph_offsets"][g], a["glyph_offsets"][g + 1]):
+                contours.append((int(a["degrees"][c]), int(a["forms"][c]),
+                                 a["cvs"][a["cv_offsets"][c]:a["cv_offsets"][c + 1]],
+                                 a["knots"][a["knot_offsets"][c]:a["knot_offsets"][c + 1]]))
+            cache.glyphs[(font, character)] = Glyph(contours, float(a["advances"][g]))
+        return cache
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = GlyphCache()
+    return _cache
+
+
+def make_label(text, name=None, font=DEFAULT_FONT, size=1.0, spacing=0.0, center=True, parent=None):
+    '''
+    Create a curve text label from cached glyphs
+    Args:
+        text(String): The label
+        name(String): The transform name, the text with a _TXT suffix by default
+        center(Bool): Center the label on the transform along X
+
+    Returns:
+        label(String): The label transform, every contour is one of its curve shapes
+    '''
+    import maya.api.OpenMaya as om2
+
+    contours, width = get_cache().layout(text, font, size, spacing)
+    name = name or "{}_TXT".format("".join(i if i.isalnum() else "_" for i in text))
+
+    parent_obj = om2.MObject.kNullObj
+    if parent is not None:
+        selection = om2.MSelectionList()
+        selection.add(str(parent))
+        parent_obj = selection.getDependNode(0)
+    modifier = build_session.record_modifier(om2.MDagModifier())
+    transform = modifier.createNode("transform", parent_obj)
+    modifier.renameNode(transform, name)
+    modifier.doIt()
+
+    shift = np.array([width / 2.0 if center else 0.0, 0.0, 0.0])
+    curve_fn = om2.MFnNurbsCurve()
+    rename = build_session.record_modifier(om2.MDGModifier())
+    for i, (degree, form, cvs, knots) in enumerate(contours):
+        shape = curve_fn.create([om2.MPoint(*p) for p in (cvs - shift).tolist()], knots.tolist(), degree, form,
+                                False, False, transform)
+        build_session.record_nodes(shape)
+        rename.renameNode(shape, "{}Shape{}".format(name, i + 1))
+    rename.doIt()
+
+    return om2.MFnDependencyNode(transform).name()
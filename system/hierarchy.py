@@ -0,0 +1,271 @@
+'''
+Cached index of the joint hierarchy.
+The whole joint hierarchy is read in one DAG traversal when a scene is opened or made, then kept up to date by
+re-reading only the subtrees of joints and groups that are added, moved or renamed, so parent/child lookups are
+dictionary lookups and ordered chains don't need a listRelatives call per query.
+'''
+
+
+class HierarchyIndex(object):
+    '''
+    Parent and child lookups for every joint in the scene, keyed by full DAG path
+    '''
+    def __init__(self):
+        self._parents = {}
+        self._children = {}
+        self._paths = {}
+        # Partial path and MObjectHandle hash of every indexed joint, to find its entries after a move or rename
+        self._names = {}
+        self._hashes = {}
+        self._handles = {}
+        # Nodes whose subtree changed since the last lookup, keyed by MObjectHandle hash
+        self._pending = {}
+        self.dirty = True
+        # How often the whole scene was read and how many subtrees were updated, see benchmarks/bench_hierarchy.py
+        self.rebuilds = 0
+        self.refreshes = 0
+        self._callbacks = []
+
+    def build(self):
+        '''
+        Read every joint in one depth first traversal, parents are always visited before their children
+        '''
+        import maya.api.OpenMaya as om2
+
+        self._parents = {}
+        self._children = {}
+        self._paths = {}
+        self._names = {}
+        self._hashes = {}
+        self._handles = {}
+        self._pending = {}
+        iterator = om2.MItDag(om2.MItDag.kDepthFirst, om2.MFn.kJoint)
+        while not iterator.isDone():
+            self._add(om2, iterator.getPath())
+            iterator.next()
+        self.dirty = False
+        self.rebuilds += 1
+
+    def _add(self, om2, path):
+        full_path = path.fullPathName()
+        parent = full_path.rsplit("|", 1)[0]
+        # Only joint parents count, a joint under a group starts a new hierarchy
+        parent = parent if parent in self._children else None
+        self._parents[full_path] = parent
+        self._children[full_path] = []
+        if parent:
+            self._children[parent].append(full_path)
+        partial = path.partialPathName()
+        self._paths[full_path] = full_path
+        self._paths[partial] = full_path
+        self._names[full_path] = partial
+        key = om2.MObjectHandle(path.node()).hashCode()
+        self._hashes[full_path] = key
+        self._handles[key] = full_path
+
+    def _remove(self, full_path):
+        '''
+        Drop a joint and everything indexed below it
+        '''
+        parent = self._parents.get(full_path)
+        if parent in self._children and full_path in self._children[parent]:
+            self._children[parent].remove(full_path)
+        stack = [full_path]
+        while stack:
+            current = stack.pop()
+            stack.extend(self._children.pop(current, []))
+            self._parents.pop(current, None)
+            for key in [current, self._names.pop(current, None)]:
+                if self._paths.get(key) == current:
+                    del self._paths[key]
+            self._handles.pop(self._hashes.pop(current, None), None)
+
+    def _refresh(self, om2, node):
+        '''
+        Re-read the joints at and below a node that moved, was renamed or was created
+        '''
+        path = om2.MDagPath.getAPathTo(node)
+        iterator = om2.MItDag()
+        iterator.reset(path, om2.MItDag.kDepthFirst, om2.MFn.kJoint)
+        refreshed = []
+        while not iterator.isDone():
+            current = iterator.getPath()
+            previous = self._handles.get(om2.MObjectHandle(current.node()).hashCode())
+            if previous is not None:
+                self._remove(previous)
+            self._add(om2, current)
+            refreshed.append(current.fullPathName())
+            iterator.next()
+        if not refreshed:
+            return
+        # Children are appended as they're re-read, put them back in the order of the scene
+        for parent in set(self._parents[i] for i in refreshed) - set(refreshed) - {None}:
+            self._sort_children(om2, parent)
+        self.refreshes += 1
+
+    def _sort_children(self, om2, parent):
+        selection = om2.MSelectionList()
+        selection.add(parent)
+        parent_fn = om2.MFnDagNode(selection.getDagPath(0))
+        order = [om2.MDagPath.getAPathTo(parent_fn.child(i)).fullPathName() for i in range(parent_fn.childCount())]
+        children = set(self._children[parent])
+        self._children[parent] = [i for i in order if i in children]
+
+    def _update(self):
+        '''
+        Apply the changes queued by the callbacks, each one costs the size of the changed subtree
+        '''
+        import maya.api.OpenMaya as om2
+
+        pending = list(self._pending.values())
+        self._pending = {}
+        for handle in pending:
+            if handle.isValid():
+                self._refresh(om2, handle.object())
+
+    def invalidate(self, *args):
+        self.dirty = True
+
+    def _queue(self, node):
+        import maya.api.OpenMaya as om2
+
+        handle = om2.MObjectHandle(node)
+        self._pending[handle.hashCode()] = handle
+
+    def _node_added(self, node, *args):
+        if not self.dirty:
+            self._queue(node)
+
+    def _node_removed(self, node, *args):
+        import maya.api.OpenMaya as om2
+
+        handle = om2.MObjectHandle(node)
+        self._pending.pop(handle.hashCode(), None)
+        full_path = self._handles.get(handle.hashCode())
+        if full_path is not None:
+            self._remove(full_path)
+
+    def _dag_changed(self, message, child, parent, *args):
+        self._changed(child.node())
+
+    def _name_changed(self, node, previous, *args):
+        self._changed(node)
+
+    def _changed(self, node):
+        '''
+        Only joints and transforms are queued, a group can carry joints and moving or renaming it changes their paths.
+        Shapes, utility nodes and anything else are dropped here
+        '''
+        import maya.api.OpenMaya as om2
+
+        if not self.dirty and node.hasFn(om2.MFn.kTransform):
+            self._queue(node)
+
+    def watch(self):
+        '''
+        Keep the index up to date as joints are added, removed, renamed or reparented, a new or opened scene is read
+        again from scratch
+        '''
+        import maya.api.OpenMaya as om2
+
+        if self._callbacks:
+            return
+        self._callbacks = [
+            om2.MDGMessage.addNodeAddedCallback(self._node_added, "joint"),
+            om2.MDGMessage.addNodeRemovedCallback(self._node_removed, "joint"),
+            om2.MDagMessage.addAllDagChangesCallback(self._dag_changed),
+            om2.MNodeMessage.addNameChangedCallback(om2.MObject.kNullObj, self._name_changed),
+            om2.MSceneMessage.addCallback(om2.MSceneMessage.kAfterOpen, self.invalidate),
+            om2.MSceneMessage.addCallback(om2.MSceneMessage.kAfterNew, self.invalidate),
+        ]
+
+    def unwatch(self):
+        import maya.api.OpenMaya as om2
+        om2.MMessage.removeCallbacks(self._callbacks)
+        self._callbacks = []
+
+    def _ensure(self):
+        if self.dirty:
+            self.build()
+        elif self._pending:
+            self._update()
+
+    def path(self, node):
+        '''
+        Get the full path of a joint from a name, partial path or PyNode
+        '''
+        self._ensure()
+        key = str(node)
+        if key not in self._paths:
+            # Partial paths get shorter or longer as other nodes take or give up a name, resolve the name instead
+            full_path = _full_path(key)
+            if full_path not in self._parents:
+                raise RuntimeError("{} is not a joint in the scene".format(node))
+            return full_path
+        return self._paths[key]
+
+    def parent(self, node):
+        return self._parents[self.path(node)]
+
+    def children(self, node):
+        return list(self._children[self.path(node)])
+
+    def descendants(self, node):
+        '''
+        Returns:
+            The joint and every joint below it, parents before children and siblings in child order
+        '''
+        stack = [self.path(node)]
+        ordered = []
+        while stack:
+            current = stack.pop()
+            ordered.append(current)
+            stack.extend(reversed(self._children[current]))
+        return ordered
+
+    def branches(self, node):
+        '''
+        Returns:
+            Every joint at or below node with more than one child joint
+        '''
+        return [i for i in self.descendants(node) if len(self._children[i]) > 1]
+
+    def chain(self, node, strict=False):
+        '''
+        Get an ordered parent to child chain
+        Args:
+            node: The top joint of the chain
+            strict(Bool): Raise an error on branching chains instead of returning every descendant
+
+        Returns:
+            The full paths of the chain, from parent to child
+        '''
+        branches = self.branches(node)
+        if branches and strict:
+            raise RuntimeError("{} is not a linear chain, it branches at {}".format(node, ", ".join(branches)))
+        return self.descendants(node)
+
+
+def _full_path(name):
+    import maya.api.OpenMaya as om2
+
+    selection = om2.MSelectionList()
+    try:
+        selection.add(name)
+        return selection.getDagPath(0).fullPathName()
+    except (RuntimeError, TypeError):
+        return None
+
+
+_index = None
+
+
+def get_index():
+    '''
+    Get the shared hierarchy index, it watches the scene and updates the joints that changed
+    '''
+    global _index
+    if _index is None:
+        _index = HierarchyIndex()
+        _index.watch()
+    return _index
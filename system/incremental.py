@@ -0,0 +1,367 @@
+'''
+Incremental rebuilds.
+A character build is a list of components (an arm, an IK leg, a reverse foot on that leg...). Every component is
+keyed by a hash of its builder, its inputs (template, options, instance...) as the builder resolves them (the
+arm hashes its template contents and the positions it will really build at), the world positions of its guide
+joints and the keys of the components it depends on. On rebuild only the components whose key changed, and everything
+downstream of them, are torn down and built again, the rest of the rig is left as it is.
+
+    build = incremental.IncrementalBuild("hero")
+    build.add("left_arm", incremental.arm_builder, {"instance": "Left_", "template": "rig/arm"})
+    build.add("left_leg", incremental.chain_builder(components.create_ik_rig),
+              {"guides": ["L_hip_JNT", "L_knee_JNT", "L_ankle_JNT"], "options": {"pv_distance": 10}})
+    build.add("left_foot", build_foot, {"guides": ["L_ankle_JNT", "L_ball_JNT", "L_toe_JNT"]}, depends=["left_leg"])
+    build.build()
+
+Builders are called as builder(inputs, upstream) where upstream holds the results of the components they depend on,
+with every node turned into its name. The nodes, added attributes and result of every component are kept on a
+network node in the scene, so a rebuild works after the scene is saved and reopened.
+'''
+
+import hashlib
+import json
+import time
+from collections.abc import Mapping
+
+import system.build_session as build_session
+import system.naming as naming
+
+STATE_NODE = "{}_INCREMENTAL_BUILD"
+STATE_ATTR = "buildState"
+# Positions are rounded before hashing so float noise from the scene doesn't count as a change
+PRECISION = 5
+
+
+def _canonical(value):
+    '''
+    A JSON ready copy of value with nodes turned into names and floats rounded
+    '''
+    if isinstance(value, float):
+        return round(value, PRECISION)
+    if isinstance(value, (str, int, bool)) or value is None:
+        return value
+    if isinstance(value, Mapping):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if hasattr(value, "tolist"):
+        return _canonical(value.tolist())
+    if isinstance(value, (list, tuple, set)):
+        return [_canonical(i) for i in value]
+    if hasattr(value, "name"):
+        return value.name()
+    return str(value)
+
+
+def pynodes(names):
+    import pymel.core as pm
+    return [pm.PyNode(i) for i in names]
+
+
+def chain_builder(function):
+    '''
+    Make a builder for a component function that takes a base joint list (create_fk_rig, create_ik_rig,
+    fk_ik_hinge...), it's called with the first guide joint and inputs["options"] as keyword arguments
+    '''
+    def builder(inputs, upstream):
+        return function(pynodes(inputs["guides"][:1]), **inputs.get("options", {}))
+    builder.__qualname__ = "chain_builder.{}".format(function.__name__)
+    return builder
+
+
+def arm_builder(inputs, upstream):
+    '''
+    Builder for Rig_Arm, inputs are instance, template and optional positions
+    '''
+    import First_auto_rig.rig_arm as rig_arm
+    arm = rig_arm.Rig_Arm(instance=inputs.get("instance", "Left_"), positions=inputs.get("positions"),
+                          template=inputs.get("template", "rig/arm"))
+    arm.rig_arm(use_plan=inputs.get("use_plan", False))
+    return arm.rig_info
+
+
+def _resolve_arm(inputs):
+    '''
+    The template contents and the positions Rig_Arm will really use (passed, selected or from the template), so
+    editing the template, moving the selected guides or changing the selection changes the key
+    '''
+    import First_auto_rig.rig_arm as rig_arm
+    import system.templates as templates
+
+    template = templates.get_template(inputs.get("template", "rig/arm"))
+    resolved = dict(inputs)
+    resolved["positions"] = rig_arm.resolve_positions(template, inputs.get("positions"))
+    resolved["template_data"] = template
+    return resolved
+
+
+# Builders can resolve their inputs against the scene and data files before they're hashed, the builder is then
+# called with the resolved inputs so it builds exactly what was hashed
+arm_builder.resolve = _resolve_arm
+
+
+class Component(object):
+    '''
+    One rebuildable piece of the rig
+    '''
+    def __init__(self, name, builder, inputs=None, depends=None):
+        self.name = name
+        self.builder = builder
+        self.inputs = dict(inputs or {})
+        self.depends = list(depends or [])
+
+    def resolved_inputs(self):
+        '''
+        The inputs with whatever the builder reads from the scene or data files filled in (see arm_builder)
+        '''
+        resolve = getattr(self.builder, "resolve", None)
+        return resolve(self.inputs) if resolve else dict(self.inputs)
+
+    def key(self, guide_positions, upstream_keys, inputs=None):
+        '''
+        Args:
+            inputs(Dict): The resolved inputs, resolved here by default
+
+        Returns:
+            The hash of everything that decides what this component builds
+        '''
+        inputs = self.resolved_inputs() if inputs is None else inputs
+        builder = "{}.{}".format(getattr(self.builder, "__module__", ""),
+                                 getattr(self.builder, "__qualname__", repr(self.builder)))
+        data = {"builder": builder, "inputs": _canonical(inputs), "guides": _canonical(guide_positions),
+                "depends": [upstream_keys[i] for i in self.depends]}
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class IncrementalBuild(object):
+    '''
+    The components of a character and the state of their last build
+    '''
+    def __init__(self, name="character"):
+        self.name = name
+        self.components = {}
+
+    def add(self, name, builder, inputs=None, depends=None):
+        '''
+        Add a component
+        Args:
+            name(String): Unique component name
+            builder: Called as builder(inputs, upstream), returns the component's result (nodes, lists, dicts)
+            inputs(Dict): Everything the build depends on, "guides" is a list of joints whose world positions are
+                          part of the key
+            depends(List): Names of the components this one builds on
+
+        Returns:
+            Component
+        '''
+        if name in self.components:
+            raise RuntimeError("{} is already a component of {}".format(name, self.name))
+        self.components[name] = Component(name, builder, inputs, depends)
+        return self.components[name]
+
+    def order(self):
+        '''
+        Returns:
+            Component names, every component after the components it depends on
+        '''
+        ordered = []
+        visiting = set()
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name in visiting:
+                raise RuntimeError("Component dependency cycle through {}".format(name))
+            if name not in self.components:
+                raise RuntimeError("Unknown component {}".format(name))
+            visiting.add(name)
+            for i in self.components[name].depends:
+                visit(i)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in self.components:
+            visit(name)
+        return ordered
+
+    def dependents(self, names):
+        '''
+        Returns:
+            The components downstream of any of names, including names
+        '''
+        result = set(names)
+        for name in self.order():
+            if set(self.components[name].depends) & result:
+                result.add(name)
+        return result
+
+    def keys(self, inputs=None):
+        '''
+        Hash every component, guide positions of the whole build are read in one snapshot
+        Args:
+            inputs(Dict): Resolved inputs keyed by component, see resolve_inputs
+        '''
+        import system.snapshot as snapshot
+
+        inputs = self.resolve_inputs() if inputs is None else inputs
+
+        guides = []
+        for component in self.components.values():
+            guides.extend(i for i in component.inputs.get("guides", []) if i not in guides)
+        scene = snapshot.SceneSnapshot(guides) if guides else None
+
+        keys = {}
+        for name in self.order():
+            component = self.components[name]
+            positions = scene.positions(component.inputs["guides"]) if component.inputs.get("guides") else []
+            keys[name] = component.key(positions, keys, inputs[name])
+        return keys
+
+    def resolve_inputs(self):
+        return {name: component.resolved_inputs() for name, component in self.components.items()}
+
+    #########
+    ##State##
+    #########
+
+    def load_state(self):
+        import maya.cmds as cmds
+
+        node = STATE_NODE.format(self.name)
+        if not cmds.objExists(node):
+            return {}
+        return json.loads(cmds.getAttr("{}.{}".format(node, STATE_ATTR)) or "{}")
+
+    def save_state(self, state):
+        import maya.cmds as cmds
+
+        node = STATE_NODE.format(self.name)
+        if not cmds.objExists(node):
+            node = cmds.createNode("network", name=node, skipSelect=True)
+            cmds.addAttr(node, longName=STATE_ATTR, dataType="string")
+        cmds.setAttr("{}.{}".format(node, STATE_ATTR), json.dumps(state), type="string")
+
+    ###########
+    ##Rebuild##
+    ###########
+
+    def dirty(self, state=None, keys=None):
+        '''
+        Find what a rebuild has to build again
+        Returns:
+            The names of the components to rebuild, in build order
+        '''
+        import maya.cmds as cmds
+
+        state = self.load_state() if state is None else state
+        keys = self.keys() if keys is None else keys
+
+        dirty = set()
+        for name in self.components:
+            previous = state.get(name)
+            # Changed inputs, or part of the component was deleted by hand
+            if not previous or previous["key"] != keys[name]:
+                dirty.add(name)
+            elif len(cmds.ls(previous["nodes"])) != len(previous["nodes"]):
+                dirty.add(name)
+
+        # Tearing down a component deletes everything below its nodes, components living under them go too
+        owners = {}
+        for name, previous in state.items():
+            for uuid in previous["nodes"]:
+                owners[uuid] = name
+        changed = True
+        while changed:
+            dirty = self.dependents(dirty)
+            changed = False
+            for name in list(dirty):
+                if name not in state:
+                    continue
+                nodes = cmds.ls(state[name]["nodes"], long=True, dag=True)
+                below = cmds.listRelatives(nodes, allDescendents=True, fullPath=True) if nodes else None
+                for uuid in cmds.ls(below or [], uuid=True):
+                    owner = owners.get(uuid)
+                    if owner and owner in self.components and owner not in dirty:
+                        dirty.add(owner)
+                        changed = True
+
+        return [i for i in self.order() if i in dirty]
+
+    def teardown(self, name, state):
+        '''
+        Delete everything a component built and the attributes it added to other components' nodes
+        '''
+        import maya.cmds as cmds
+
+        previous = state.pop(name, None)
+        if not previous:
+            return
+        for attr in previous.get("attributes", []):
+            if cmds.objExists(attr):
+                cmds.deleteAttr(attr)
+        # States saved before shared nodes were filtered out can still list them
+        shared = naming.shared_nodes(uuid=True)
+        nodes = cmds.ls([i for i in previous["nodes"] if i not in shared])
+        if nodes:
+            cmds.delete(nodes)
+
+    def _user_attrs(self, uuids):
+        import maya.cmds as cmds
+        return {node: set(cmds.listAttr(node, userDefined=True) or []) for node in cmds.ls(uuids)}
+
+    def build_component(self, name, key, state, inputs=None):
+        import maya.cmds as cmds
+
+        component = self.components[name]
+        inputs = component.resolved_inputs() if inputs is None else inputs
+        upstream = {i: state[i]["result"] for i in component.depends}
+        # Builders add attributes to the nodes of the components they build on (e.g. foot roll attributes)
+        others = [uuid for other, previous in state.items() if other != name for uuid in previous["nodes"]]
+        attrs_before = self._user_attrs(others)
+        before = set(cmds.ls(uuid=True))
+
+        result = component.builder(inputs, upstream)
+
+        attrs_after = self._user_attrs(others)
+        added = ["{}.{}".format(node, attr) for node in attrs_after
+                 for attr in sorted(attrs_after[node] - attrs_before.get(node, set()))]
+        # Shared nodes made on demand (the solver of the first ikHandle) belong to the scene, tearing the component
+        # down must not delete them from under the other components
+        before |= naming.shared_nodes(uuid=True)
+        state[name] = {"key": key, "nodes": [i for i in cmds.ls(uuid=True) if i not in before],
+                       "attributes": added, "result": _canonical(result)}
+
+    def build(self, force=False):
+        '''
+        Rebuild the components whose inputs changed, and their dependents
+        Args:
+            force(Bool): Tear down and rebuild every component
+
+        Returns:
+            report(Dict): The components built and kept and how long it took
+        '''
+        start = time.perf_counter()
+        state = self.load_state()
+        # Components removed from the build since last time are torn down too
+        for name in [i for i in state if i not in self.components]:
+            self.teardown(name, state)
+
+        # Resolved once, before anything is torn down, so the build uses the inputs that were hashed
+        inputs = self.resolve_inputs()
+        keys = self.keys(inputs)
+        dirty = self.order() if force else self.dirty(state, keys)
+
+        with build_session.build_session("{}_rebuild".format(self.name)):
+            # Dependents first so nothing is deleted twice
+            for name in reversed(dirty):
+                self.teardown(name, state)
+            for name in dirty:
+                self.build_component(name, keys[name], state, inputs[name])
+            self.save_state(state)
+
+        return {"built": dirty, "kept": [i for i in self.order() if i not in dirty],
+                "time": time.perf_counter() - start}
+
+    def result(self, name):
+        '''
+        Get the stored result of a component's last build
+        '''
+        return self.load_state()[name]["result"]
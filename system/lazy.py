@@ -0,0 +1,66 @@
+'''
+Lazy module loading for heavy backends like PyMEL.
+A LazyModule stands in for a module and only imports it the first time one of its attributes is used, so importing
+a SPYDR component costs nothing until a component actually runs.
+Set SPYDR_EAGER_IMPORTS=1 to import everything up front, used to compare startup times.
+'''
+
+import importlib
+import os
+import types
+
+EAGER = os.environ.get("SPYDR_EAGER_IMPORTS", "") == "1"
+
+_lazy_modules = {}
+
+
+class LazyModule(types.ModuleType):
+    '''
+    A module placeholder that imports the real module on first attribute access
+    '''
+    def __init__(self, name):
+        super(LazyModule, self).__init__(name)
+        self._lazy_name = name
+        self._lazy_module = None
+        if EAGER:
+            self._load()
+
+    def _load(self):
+        if self._lazy_module is None:
+            self._lazy_module = importlib.import_module(self._lazy_name)
+            self.__dict__.update(self._lazy_module.__dict__)
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return "<LazyModule '{}' ({})>".format(self._lazy_name, state)
+
+
+def lazy_import(name):
+    '''
+    Get a lazily loaded module, every caller asking for the same module shares one placeholder
+    Args:
+        name(String): The full module name, e.g. "pymel.core"
+
+    Returns:
+        LazyModule: The module placeholder
+    '''
+    if name not in _lazy_modules:
+        _lazy_modules[name] = LazyModule(name)
+    return _lazy_modules[name]
+
+
+def is_loaded(module):
+    '''
+    Returns:
+        Whether a lazily loaded module has been imported yet
+    '''
+    if isinstance(module, LazyModule):
+        return module._lazy_module is not None
+    return True
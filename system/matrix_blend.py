@@ -0,0 +1,167 @@
+'''
+Matrix constraint backend.
+Drives nodes through their offsetParentMatrix (Maya 2020+) with multMatrix and blendMatrix nodes instead of
+parentConstraints. A constraint becomes at most one multMatrix, none when the driver's world matrix can be connected
+straight in, and an FK/IK blend becomes a blendMatrix and a multMatrix when the chains line up. The driven node keeps
+its own translate, rotate and jointOrient, the offset that cancels them is solved once with NumPy at build time, so the
+pose matches the constraint version: exactly with the blend at 0 or 1, in between blendMatrix interpolates the
+matrices instead of averaging the constraint channels.
+
+    matrix_blend.set_backend("matrix")
+    Rig_Arm().rig_arm()
+Or per call:
+    matrix_blend.matrix_constraint("L_shoulder_FK_CTRL", "L_shoulder_FK_JNT", maintain_offset=False)
+    matrix_blend.matrix_blend("L_shoulder_IK_JNT", "L_shoulder_FK_JNT", "L_shoulder_JNT", "L_arm_settings_CTRL.IK_FK")
+'''
+
+import numpy as np
+
+# Which backend the components constrain with, "constraint" or "matrix"
+BACKEND = "constraint"
+
+TOLERANCE = 1e-6
+
+
+def set_backend(backend):
+    '''
+    Switch how Rig_Arm, fk_ik_hinge, create_fk_rig and add_space_switch drive their joints
+    Args:
+        backend(String): "constraint" for parentConstraints, "matrix" for offsetParentMatrix networks
+    '''
+    global BACKEND
+    if backend not in ("constraint", "matrix"):
+        raise RuntimeError("Unknown constraint backend: {}".format(backend))
+    BACKEND = backend
+
+
+def use_matrix():
+    return BACKEND == "matrix"
+
+
+############
+##Matrices##
+############
+
+def get_matrix(plug):
+    import maya.cmds as cmds
+    return np.array(cmds.getAttr(plug), dtype=np.float64).reshape(4, 4)
+
+
+def set_matrix(plug, matrix):
+    import maya.cmds as cmds
+    cmds.setAttr(plug, *np.asarray(matrix, dtype=np.float64).flatten().tolist(), type="matrix")
+
+
+def is_identity(matrix):
+    return np.allclose(matrix, np.eye(4), atol=TOLERANCE)
+
+
+def _has_parent(node):
+    import maya.cmds as cmds
+    return bool(cmds.listRelatives(str(node), parent=True))
+
+
+def _mult(inputs, name):
+    '''
+    Multiply a list of static matrices and plugs, returns the plug holding the result
+    A single plug is returned as it is, no node is made
+    '''
+    import maya.cmds as cmds
+
+    inputs = [i for i in inputs if isinstance(i, str) or not is_identity(i)]
+    if len(inputs) == 1 and isinstance(inputs[0], str):
+        return inputs[0], None
+    mult = cmds.createNode("multMatrix", name=name, skipSelect=True)
+    for i, value in enumerate(inputs):
+        plug = "{}.matrixIn[{}]".format(mult, i)
+        if isinstance(value, str):
+            cmds.connectAttr(value, plug)
+        else:
+            set_matrix(plug, value)
+    return "{}.matrixSum".format(mult), mult
+
+
+def _drive(driven, inputs, name):
+    '''
+    Connect a world space target into the offsetParentMatrix of driven, cancelling its own local matrix
+    Args:
+        inputs(List): Static matrices and plugs that multiply into the target world matrix
+    '''
+    import maya.cmds as cmds
+
+    driven = str(driven)
+    inputs = list(inputs)
+    # Static matrices next to each other are multiplied here instead of in the node
+    static = np.linalg.inv(get_matrix(driven + ".matrix"))
+    while inputs and not isinstance(inputs[0], str):
+        static = static.dot(inputs.pop(0))
+    inputs.insert(0, static)
+    if _has_parent(driven):
+        inputs.append(driven + ".parentInverseMatrix[0]")
+    plug, node = _mult(inputs, name)
+    cmds.connectAttr(plug, driven + ".offsetParentMatrix", force=True)
+    return node
+
+
+def _target(driver, driven, maintain_offset):
+    '''
+    The world matrix driven should follow for a driver, with the offset between them when maintain_offset is on
+    Returns:
+        inputs(List): Static matrices and plugs that multiply into the target
+    '''
+    driver, driven = str(driver), str(driven)
+    inputs = [driver + ".worldMatrix[0]"]
+    if maintain_offset:
+        offset = get_matrix(driven + ".worldMatrix[0]").dot(np.linalg.inv(get_matrix(driver + ".worldMatrix[0]")))
+        inputs.insert(0, offset)
+    return inputs
+
+
+###############
+##Constraints##
+###############
+
+def matrix_constraint(driver, driven, maintain_offset=True, name=None):
+    '''
+    Make driven follow driver, like a parentConstraint
+    Args:
+        driver: The node to follow
+        driven: The node to drive, its offsetParentMatrix is connected
+        maintain_offset(Bool): Keep driven where it is instead of snapping it to driver
+
+    Returns:
+        nodes(List): The multMatrix created, empty when the driver's world matrix is connected directly
+    '''
+    node = _drive(driven, _target(driver, driven, maintain_offset), name or "{}_matrixConstraint".format(driven))
+    return [node] if node else []
+
+
+def matrix_blend(driver_a, driver_b, driven, weight_attr=None, maintain_offset=True, name=None):
+    '''
+    Blend driven between two drivers, like a parentConstraint with two targets and a weight switch
+    Args:
+        driver_a: Followed with the weight at 0
+        driver_b: Followed with the weight at 1
+        driven: The node to drive, its offsetParentMatrix is connected
+        weight_attr(String): The plug switching between the drivers, e.g. "arm_settings_CTRL.IK_FK"
+
+    Returns:
+        nodes(Dict): "blend" is the blendMatrix, "weight" its weight plug, "nodes" every node created
+    '''
+    import maya.cmds as cmds
+
+    name = name or "{}_matrixBlend".format(driven)
+    plug_a, node_a = _mult(_target(driver_a, driven, maintain_offset), name + "_A")
+    plug_b, node_b = _mult(_target(driver_b, driven, maintain_offset), name + "_B")
+
+    blend = cmds.createNode("blendMatrix", name=name, skipSelect=True)
+    cmds.connectAttr(plug_a, blend + ".inputMatrix")
+    cmds.connectAttr(plug_b, blend + ".target[0].targetMatrix")
+    weight = blend + ".target[0].weight"
+    if weight_attr:
+        cmds.connectAttr(str(weight_attr), weight)
+    else:
+        cmds.setAttr(weight, 0)
+
+    drive_node = _drive(driven, [blend + ".outputMatrix"], name + "_drive")
+    return {"blend": blend, "weight": weight, "nodes": [i for i in [node_a, node_b, blend, drive_node] if i]}
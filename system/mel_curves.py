@@ -0,0 +1,185 @@
+'''
+Streaming reader for MEL curve libraries.
+Shape libraries exported as MEL are read a line at a time, so files of any size can be imported without holding them
+in memory. Every `curve` command is yielded as a MelCurve with its degree, points and knots as arrays, every other
+command in the file is skipped.
+
+    for curve in mel_curves.read_curves("shapes.mel"):
+        print(curve.name, curve.degree, len(curve.points))
+    library = mel_curves.load_library("shapes.mel")    # {name: control_shapes.Shape}
+'''
+
+import re
+
+import numpy as np
+
+# Quoted strings, comments to the end of the line, statement ends and everything else up to the next space, quote or ;
+TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|//.*|;|[^\s;"]+')
+FLAG = re.compile(r'-[A-Za-z]')
+
+# curve flags and how many values they take, everything else is skipped up to the next flag
+FLAGS = {"d": ("degree", 1), "degree": ("degree", 1), "p": ("point", 3), "point": ("point", 3),
+         "pw": ("pointWeight", 4), "pointWeight": ("pointWeight", 4), "k": ("knot", 1), "knot": ("knot", 1),
+         "n": ("name", 1), "name": ("name", 1), "per": ("periodic", 1), "periodic": ("periodic", 1),
+         "bezier": ("bezier", 0), "bez": ("bezier", 0)}
+
+
+class MelCurve(object):
+    '''
+    One parsed curve command
+    Args:
+        name(String): The -name flag, or curveN by position in the file
+        degree(Int): Curve degree, 3 when the command doesn't say
+        points: (N, 3) array of CVs, as written, periodic curves include their repeated CVs
+        knots: (K,) array, empty when the command has no -k flags
+        periodic(Bool): The -periodic flag
+        weights: (N,) array of -pw weights, None for non rational curves
+    '''
+    def __init__(self, name, degree, points, knots, periodic=False, weights=None):
+        self.name = name
+        self.degree = degree
+        self.points = points
+        self.knots = knots
+        self.periodic = periodic
+        self.weights = weights
+
+    def __repr__(self):
+        return "MelCurve({!r}, degree={}, points={})".format(self.name, self.degree, len(self.points))
+
+    def to_shape(self):
+        '''
+        The curve as a control_shapes.Shape
+        '''
+        import system.control_shapes as control_shapes
+
+        points = self.points[:-self.degree] if self.periodic else self.points
+        return control_shapes.Shape(points, self.degree, self.periodic, self.knots if len(self.knots) else None)
+
+
+def _unquote(token):
+    if token.startswith('"') and token.endswith('"'):
+        return bytes(token[1:-1], "utf-8").decode("unicode_escape")
+    return token
+
+
+def tokenize(lines):
+    '''
+    Split MEL into tokens a line at a time, // comments are dropped
+    Args:
+        lines: Any iterable of lines, e.g. an open file
+    '''
+    for line in lines:
+        for token in TOKEN.findall(line):
+            if token.startswith("//"):
+                break
+            yield token
+
+
+def statements(tokens, commands=None):
+    '''
+    Group tokens into commands, one list per ; terminated statement
+    Args:
+        commands(List): Only keep these commands, the tokens of any other statement are dropped as they're read
+    '''
+    statement = []
+    keep = True
+    for token in tokens:
+        if token == ";":
+            if statement:
+                yield statement
+            statement = []
+            keep = True
+        elif keep:
+            if not statement and commands is not None and token not in commands:
+                keep = False
+                continue
+            statement.append(token)
+    if statement:
+        yield statement
+
+
+def _is_flag(token):
+    if not FLAG.match(token):
+        return False
+    # -inf and -nan are numbers
+    try:
+        float(token)
+    except ValueError:
+        return True
+    return False
+
+
+def parse_curve(tokens, default_name="curve1"):
+    '''
+    Parse the tokens of one curve command, the leading "curve" is optional
+    Args:
+        tokens(List): Tokens of the command, or a MEL string
+
+    Returns:
+        MelCurve
+    '''
+    if isinstance(tokens, str):
+        tokens = [i for i in tokenize(tokens.splitlines()) if i != ";"]
+    if tokens and tokens[0] == "curve":
+        tokens = tokens[1:]
+
+    degree = 3
+    name = default_name
+    periodic = False
+    points = []
+    weights = []
+    knots = []
+    i = 0
+    count = len(tokens)
+    while i < count:
+        token = tokens[i]
+        i += 1
+        if not _is_flag(token):
+            continue
+        flag, arity = FLAGS.get(token[1:], (None, 0))
+        values = tokens[i:i + arity]
+        if flag is None:
+            # Unknown flag, skip its values
+            while i < count and not _is_flag(tokens[i]):
+                i += 1
+            continue
+        i += arity
+        if len(values) < arity:
+            raise ValueError("-{} expects {} values, got {}".format(token[1:], arity, " ".join(values)))
+        if flag == "degree":
+            degree = int(float(values[0]))
+        elif flag == "point":
+            points.append([float(v) for v in values])
+        elif flag == "pointWeight":
+            points.append([float(v) for v in values[:3]])
+            weights.append(float(values[3]))
+        elif flag == "knot":
+            knots.append(float(values[0]))
+        elif flag == "name":
+            name = _unquote(values[0])
+        elif flag == "periodic":
+            periodic = values[0] in ("1", "true", "on", "yes")
+
+    return MelCurve(name, degree, np.array(points, dtype=np.float64).reshape(-1, 3),
+                    np.array(knots, dtype=np.float64), periodic,
+                    np.array(weights, dtype=np.float64) if weights else None)
+
+
+def read_curves(fileName):
+    '''
+    Yield every curve command of a MEL file as a MelCurve, the file is read lazily
+    '''
+    with open(fileName, "r") as infile:
+        index = 0
+        for statement in statements(tokenize(infile), ["curve"]):
+            index += 1
+            yield parse_curve(statement, "curve{}".format(index))
+
+
+def load_library(fileName):
+    '''
+    Read a MEL shape library into control shapes
+    Returns:
+        shapes(Dict): control_shapes.Shape keyed by curve name
+    '''
+    return {curve.name: curve.to_shape() for curve in read_curves(fileName)}
@@ -0,0 +1,129 @@
+'''
+Mirror a recorded build across a plane.
+The positions and orientations of an already computed BuildPlan are reflected in one vectorized step and every
+name is moved to the other side, so the opposite side is built without querying the scene again.
+'''
+
+import numpy as np
+
+import system.build_plan as build_plan
+
+# The axis each mirror plane flips
+PLANE_AXES = {"YZ": 0, "XZ": 1, "XY": 2}
+
+POSITION_ATTRS = ["translate", "t"]
+ROTATION_ATTRS = ["rotate", "r", "jointOrient", "jo"]
+AXIS_NAMES = ["X", "Y", "Z"]
+
+
+def _plane_axis(plane):
+    if plane not in PLANE_AXES:
+        raise RuntimeError("Mirror plane must be one of {}".format(", ".join(sorted(PLANE_AXES))))
+    return PLANE_AXES[plane]
+
+
+def mirror_positions(positions, plane="YZ"):
+    '''
+    Reflect positions across a plane through the origin
+    Args:
+        positions: An (N, 3) array of positions
+        plane(String): "YZ", "XZ" or "XY"
+
+    Returns:
+        An (N, 3) array of mirrored positions
+    '''
+    positions = np.array(positions, dtype=np.float64).reshape(-1, 3)
+    positions[:, _plane_axis(plane)] *= -1
+    return positions
+
+
+def mirror_rotations(rotations, plane="YZ"):
+    '''
+    Reflect euler rotations across a plane, the reflected orientation is M * R * M with M the reflection matrix,
+    which for any rotate order keeps the angle around the plane normal and negates the other two
+    Args:
+        rotations: An (N, 3) array of euler rotations
+        plane(String): "YZ", "XZ" or "XY"
+
+    Returns:
+        An (N, 3) array of mirrored rotations
+    '''
+    rotations = np.array(rotations, dtype=np.float64).reshape(-1, 3)
+    flip = np.full(3, -1.0)
+    flip[_plane_axis(plane)] = 1.0
+    return rotations * flip
+
+
+def _attr_kind(plug):
+    '''
+    Returns:
+        ("position"|"rotation"|None, axis index or None) for a plug name
+    '''
+    attr = plug.partition(".")[2]
+    if attr in POSITION_ATTRS:
+        return "position", None
+    if attr in ROTATION_ATTRS:
+        return "rotation", None
+    for base, kind in [("translate", "position"), ("rotate", "rotation"), ("jointOrient", "rotation")]:
+        if attr[:-1] == base and attr[-1:] in AXIS_NAMES:
+            return kind, AXIS_NAMES.index(attr[-1])
+    return None, None
+
+
+def rename_side(value, source_instance, target_instance):
+    '''
+    Move every name inside a value (strings, lists, dictionaries) from one side to the other
+    '''
+    if isinstance(value, str):
+        return value.replace(source_instance, target_instance)
+    if isinstance(value, (list, tuple)):
+        return type(value)(rename_side(i, source_instance, target_instance) for i in value)
+    if isinstance(value, dict):
+        return {k: rename_side(v, source_instance, target_instance) for k, v in value.items()}
+    return value
+
+
+def mirror_plan(plan, source_instance="Left_", target_instance="Right_", plane="YZ"):
+    '''
+    Build the opposite side's plan from an existing plan without touching the scene
+    Args:
+        plan(BuildPlan): The recorded build for the source side
+        source_instance(String): The side prefix used in the plan
+        target_instance(String): The side prefix for the mirrored plan
+        plane(String): The mirror plane, "YZ", "XZ" or "XY"
+
+    Returns:
+        BuildPlan: The mirrored plan
+    '''
+    axis = _plane_axis(plane)
+    mirrored = build_plan.BuildPlan(rename_side(plan.name, source_instance, target_instance))
+    mirrored.operations = [rename_side(i, source_instance, target_instance) for i in plan.operations]
+
+    # Gather every position and rotation so they are all reflected in one step
+    positions = []
+    rotations = []
+    for operation in mirrored.operations:
+        if operation["op"] == "createJoint":
+            positions.append(operation)
+        elif operation["op"] == "setAttr" and isinstance(operation["value"], (list, tuple)):
+            kind, _ = _attr_kind(operation["plug"])
+            if kind == "position":
+                positions.append(operation)
+            elif kind == "rotation":
+                rotations.append(operation)
+        elif operation["op"] == "setAttr":
+            # Single channels: translate on the mirror axis flips, rotations around the other two axes flip
+            kind, channel = _attr_kind(operation["plug"])
+            if (kind == "position" and channel == axis) or (kind == "rotation" and channel is not None and channel != axis):
+                operation["value"] = -operation["value"]
+
+    if positions:
+        values = mirror_positions([i["position"] if i["op"] == "createJoint" else i["value"] for i in positions], plane)
+        for operation, value in zip(positions, values.tolist()):
+            operation["position" if operation["op"] == "createJoint" else "value"] = value
+    if rotations:
+        values = mirror_rotations([i["value"] for i in rotations], plane)
+        for operation, value in zip(rotations, values.tolist()):
+            operation["value"] = value
+
+    return mirrored
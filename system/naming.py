@@ -0,0 +1,212 @@
+'''
+Naming engine for rig modules.
+Name templates from a module template (e.g. "s_ik_wrist_CTRL") are compiled once per instance/side, resolved in
+bulk and checked against a cached index of the scene's names before anything is created, so Maya never has to
+auto-rename a clashing node.
+'''
+
+SIDE_TOKEN = "s_"
+
+# Shared scene nodes a rig connects to but never owns, Maya makes some of them on demand (the first ikHandle makes
+# the ikRPsolver) so they can show up among the nodes a build created
+SHARED_TYPES = ["time", "ikSolver", "ikRPsolver", "ikSCsolver", "ikSplineSolver", "lightLinker", "shapeEditorManager",
+                "poseInterpolatorManager", "renderLayerManager", "displayLayerManager", "defaultRenderUtilityList"]
+
+
+class NameCollisionError(RuntimeError):
+    pass
+
+
+def compile_name(template, side_token=SIDE_TOKEN):
+    '''
+    Split a name template into the parts around its leading side token
+    Args:
+        template(String): A name like "s_fk_elbow_JNT"
+        side_token(String): The placeholder for the instance
+
+    Returns:
+        (prefix, suffix): Parts to join around the instance, the instance is only inserted if the token was there
+    '''
+    if template.startswith(side_token):
+        return ("", template[len(side_token):])
+    return (template, None)
+
+
+def chain_names(names, chain_type, suffix="_JNT", obj_type="_JNT"):
+    '''
+    Names for a copy of a chain, the chain type goes in front of the suffix or is appended with the object type
+    e.g. "L_arm_JNT" -> "L_arm_FK_JNT", "L_arm" -> "L_arm_FK_JNT"
+    Args:
+        names(List): The names of the original objects
+        chain_type(String): From rig_chains, e.g. "_FK"
+        suffix(String): Existing suffix that marks where the chain type goes
+        obj_type(String): Suffix added when the name doesn't have one
+
+    Returns:
+        new_names(List): The updated names
+    '''
+    new_names = []
+    for name in names:
+        name = str(name)
+        if suffix in name:
+            split_index = name.index(suffix)
+            new_names.append("{}{}{}".format(name[:split_index], chain_type, name[split_index:]))
+        else:
+            new_names.append("{}{}{}".format(name, chain_type, obj_type))
+    return new_names
+
+
+class NameEngine(object):
+    '''
+    Resolves every name of a module template for one instance/side
+    '''
+    def __init__(self, module_info, instance, side_token=SIDE_TOKEN):
+        self.instance = instance
+        self.side_token = side_token
+        self._compiled = {}
+        self._resolved = {}
+        for key, value in module_info.items():
+            if isinstance(value, (list, tuple)) and value and all(isinstance(i, str) for i in value):
+                self._compiled[key] = [compile_name(i, side_token) for i in value]
+
+    def _resolve(self, compiled):
+        prefix, suffix = compiled
+        if suffix is None:
+            return prefix
+        return "{}{}{}".format(prefix, self.instance, suffix)
+
+    def resolve(self, key):
+        '''
+        Get all the names of a template list for this instance
+        Args:
+            key(String): The template key, e.g. "ik_joints"
+
+        Returns:
+            names(List): The resolved names
+        '''
+        if key not in self._resolved:
+            self._resolved[key] = [self._resolve(i) for i in self._compiled[key]]
+        return list(self._resolved[key])
+
+    def name(self, key, index):
+        return self.resolve(key)[index]
+
+    def format(self, pattern):
+        '''
+        Resolve a one off name, "{side}" is replaced with the instance, e.g. "{side}arm_settings_CTRL"
+        '''
+        return pattern.format(side=self.instance)
+
+    def all_names(self):
+        '''
+        Returns:
+            Every name this instance resolves from the template
+        '''
+        names = []
+        for key in sorted(self._compiled):
+            names.extend(self.resolve(key))
+        return names
+
+    def check_collisions(self, names=None, index=None, raise_error=True):
+        '''
+        Find clashing names, defaults to every name this instance resolves from the template (see check_collisions)
+        '''
+        return check_collisions(self.all_names() if names is None else names, index=index, raise_error=raise_error)
+
+
+def check_collisions(names, index=None, raise_error=True):
+    '''
+    Find names that already exist in the scene or are used twice in the same build
+    Args:
+        names(List): Names about to be created
+        index(SceneNameIndex): The index to check against, defaults to the shared scene index
+        raise_error(Bool): Raise NameCollisionError instead of returning the collisions
+
+    Returns:
+        collisions(List): The clashing names, sorted
+    '''
+    index = index or get_scene_index()
+    names = list(names)
+    collisions = _find_collisions(names, index)
+    # The index may still hold nodes deleted since it was filled, re-read the scene once before reporting anything
+    if collisions:
+        index.invalidate()
+        collisions = _find_collisions(names, index)
+
+    collisions = sorted(collisions)
+    if collisions and raise_error:
+        raise NameCollisionError("These names already exist: {}".format(", ".join(collisions)))
+    return collisions
+
+
+def _find_collisions(names, index):
+    seen = set()
+    collisions = set()
+    for name in names:
+        if name in seen or index.exists(name):
+            collisions.add(name)
+        seen.add(name)
+    return collisions
+
+
+class SceneNameIndex(object):
+    '''
+    A cached set of every short node name in the scene, filled with one ls call
+    '''
+    def __init__(self):
+        self._names = None
+
+    def names(self):
+        if self._names is None:
+            import maya.cmds as cmds
+            self._names = set(i.rsplit("|", 1)[-1] for i in cmds.ls())
+        return self._names
+
+    def exists(self, name):
+        return name in self.names()
+
+    def reserve(self, names):
+        '''
+        Add names of newly created nodes without re-reading the scene
+        '''
+        self.names().update(names)
+
+    def invalidate(self, *args):
+        self._names = None
+
+
+def shared_nodes(long=False, uuid=False):
+    '''
+    The shared and default nodes of the scene, see SHARED_TYPES
+    Args:
+        long(Bool): Full paths instead of short names
+        uuid(Bool): UUIDs instead of names
+
+    Returns:
+        nodes(Set): The names or UUIDs
+    '''
+    import maya.cmds as cmds
+
+    nodes = set(cmds.ls(type=SHARED_TYPES, long=long) or []) | set(cmds.ls(defaultNodes=True, long=long) or [])
+    if uuid:
+        return set(cmds.ls(list(nodes), uuid=True) or [])
+    return nodes
+
+
+_scene_index = None
+
+
+def get_scene_index():
+    '''
+    Get the shared scene name index, it is invalidated whenever a scene is opened or a new scene is made
+    '''
+    global _scene_index
+    if _scene_index is None:
+        _scene_index = SceneNameIndex()
+        try:
+            import maya.api.OpenMaya as om2
+            for message in [om2.MSceneMessage.kAfterOpen, om2.MSceneMessage.kAfterNew]:
+                om2.MSceneMessage.addCallback(message, _scene_index.invalidate)
+        except ImportError:
+            pass
+    return _scene_index
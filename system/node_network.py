@@ -0,0 +1,505 @@
+'''
+Optimization pass over the utility node networks SPYDR builds (stretchy IK, squash and stretch, foot roll...).
+The arithmetic nodes of a network are read into scalar operations, then:
+    - constants are folded: ops with constant inputs become plain values, identity ops (x * 1, x + 0) are bypassed
+      and chained constant ops are collapsed, e.g. (x / a) * b becomes x * (b / a)
+    - duplicate ops that read the same inputs are merged, and so are duplicate non arithmetic nodes
+      (conditions, blendColors, clamps...) with the same inputs and settings
+    - independent scalar ops are packed three at a time into the X/Y/Z channels of shared nodes, a lone add or mult
+      gets an addDoubleLinear or multDoubleLinear instead of a whole plusMinusAverage or multiplyDivide
+The rebuilt network gives the same outputs with fewer DG nodes.
+'''
+
+import maya.cmds as cmds
+
+AXES = ["X", "Y", "Z"]
+
+# multiplyDivide operation for each op kind
+MD_OPERATIONS = {"none": 0, "mult": 1, "div": 2, "pow": 3}
+
+# Settings compared when merging duplicate non arithmetic nodes, nodes of other types are never merged
+SIGNATURE_ATTRS = {
+    "condition": ["operation", "firstTerm", "secondTerm", "colorIfTrueR", "colorIfTrueG", "colorIfTrueB",
+                  "colorIfFalseR", "colorIfFalseG", "colorIfFalseB"],
+    "clamp": ["minR", "minG", "minB", "maxR", "maxG", "maxB", "inputR", "inputG", "inputB"],
+    "blendColors": ["blender", "color1R", "color1G", "color1B", "color2R", "color2G", "color2B"],
+    "distanceBetween": ["point1X", "point1Y", "point1Z", "point2X", "point2Y", "point2Z"],
+    "curveInfo": [],
+}
+
+
+class ScalarOp(object):
+    '''
+    One scalar operation: output = kind(a, b). Inputs are ("plug", "node.attr") or ("value", float)
+    '''
+    def __init__(self, node, kind, a, b, output):
+        self.node = node
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self.output = output
+        self.destinations = []
+
+    def constant(self):
+        return self.a[0] == "value" and (self.b is None or self.b[0] == "value")
+
+    def evaluate(self):
+        a = self.a[1]
+        b = self.b[1] if self.b else None
+        if self.kind == "mult":
+            return a * b
+        if self.kind == "add":
+            return a + b
+        if self.kind == "div":
+            return a / b if b else 0.0
+        if self.kind == "pow":
+            return a ** b
+        if self.kind == "reverse":
+            return 1.0 - a
+        return a
+
+
+def _attr(plug):
+    return plug.split(".", 1)[1].rsplit(".", 1)[-1]
+
+
+def _node(plug):
+    return plug.split(".", 1)[0]
+
+
+def _connections(node, source):
+    '''
+    Returns:
+        {attr on node: [other plugs]} of incoming (source=True) or outgoing connections
+    '''
+    result = {}
+    pairs = cmds.listConnections(node, source=source, destination=not source, plugs=True, connections=True,
+                                 skipConversionNodes=True) or []
+    for i in range(0, len(pairs), 2):
+        result.setdefault(_attr(pairs[i]), []).append(pairs[i + 1])
+    return result
+
+
+def _input(node, attr, incoming):
+    if attr in incoming:
+        return ("plug", incoming[attr][0])
+    return ("value", float(cmds.getAttr("{}.{}".format(node, attr))))
+
+
+def read_ops(node):
+    '''
+    Turn an arithmetic node into scalar ops
+    Args:
+        node(String): A utility node
+
+    Returns:
+        A list of ScalarOp, or None when the node can't be split (other node types, compound connections)
+    '''
+    node_type = cmds.nodeType(node)
+    incoming = _connections(node, True)
+    outgoing = _connections(node, False)
+
+    if node_type in ("multDoubleLinear", "addDoubleLinear"):
+        if set(outgoing) - {"output"}:
+            return None
+        kind = "mult" if node_type == "multDoubleLinear" else "add"
+        op = ScalarOp(node, kind, _input(node, "input1", incoming), _input(node, "input2", incoming), node + ".output")
+        op.destinations = outgoing.get("output", [])
+        return [op]
+
+    if node_type in ("multiplyDivide", "reverse"):
+        # Compound connections (e.g. output -> translate) drive all three channels at once
+        compound = ["input1", "input2", "output"] if node_type == "multiplyDivide" else ["input", "output"]
+        if set(compound) & (set(incoming) | set(outgoing)):
+            return None
+        if node_type == "multiplyDivide":
+            kinds = {v: k for k, v in MD_OPERATIONS.items()}
+            kind = kinds[cmds.getAttr(node + ".operation")]
+        ops = []
+        for axis in AXES:
+            destinations = outgoing.get("output" + axis, [])
+            if not destinations:
+                continue
+            if node_type == "multiplyDivide":
+                op = ScalarOp(node, kind, _input(node, "input1" + axis, incoming),
+                              _input(node, "input2" + axis, incoming), "{}.output{}".format(node, axis))
+            else:
+                op = ScalarOp(node, "reverse", _input(node, "input" + axis, incoming), None,
+                              "{}.output{}".format(node, axis))
+            op.destinations = destinations
+            ops.append(op)
+        return ops
+
+    return None
+
+
+class NetworkOptimizer(object):
+    '''
+    Folds, merges and packs the arithmetic of a set of utility nodes
+    '''
+    def __init__(self, nodes):
+        self.nodes = [i for i in cmds.ls(nodes) if cmds.objExists(i)]
+        self.report = {"nodes_before": len(self.nodes), "folded": 0, "merged": 0, "packed": 0}
+        self._upstream = {}
+
+    ##############
+    ##Read/merge##
+    ##############
+
+    def merge_nodes(self):
+        '''
+        Merge non arithmetic nodes of the same type with the same incoming connections and settings, repeated until
+        nothing merges since merging a node can make the nodes reading it identical
+        '''
+        while self._merge_nodes():
+            pass
+
+    def _merge_nodes(self):
+        merged = False
+        signatures = {}
+        for node in list(self.nodes):
+            node_type = cmds.nodeType(node)
+            if node_type not in SIGNATURE_ATTRS:
+                continue
+            incoming = _connections(node, True)
+            values = tuple(round(float(cmds.getAttr("{}.{}".format(node, i))), 9) for i in SIGNATURE_ATTRS[node_type]
+                           if i not in incoming)
+            signature = (node_type, tuple(sorted((k, tuple(v)) for k, v in incoming.items())), values)
+            if signature not in signatures:
+                signatures[signature] = node
+                continue
+            # Move the outputs of the duplicate onto the node we keep
+            keep = signatures[signature]
+            for attr, destinations in _connections(node, False).items():
+                for destination in destinations:
+                    cmds.connectAttr("{}.{}".format(keep, attr), destination, force=True)
+            cmds.delete(node)
+            self.nodes.remove(node)
+            self.report["merged"] += 1
+            merged = True
+        return merged
+
+    def read(self):
+        self.ops = []
+        self.op_nodes = []
+        for node in self.nodes:
+            ops = read_ops(node)
+            if ops is not None:
+                self.ops.extend(ops)
+                self.op_nodes.append(node)
+        # Plugs on other arithmetic nodes are tracked as op inputs, destinations only hold plugs outside of them
+        for op in self.ops:
+            op.destinations = [i for i in op.destinations if _node(i) not in self.op_nodes]
+        # Outside destinations that get a constant or a direct connection once their op is removed
+        self.constants = {}
+        self.reroutes = []
+
+    ##########
+    ##Passes##
+    ##########
+
+    def _consumers(self, output):
+        return [i for i in self.ops if i.a == ("plug", output) or (i.b and i.b == ("plug", output))]
+
+    def _replace_source(self, op, source):
+        '''
+        Send everything reading op's output to another source, a plug or a constant
+        '''
+        for consumer in self._consumers(op.output):
+            if consumer.a == ("plug", op.output):
+                consumer.a = source
+            if consumer.b == ("plug", op.output):
+                consumer.b = source
+        owner = self._owner(source[1]) if source[0] == "plug" else None
+        for destination in op.destinations:
+            if source[0] == "value":
+                self.constants[destination] = source[1]
+            elif owner:
+                owner.destinations.append(destination)
+            else:
+                self.reroutes.append((source[1], destination))
+        op.destinations = []
+
+    def _owner(self, plug):
+        for i in self.ops:
+            if i.output == plug:
+                return i
+        return None
+
+    def fold(self):
+        '''
+        Fold constant ops, bypass identities and collapse chained constant ops until nothing changes
+        '''
+        changed = True
+        while changed:
+            changed = False
+            for op in list(self.ops):
+                source = None
+                if op.constant() and not (op.kind == "pow" and op.a[1] < 0 and not float(op.b[1]).is_integer()):
+                    source = ("value", op.evaluate())
+                elif op.kind == "none":
+                    source = op.a
+                elif op.kind in ("mult", "div", "pow") and op.b == ("value", 1.0):
+                    source = op.a
+                elif op.kind == "mult" and op.a == ("value", 1.0):
+                    source = op.b
+                elif op.kind == "add" and op.b == ("value", 0.0):
+                    source = op.a
+                elif op.kind == "add" and op.a == ("value", 0.0):
+                    source = op.b
+                elif self._collapse(op):
+                    changed = True
+                    self.report["folded"] += 1
+                    continue
+
+                if source is not None:
+                    self._replace_source(op, source)
+                    self.ops.remove(op)
+                    self.report["folded"] += 1
+                    changed = True
+                elif not op.destinations and not self._consumers(op.output):
+                    # Nothing reads this op anymore
+                    self.ops.remove(op)
+                    changed = True
+
+    def _collapse(self, op):
+        '''
+        Rewrite op onto the input of a constant op feeding it: (x*a)*b, (x/a)*b, (x+a)+b and 1/(x^a)
+        '''
+        if op.kind in ("mult", "add") and op.a[0] == "value" and op.b[0] == "plug":
+            op.a, op.b = op.b, op.a
+        if op.a[0] != "plug" or not op.b or op.b[0] != "value":
+            if op.kind == "div" and op.a == ("value", 1.0) and op.b[0] == "plug":
+                inner = self._owner(op.b[1])
+                if inner and inner.kind == "pow" and inner.b[0] == "value":
+                    op.kind, op.a, op.b = "pow", inner.a, ("value", -inner.b[1])
+                    return True
+            return False
+
+        inner = self._owner(op.a[1])
+        if not inner or not inner.b or inner.b[0] != "value" or inner.a[0] != "plug":
+            return False
+        if op.kind == "mult" and inner.kind == "mult":
+            op.a, op.b = inner.a, ("value", inner.b[1] * op.b[1])
+        elif op.kind == "mult" and inner.kind == "div" and inner.b[1]:
+            op.a, op.b = inner.a, ("value", op.b[1] / inner.b[1])
+        elif op.kind == "add" and inner.kind == "add":
+            op.a, op.b = inner.a, ("value", inner.b[1] + op.b[1])
+        else:
+            return False
+        return True
+
+    def merge_ops(self):
+        '''
+        Merge ops of the same kind reading the same inputs
+        '''
+        seen = {}
+        for op in list(self.ops):
+            inputs = (op.a, op.b)
+            if op.kind in ("mult", "add"):
+                inputs = tuple(sorted(inputs))
+            key = (op.kind, inputs)
+            if key not in seen:
+                seen[key] = op
+                continue
+            keep = seen[key]
+            keep.destinations.extend(op.destinations)
+            op.destinations = []
+            for consumer in self._consumers(op.output):
+                if consumer.a == ("plug", op.output):
+                    consumer.a = ("plug", keep.output)
+                if consumer.b == ("plug", op.output):
+                    consumer.b = ("plug", keep.output)
+            self.ops.remove(op)
+            self.report["merged"] += 1
+
+    def _upstream_nodes(self, node):
+        '''
+        Every node that node depends on, through connections and through the DAG parents of world space nodes
+        '''
+        if node not in self._upstream:
+            upstream = set()
+            roots = [node]
+            while roots:
+                for i in cmds.listHistory(roots.pop(), pruneDagObjects=False) or []:
+                    if i in upstream:
+                        continue
+                    upstream.add(i)
+                    roots.extend(parent for parent in cmds.listRelatives(i, allParents=True) or []
+                                 if parent not in upstream)
+            self._upstream[node] = upstream
+        return self._upstream[node]
+
+    def _dependencies(self):
+        '''
+        Returns:
+            {op: ops it reads}, directly or through nodes outside of the network
+        '''
+        outputs = {op.output: op for op in self.ops}
+        by_node = {}
+        for op in self.ops:
+            by_node.setdefault(op.node, []).append(op)
+
+        dependencies = {}
+        for op in self.ops:
+            dependencies[op] = set()
+            for source in (op.a, op.b):
+                if not source or source[0] != "plug":
+                    continue
+                if source[1] in outputs:
+                    dependencies[op].add(outputs[source[1]])
+                    continue
+                for node in self._upstream_nodes(_node(source[1])):
+                    dependencies[op].update(by_node.get(node, []))
+            dependencies[op].discard(op)
+        return dependencies
+
+    def _sorted_ops(self, dependencies):
+        '''
+        The ops with every op after the ops it reads, the original order is kept if the scene already has a cycle
+        '''
+        ordered = []
+        remaining = list(self.ops)
+        while remaining:
+            ready = [i for i in remaining if not dependencies[i] - set(ordered)]
+            if not ready:
+                return ordered + remaining
+            ordered.extend(ready)
+            remaining = [i for i in remaining if i not in ready]
+        return ordered
+
+    def _acyclic(self, assignment, dependencies):
+        '''
+        Whether the packed nodes can evaluate without a cycle, an op reading an op of its own pack is a cycle too
+        '''
+        edges = {}
+        for op, pack in assignment.items():
+            for dependency in dependencies[op]:
+                if dependency in assignment:
+                    edges.setdefault(assignment[dependency], set()).add(pack)
+
+        visiting = set()
+        done = set()
+
+        def visit(pack):
+            if pack in done:
+                return True
+            if pack in visiting:
+                return False
+            visiting.add(pack)
+            if not all(visit(i) for i in edges.get(pack, ())):
+                return False
+            visiting.discard(pack)
+            done.add(pack)
+            return True
+
+        return all(visit(i) for i in list(edges))
+
+    def pack(self):
+        '''
+        Group independent ops of the same kind, three per node. Ops are visited dependencies first, so an op that
+        can't join an existing pack never closes a cycle by starting its own
+        '''
+        dependencies = self._dependencies()
+        assignment = {}
+        self.packs = []
+        for op in self._sorted_ops(dependencies):
+            for index, pack in enumerate(self.packs):
+                if len(pack) == 3 or pack[0].kind != op.kind:
+                    continue
+                assignment[op] = index
+                if self._acyclic(assignment, dependencies):
+                    pack.append(op)
+                    break
+            else:
+                assignment[op] = len(self.packs)
+                self.packs.append([op])
+        self.report["packed"] = len([i for i in self.packs if len(i) > 1])
+
+    #########
+    ##Apply##
+    #########
+
+    def apply(self):
+        '''
+        Replace the arithmetic nodes with the packed network
+        '''
+        # Create the packed nodes first so every op knows its new output plug
+        outputs = {}
+        created = []
+        for pack in self.packs:
+            kind = pack[0].kind
+            base = pack[0].node
+            if kind in ("add", "mult") and len(pack) == 1:
+                # A lone op only pays for a three channel node, the linear node does the same work
+                node_type = "addDoubleLinear" if kind == "add" else "multDoubleLinear"
+                node = cmds.createNode(node_type, name="{}_packed".format(base), skipSelect=True)
+                inputs = [(node + ".input1", node + ".input2", node + ".output")]
+            elif kind == "add":
+                node = cmds.createNode("plusMinusAverage", name="{}_packed".format(base), skipSelect=True)
+                cmds.setAttr(node + ".operation", 1)
+                inputs = [("{}.input3D[0].input3D{}".format(node, i.lower()),
+                           "{}.input3D[1].input3D{}".format(node, i.lower()), "{}.output3D{}".format(node, i.lower()))
+                          for i in AXES]
+            elif kind == "reverse":
+                node = cmds.createNode("reverse", name="{}_packed".format(base), skipSelect=True)
+                inputs = [("{}.input{}".format(node, i), None, "{}.output{}".format(node, i)) for i in AXES]
+            else:
+                node = cmds.createNode("multiplyDivide", name="{}_packed".format(base), skipSelect=True)
+                cmds.setAttr(node + ".operation", MD_OPERATIONS[kind])
+                inputs = [("{}.input1{}".format(node, i), "{}.input2{}".format(node, i), "{}.output{}".format(node, i))
+                          for i in AXES]
+            created.append(node)
+            for op, channel in zip(pack, inputs):
+                outputs[op.output] = channel
+
+        def source_plug(source):
+            return outputs.get(source[1], (None, None, source[1]))[2]
+
+        # Wire every op into its channel
+        connections = []
+        for pack in self.packs:
+            for op in pack:
+                input_a, input_b, output = outputs[op.output]
+                for plug, source in [(input_a, op.a), (input_b, op.b)]:
+                    if plug is None or source is None:
+                        continue
+                    if source[0] == "value":
+                        cmds.setAttr(plug, source[1])
+                    else:
+                        connections.append((source_plug(source), plug))
+                for destination in op.destinations:
+                    connections.append((output, destination))
+
+        # Old nodes go before the new connections are made so nothing is connected twice
+        if self.op_nodes:
+            cmds.delete(self.op_nodes)
+        for source, destination in connections + self.reroutes:
+            cmds.connectAttr(source, destination, force=True)
+        for destination, value in self.constants.items():
+            cmds.setAttr(destination, value)
+
+        self.nodes = [i for i in self.nodes if i not in self.op_nodes] + created
+        self.report["nodes_after"] = len(self.nodes)
+        return self.nodes
+
+
+def optimize_network(nodes):
+    '''
+    Fold, merge and pack a utility node network in place
+    Args:
+        nodes(List): The utility nodes of the network, other nodes they connect to are left alone
+
+    Returns:
+        report(Dict): Node counts before and after and what each pass did, "nodes" holds the remaining nodes
+    '''
+    optimizer = NetworkOptimizer([str(i) for i in nodes])
+    optimizer.merge_nodes()
+    optimizer.read()
+    optimizer.fold()
+    optimizer.merge_ops()
+    optimizer.pack()
+    report = dict(optimizer.report)
+    report["nodes"] = optimizer.apply()
+    report["nodes_after"] = len(report["nodes"])
+    return report
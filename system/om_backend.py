@@ -0,0 +1,93 @@
+'''
+OpenMaya 2.0 backend for the joint and control builders in system.utils.
+Whole joint chains and control hierarchies are created through one MDagModifier each instead of one cmds call
+per node. The return values match the cmds backend so callers don't need to know which one ran.
+'''
+
+import maya.api.OpenMaya as om2
+
+import system.build_session as build_session
+
+
+def _get_dag_path(name):
+    selection = om2.MSelectionList()
+    selection.add(name)
+    return selection.getDagPath(0)
+
+
+def _set_translation(modifier, node, position):
+    plug = om2.MFnDependencyNode(node).findPlug("translate", False)
+    for i, value in enumerate(position):
+        modifier.newPlugValueMDistance(plug.child(i), om2.MDistance(value, om2.MDistance.uiUnit()))
+
+
+def createJoint(name, position, instance):
+    '''
+    Create a joint chain where every joint is parented to the previous one, like cmds.joint with a selection
+    Args:
+        name(List): Joint names, "s_" is replaced with the instance
+        position(List): World space positions for each joint
+        instance(String): The side prefix, typically Left_ or Right_
+
+    Returns:
+        joint_list(List): The names of the created joints
+    '''
+    modifier = build_session.record_modifier(om2.MDagModifier())
+    joints = []
+    parent = om2.MObject.kNullObj
+    parent_position = [0.0, 0.0, 0.0]
+    for i in range(len(name)):
+        joint = modifier.createNode("joint", parent)
+        modifier.renameNode(joint, name[i].replace('s_', instance))
+        # The joints have no orientation yet so the local translation is the offset from the parent
+        _set_translation(modifier, joint, [a - b for a, b in zip(position[i], parent_position)])
+        joints.append(joint)
+        parent = joint
+        parent_position = position[i]
+    modifier.doIt()
+
+    return [om2.MFnDependencyNode(i).name() for i in joints]
+
+
+def createControl(ctrlInfo, flip=True):
+    '''
+    Create circle controls under zero groups, like utils.createControl
+    Args:
+        ctrlInfo(List): [position or node to match, control name] pairs
+        flip(Bool): Rotate the circle normal by 90 in X
+
+    Returns:
+        control_info(List): [ctrl_group, [ctrl, makeNurbCircle]] for each control
+    '''
+    modifier = build_session.record_modifier(om2.MDagModifier())
+    created = []
+    for info in ctrlInfo:
+        ctrl_group = modifier.createNode("transform", om2.MObject.kNullObj)
+        modifier.renameNode(ctrl_group, "{}_GRP".format(info[1]))
+        ctrl = modifier.createNode("transform", ctrl_group)
+        modifier.renameNode(ctrl, info[1])
+        shape = modifier.createNode("nurbsCurve", ctrl)
+        modifier.renameNode(shape, "{}Shape".format(info[1]))
+        make_circle = om2.MDGModifier.createNode(modifier, "makeNurbCircle")
+
+        circle_fn = om2.MFnDependencyNode(make_circle)
+        modifier.connect(circle_fn.findPlug("outputCurve", False),
+                         om2.MFnDependencyNode(shape).findPlug("create", False))
+        if flip:
+            modifier.newPlugValueDouble(circle_fn.findPlug("normalX", False), 90)
+
+        # Move the group to the position, matching transforms has to wait until the nodes exist
+        if isinstance(info[0], (list, tuple)):
+            _set_translation(modifier, ctrl_group, info[0])
+        created.append([ctrl_group, ctrl, make_circle, info[0]])
+    modifier.doIt()
+
+    control_info = []
+    for ctrl_group, ctrl, make_circle, target in created:
+        group_path = om2.MDagPath.getAPathTo(ctrl_group)
+        if not isinstance(target, (list, tuple)):
+            matrix = om2.MTransformationMatrix(_get_dag_path(target).inclusiveMatrix())
+            om2.MFnTransform(group_path).setTransformation(matrix)
+        control_info.append([group_path.partialPathName(),
+                             [om2.MFnDependencyNode(ctrl).name(), om2.MFnDependencyNode(make_circle).name()]])
+    return control_info
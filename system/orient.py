@@ -0,0 +1,277 @@
+'''
+Joint orientation solver.
+Orients for whole joint hierarchies are solved with NumPy from world positions and an orientJoint style axis spec
+("xzy" with a "zup" secondary axis, as in the rig templates), then written through one MDGModifier, instead of a
+cmds.joint edit pass per root or a temporary aimConstraint per joint. Matrices are row vectors like Maya's: row 0 of a
+rotation is the world direction of the joint's X axis.
+
+    orient.orient_joints(["L_shoulder_JNT"], "xzy", "zup")
+    orients, translates = orient.chain_values(positions, "xzy", "zup")    # no scene needed
+'''
+
+import numpy as np
+
+import system.build_session as build_session
+
+AXES = "xyz"
+WORLD = {"xup": (1.0, 0.0, 0.0), "xdown": (-1.0, 0.0, 0.0), "yup": (0.0, 1.0, 0.0), "ydown": (0.0, -1.0, 0.0),
+         "zup": (0.0, 0.0, 1.0), "zdown": (0.0, 0.0, -1.0)}
+TOLERANCE = 1e-8
+
+
+def parse_orient(primary_orient):
+    '''
+    Split an orientJoint string into axis indices
+    Returns:
+        (primary, secondary, tertiary) axis indices, None for "none"
+    '''
+    if primary_orient == "none":
+        return None
+    if sorted(primary_orient) != sorted(AXES):
+        raise RuntimeError("Unknown joint orientation: {}".format(primary_orient))
+    return tuple(AXES.index(i) for i in primary_orient)
+
+
+def up_vector(secondary_orient):
+    '''
+    The world direction of a secondaryAxisOrient string, None for "none"
+    '''
+    if secondary_orient == "none":
+        return None
+    if secondary_orient not in WORLD:
+        raise RuntimeError("Unknown secondary axis orient: {}".format(secondary_orient))
+    return np.array(WORLD[secondary_orient])
+
+
+def _unit(vectors):
+    '''
+    Normalize rows, rows too short to have a direction are left at zero
+    Returns:
+        vectors, valid: The unit rows and a mask of the rows that had a direction
+    '''
+    lengths = np.asarray(np.linalg.norm(vectors, axis=-1))
+    valid = lengths > TOLERANCE
+    return np.where(valid[..., np.newaxis], vectors / np.where(valid, lengths, 1.0)[..., np.newaxis], 0.0), valid
+
+
+def _perpendicular(vector):
+    # The world axis least aligned with vector, made perpendicular to it
+    axis = np.eye(3)[np.argmin(np.abs(vector))]
+    return _unit(axis - axis.dot(vector) * vector)[0]
+
+
+def aim_rotations(aims, ups, primary_orient="xyz"):
+    '''
+    World rotations with the primary axis along each aim and the secondary axis as close to each up as it can be
+    Args:
+        aims: (N, 3) aim directions
+        ups: (N, 3) or (3,) up directions
+        primary_orient(String): orientJoint style axes, the first aims and the second points up
+
+    Returns:
+        rotations: (N, 3, 3) rotations, rows where the aim or up has no direction are left at zero
+        valid: (N,) mask of the rows that solved
+    '''
+    primary, secondary, tertiary = parse_orient(primary_orient)
+    aims, aim_valid = _unit(np.asarray(aims, dtype=np.float64).reshape(-1, 3))
+    ups = np.broadcast_to(np.asarray(ups, dtype=np.float64), aims.shape)
+    ups, up_valid = _unit(ups - (ups * aims).sum(axis=1)[:, np.newaxis] * aims)
+
+    rotations = np.zeros((len(aims), 3, 3))
+    rotations[:, primary] = aims
+    rotations[:, secondary] = ups
+    # The last axis completes a right handed frame: x = y ^ z, y = z ^ x, z = x ^ y
+    rotations[:, tertiary] = np.cross(rotations[:, (tertiary + 1) % 3], rotations[:, (tertiary + 2) % 3])
+    return rotations, aim_valid & up_valid
+
+
+def solve_rotations(positions, parents, primary_orient="xyz", secondary_orient="yup", root_rotations=None):
+    '''
+    World rotations of every joint of a hierarchy, like joint -edit -orientJoint -children -zeroScaleOrient
+    Each joint aims its primary axis at its first child, joints without children keep their parent's orientation
+    Args:
+        positions: (N, 3) world positions
+        parents(List): The index of each joint's parent, None for roots, parents before children
+        root_rotations: (N, 3, 3) world rotations of each joint's parent space, only read for roots, the world by
+            default
+
+    Returns:
+        (N, 3, 3) world rotations
+    '''
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    count = len(positions)
+    if root_rotations is None:
+        root_rotations = np.broadcast_to(np.eye(3), (count, 3, 3))
+    axes = parse_orient(primary_orient)
+    if axes is None:
+        # "none" lines every joint up with the world
+        return np.broadcast_to(np.eye(3), (count, 3, 3)).copy()
+
+    children = [None] * count
+    for i, parent in enumerate(parents):
+        if parent is not None and children[parent] is None:
+            children[parent] = i
+    has_child = np.array([i is not None for i in children], dtype=bool)
+    targets = np.array([child if child is not None else i for i, child in enumerate(children)], dtype=np.int64)
+    aims = positions[targets] - positions
+
+    up = up_vector(secondary_orient)
+    if up is None:
+        # No world direction, the secondary axis takes the normal of the plane the joint bends in
+        incoming = np.array([positions[i] - positions[p] if p is not None else aims[i] for i, p in enumerate(parents)])
+        up = np.cross(incoming, aims)
+    rotations, valid = aim_rotations(aims, up, primary_orient)
+
+    secondary = axes[1]
+    for i, parent in enumerate(parents):
+        parent_rotation = rotations[parent] if parent is not None else root_rotations[i]
+        if not has_child[i]:
+            rotations[i] = parent_rotation
+        elif not valid[i]:
+            # The up lines up with the bone, carry the secondary axis on from the parent
+            aim = _unit(aims[i])[0]
+            if not aim.any():
+                rotations[i] = parent_rotation
+                continue
+            fallback = parent_rotation[secondary] if parent is not None else np.zeros(3)
+            fallback = _unit(fallback - fallback.dot(aim) * aim)[0]
+            if not fallback.any():
+                fallback = _perpendicular(aim)
+            rotations[i] = aim_rotations(aim[np.newaxis], fallback, primary_orient)[0][0]
+    return rotations
+
+
+def euler_xyz(matrices):
+    '''
+    XYZ euler angles of rotation matrices, the order jointOrient uses
+    Args:
+        matrices: (N, 3, 3) rotations
+
+    Returns:
+        (N, 3) angles in degrees
+    '''
+    m = np.asarray(matrices, dtype=np.float64).reshape(-1, 3, 3)
+    cos_y = np.sqrt(m[:, 0, 0] ** 2 + m[:, 0, 1] ** 2)
+    gimbal = cos_y < 1e-6
+    x = np.where(gimbal, np.arctan2(-m[:, 2, 1], m[:, 1, 1]), np.arctan2(m[:, 1, 2], m[:, 2, 2]))
+    y = np.arctan2(-m[:, 0, 2], cos_y)
+    z = np.where(gimbal, 0.0, np.arctan2(m[:, 0, 1], m[:, 0, 0]))
+    return np.degrees(np.stack([x, y, z], axis=1))
+
+
+def local_values(positions, rotations, parents, root_parents=None):
+    '''
+    The jointOrient and translate that put every joint at its world position and rotation, rotate and rotateAxis
+    at zero. Joints below the roots are taken to be unscaled
+    Args:
+        root_parents: (N, 4, 4) world matrices of each joint's parent space, only read for roots, the world by default
+
+    Returns:
+        orients: (N, 3) jointOrient in degrees
+        translates: (N, 3) translate
+    '''
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    count = len(positions)
+    if root_parents is None:
+        root_parents = np.broadcast_to(np.eye(4), (count, 4, 4))
+
+    local_rotations = np.empty((count, 3, 3))
+    translates = np.empty((count, 3))
+    for i, parent in enumerate(parents):
+        if parent is None:
+            parent_inverse = np.linalg.inv(root_parents[i])
+            translates[i] = np.append(positions[i], 1.0).dot(parent_inverse)[:3]
+            parent_rotation = _unit(root_parents[i][:3, :3])[0]
+        else:
+            parent_rotation = rotations[parent]
+            translates[i] = (positions[i] - positions[parent]).dot(parent_rotation.T)
+        local_rotations[i] = rotations[i].dot(parent_rotation.T)
+    return euler_xyz(local_rotations), translates
+
+
+def chain_values(positions, primary_orient="xyz", secondary_orient="yup", parents=None):
+    '''
+    Solve a joint chain without the scene, e.g. for a build plan
+    Args:
+        positions: World positions from parent to child
+        parents(List): The parent index of each joint, a single chain under the world by default
+
+    Returns:
+        orients: (N, 3) jointOrient in degrees
+        translates: (N, 3) translate
+    '''
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if parents is None:
+        parents = [None] + list(range(len(positions) - 1))
+    rotations = solve_rotations(positions, parents, primary_orient, secondary_orient)
+    return local_values(positions, rotations, parents)
+
+
+def apply_orients(joints, orients, translates=None):
+    '''
+    Write jointOrient, and optionally translate, to joints in one pass, rotate and rotateAxis are zeroed
+    Args:
+        joints(List): Joint names
+        orients: (N, 3) jointOrient in degrees
+        translates: (N, 3) translate in centimeters
+    '''
+    import maya.api.OpenMaya as om2
+
+    selection = om2.MSelectionList()
+    for joint in joints:
+        selection.add(str(joint))
+    modifier = build_session.record_modifier(om2.MDGModifier())
+    for i in range(selection.length()):
+        joint_fn = om2.MFnDependencyNode(selection.getDependNode(i))
+        for attr, values in [("jointOrient", orients[i]), ("rotate", (0.0, 0.0, 0.0)), ("rotateAxis", (0.0, 0.0, 0.0))]:
+            plug = joint_fn.findPlug(attr, False)
+            for axis in range(3):
+                modifier.newPlugValueMAngle(plug.child(axis), om2.MAngle(float(values[axis]), om2.MAngle.kDegrees))
+        if translates is not None:
+            plug = joint_fn.findPlug("translate", False)
+            for axis in range(3):
+                modifier.newPlugValueMDistance(plug.child(axis),
+                                               om2.MDistance(float(translates[i][axis]), om2.MDistance.kCentimeters))
+    modifier.doIt()
+
+
+def orient_joints(joints, primary_orient="xyz", secondary_orient="yup"):
+    '''
+    Orient joints and every joint below them, like joint -edit -orientJoint -children -zeroScaleOrient
+    Args:
+        joints(List): The top joints of the hierarchies to orient
+        primary_orient(String): orientJoint style axes, e.g. "xzy"
+        secondary_orient(String): Where the secondary axis points, e.g. "zup"
+
+    Returns:
+        joints(List): The full paths of every oriented joint
+    '''
+    import maya.api.OpenMaya as om2
+    import system.hierarchy as hierarchy
+
+    index = hierarchy.get_index()
+    paths = []
+    lookup = {}
+    for joint in joints:
+        for path in index.descendants(joint):
+            if path not in lookup:
+                lookup[path] = len(paths)
+                paths.append(path)
+    parents = [lookup.get(index.parent(i)) for i in paths]
+
+    selection = om2.MSelectionList()
+    for path in paths:
+        selection.add(path)
+    positions = np.empty((len(paths), 3))
+    root_parents = np.broadcast_to(np.eye(4), (len(paths), 4, 4)).copy()
+    for i in range(len(paths)):
+        dag_path = selection.getDagPath(i)
+        positions[i] = np.array(list(dag_path.inclusiveMatrix())).reshape(4, 4)[3, :3]
+        if parents[i] is None:
+            root_parents[i] = np.array(list(dag_path.exclusiveMatrix())).reshape(4, 4)
+
+    root_rotations = _unit(root_parents[:, :3, :3])[0]
+    rotations = solve_rotations(positions, parents, primary_orient, secondary_orient, root_rotations)
+    orients, translates = local_values(positions, rotations, parents, root_parents)
+    apply_orients(paths, orients, translates)
+    return paths
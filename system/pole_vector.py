@@ -0,0 +1,73 @@
+'''
+Batch pole vector solver. One call computes the pole vector positions of any number of three joint chains from
+their positions, without querying the scene.
+'''
+
+import numpy as np
+
+# Chains shorter than this, or with a mid joint closer than this to the start/end line, count as degenerate
+EPSILON = 1e-6
+# Offset used for collinear chains, as a fraction of the start to end length, before pv_distance is applied
+FALLBACK_OFFSET = 0.1
+
+
+def calculate_pole_vector_positions(chains, pv_distance=5, fallback_direction=(0.0, 0.0, -1.0)):
+    '''
+    Calculate the pole vector positions for many three joint chains in one pass
+    Args:
+        chains: An (N, 3, 3) array of start/mid/end world positions, a single (3, 3) chain is also accepted
+        pv_distance: A single distance or one distance per chain, multiplies the offset of the mid joint
+        fallback_direction: Preferred direction for collinear chains, the part along the chain is removed
+
+    Returns:
+        An (N, 3) array of pole vector positions, or (3,) for a single chain
+    '''
+    chains = np.asarray(chains, dtype=np.float64)
+    single = chains.ndim == 2
+    if single:
+        chains = chains[np.newaxis]
+    if chains.ndim != 3 or chains.shape[1:] != (3, 3):
+        raise RuntimeError("Expected an (N, 3, 3) array of start/mid/end positions, got {}".format(chains.shape))
+
+    start, mid, end = chains[:, 0], chains[:, 1], chains[:, 2]
+    distances = np.broadcast_to(np.asarray(pv_distance, dtype=np.float64), (len(chains),))
+
+    start_end = end - start
+    start_mid = mid - start
+    start_end_length = np.linalg.norm(start_end, axis=1)
+
+    # Project the mid joint onto the start/end line, the arrow is what's left over
+    safe_length = np.where(start_end_length > EPSILON, start_end_length, 1.0)
+    start_end_n = start_end / safe_length[:, np.newaxis]
+    proj = np.einsum("ij,ij->i", start_mid, start_end_n)
+    arrow = start_mid - start_end_n * proj[:, np.newaxis]
+    # When start and end overlap there is no line to project on, the mid joint direction is the arrow
+    arrow = np.where((start_end_length > EPSILON)[:, np.newaxis], arrow, start_mid)
+
+    # Collinear chains get a perpendicular of the fallback direction instead of a zero length arrow
+    degenerate = np.linalg.norm(arrow, axis=1) <= EPSILON * np.maximum(start_end_length, 1.0)
+    if degenerate.any():
+        arrow[degenerate] = _fallback_arrows(start_end_n[degenerate], start_end_length[degenerate],
+                                             np.asarray(fallback_direction, dtype=np.float64))
+
+    positions = mid + arrow * distances[:, np.newaxis]
+    return positions[0] if single else positions
+
+
+def _fallback_arrows(directions, lengths, fallback_direction):
+    '''
+    Build arrows perpendicular to each chain direction, leaning towards the fallback direction
+    '''
+    fallback = np.broadcast_to(fallback_direction, directions.shape).copy()
+    fallback -= directions * np.einsum("ij,ij->i", fallback, directions)[:, np.newaxis]
+
+    # The fallback can be parallel to the chain itself, use the world axis least aligned with the chain instead
+    parallel = np.linalg.norm(fallback, axis=1) <= EPSILON
+    if parallel.any():
+        axes = np.eye(3)[np.argmin(np.abs(directions[parallel]), axis=1)]
+        fallback[parallel] = np.cross(directions[parallel], axes)
+        # Chains with no direction at all just use the fallback as is
+        fallback[parallel & (np.linalg.norm(fallback, axis=1) <= EPSILON)] = fallback_direction
+
+    fallback /= np.linalg.norm(fallback, axis=1)[:, np.newaxis]
+    return fallback * (np.maximum(lengths, 1.0) * FALLBACK_OFFSET)[:, np.newaxis]
@@ -0,0 +1,269 @@
+'''
+Opt-in build profiling.
+While enabled, every public builder of system/utils.py, First_auto_rig/rig_arm.py and
+First_auto_rig/temp_utils_and_components.py is wrapped, and so is every maya.cmds and PyMEL command. Each builder call
+records its wall time, its own time, the commands it ran by name and the nodes created while it ran.
+
+The trace is written as JSONL, one builder call per line, and a folded stack file ("a;b;c value", value in
+microseconds) is written on disable for flamegraph.pl, speedscope or inferno:
+    import system.profiling as profiling
+    with profiling.profile("arm_build.jsonl"):
+        Rig_Arm().rig_arm()
+Set SPYDR_PROFILE to a trace path to profile everything from startup.
+
+PyNode methods (rename, setTranslation...) are counted through the commands PyMEL runs for them.
+'''
+
+import contextlib
+import importlib
+import json
+import os
+import time
+
+import system.lazy as lazy
+
+BUILDER_MODULES = ["system.utils", "First_auto_rig.rig_arm", "First_auto_rig.temp_utils_and_components"]
+BUILDER_CLASSES = {"First_auto_rig.rig_arm": ["Rig_Arm"]}
+# Command modules and the prefix their commands are reported with, pymel.internal.pmcmds is what PyNode methods call
+COMMAND_MODULES = [("maya.cmds", "cmds"), ("pymel.internal.pmcmds", "cmds"), ("pymel.core", "pm")]
+
+_profiler = None
+
+
+class Profiler(object):
+    '''
+    Keeps the stack of running builders and writes a record every time one returns
+    '''
+    def __init__(self, trace, folded=None):
+        self.trace_path = trace
+        self.folded_path = folded or os.path.splitext(trace)[0] + ".folded"
+        self.trace = open(trace, 'w')
+        self.stack = []
+        self.folded = {}
+        self.totals = {"builders": 0, "commands": {}, "nodes": 0}
+        self._in_command = False
+        self._patched = []
+        self._callback = None
+
+    ##########
+    ##Stacks##
+    ##########
+
+    def enter(self, name):
+        frame = {"name": name, "start": time.perf_counter(), "child_time": 0.0, "commands": {}, "nodes": 0}
+        self.stack.append(frame)
+        return frame
+
+    def exit(self, frame, error=None):
+        self.stack.pop()
+        wall = time.perf_counter() - frame["start"]
+        self_time = wall - frame["child_time"]
+        path = ";".join(i["name"] for i in self.stack + [frame])
+        if self.stack:
+            self.stack[-1]["child_time"] += wall
+            self.stack[-1]["nodes"] += frame["nodes"]
+
+        record = {"name": frame["name"], "stack": path, "depth": len(self.stack), "wall": wall, "self": self_time,
+                  "commands": frame["commands"], "nodes": frame["nodes"]}
+        if error is not None:
+            record["error"] = "{}: {}".format(type(error).__name__, error)
+        self.trace.write(json.dumps(record) + "\n")
+
+        self._fold(path, self_time)
+        self.totals["builders"] += 1
+
+    def command(self, name, seconds):
+        '''
+        Count a command against the innermost builder and add it as a leaf of the flame graph
+        '''
+        counts = self.totals["commands"]
+        counts[name] = counts.get(name, 0) + 1
+        if not self.stack:
+            return
+        frame = self.stack[-1]
+        frame["commands"][name] = frame["commands"].get(name, 0) + 1
+        frame["child_time"] += seconds
+        self._fold(";".join([i["name"] for i in self.stack] + [name]), seconds)
+
+    def node_added(self, *args):
+        self.totals["nodes"] += 1
+        if self.stack:
+            self.stack[-1]["nodes"] += 1
+
+    def _fold(self, path, seconds):
+        self.folded[path] = self.folded.get(path, 0.0) + seconds
+
+    ############
+    ##Patching##
+    ############
+
+    def _patch(self, owner, attr, wrapper):
+        self._patched.append((owner, attr, owner.__dict__[attr]))
+        setattr(owner, attr, wrapper)
+
+    def wrap_builder(self, name, function):
+        profiler = self
+
+        def builder(*args, **kwargs):
+            frame = profiler.enter(name)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as error:
+                profiler.exit(frame, error)
+                raise
+            profiler.exit(frame)
+            return result
+
+        builder.__name__ = function.__name__
+        builder.__doc__ = function.__doc__
+        builder._profiled = function
+        return builder
+
+    def wrap_command(self, name, function):
+        profiler = self
+
+        def command(*args, **kwargs):
+            # PyMEL commands run cmds commands, only the outermost call is counted
+            if profiler._in_command:
+                return function(*args, **kwargs)
+            profiler._in_command = True
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler._in_command = False
+                profiler.command(name, time.perf_counter() - start)
+
+        command.__name__ = function.__name__
+        command.__doc__ = function.__doc__
+        command._profiled = function
+        return command
+
+    def install(self):
+        for module_name in BUILDER_MODULES:
+            module = importlib.import_module(module_name)
+            short = module_name.rsplit(".", 1)[-1]
+            for attr, value in list(vars(module).items()):
+                if (callable(value) and not attr.startswith("_") and getattr(value, "__module__", None) == module_name
+                        and not isinstance(value, type)):
+                    self._patch(module, attr, self.wrap_builder("{}.{}".format(short, attr), value))
+            for class_name in BUILDER_CLASSES.get(module_name, []):
+                cls = getattr(module, class_name)
+                for attr, value in list(vars(cls).items()):
+                    if callable(value) and not attr.startswith("_"):
+                        self._patch(cls, attr, self.wrap_builder("{}.{}.{}".format(short, class_name, attr), value))
+
+        for module_name, prefix in COMMAND_MODULES:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            # Lazy placeholders copied the module's functions when they loaded, patch their copies too
+            owners = [module]
+            placeholder = lazy._lazy_modules.get(module_name)
+            if placeholder is not None and lazy.is_loaded(placeholder):
+                owners.append(placeholder)
+            for owner in owners:
+                for attr, value in list(vars(owner).items()):
+                    if attr.startswith("_") or isinstance(value, type) or not callable(value):
+                        continue
+                    if hasattr(value, "_profiled") or type(value).__name__ not in ("function", "builtin_function_or_method"):
+                        continue
+                    self._patch(owner, attr, self.wrap_command("{}.{}".format(prefix, attr), value))
+
+        try:
+            import maya.api.OpenMaya as om2
+            self._callback = om2.MDGMessage.addNodeAddedCallback(self.node_added, "dependNode")
+        except ImportError:
+            pass
+
+    def uninstall(self):
+        for owner, attr, value in reversed(self._patched):
+            setattr(owner, attr, value)
+        self._patched = []
+        # Placeholders that loaded while profiling was on copied the wrappers, put the wrapped functions back
+        for placeholder in list(lazy._lazy_modules.values()):
+            if not lazy.is_loaded(placeholder):
+                continue
+            for attr, value in list(vars(placeholder).items()):
+                if hasattr(value, "_profiled"):
+                    setattr(placeholder, attr, value._profiled)
+        if self._callback is not None:
+            import maya.api.OpenMaya as om2
+            om2.MMessage.removeCallback(self._callback)
+            self._callback = None
+
+    def close(self):
+        self.trace.close()
+        with open(self.folded_path, 'w') as outfile:
+            for path, seconds in sorted(self.folded.items()):
+                outfile.write("{} {}\n".format(path, int(round(seconds * 1e6))))
+        return self.summary()
+
+    def summary(self):
+        commands = sorted(self.totals["commands"].items(), key=lambda i: -i[1])
+        return {"trace": self.trace_path, "folded": self.folded_path, "builders": self.totals["builders"],
+                "nodes": self.totals["nodes"], "commands": dict(commands)}
+
+
+def enable(trace="spydr_profile.jsonl", folded=None):
+    '''
+    Start profiling every builder call
+    Args:
+        trace(String): The JSONL trace path
+        folded(String): The folded stack path, the trace path with a .folded extension by default
+
+    Returns:
+        Profiler: The running profiler
+    '''
+    global _profiler
+    if _profiler is not None:
+        raise RuntimeError("Profiling is already enabled, writing to {}".format(_profiler.trace_path))
+    _profiler = Profiler(trace, folded)
+    _profiler.install()
+    return _profiler
+
+
+def disable():
+    '''
+    Stop profiling and write the folded stacks
+    Returns:
+        summary(Dict): Builder calls, nodes created and command counts, or None if profiling wasn't enabled
+    '''
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler, _profiler = _profiler, None
+    profiler.uninstall()
+    return profiler.close()
+
+
+def is_enabled():
+    return _profiler is not None
+
+
+@contextlib.contextmanager
+def profile(trace="spydr_profile.jsonl", folded=None):
+    '''
+    Profile everything built inside the block, the summary is printed when it ends
+    '''
+    enable(trace, folded)
+    try:
+        yield
+    finally:
+        summary = disable()
+        top = list(summary["commands"].items())[:10]
+        print("Profiled {} builder calls, {} nodes created, trace in {}".format(summary["builders"], summary["nodes"],
+                                                                               summary["trace"]))
+        for name, count in top:
+            print("    {:<30}{}".format(name, count))
+
+
+def enable_from_environment():
+    '''
+    Enable profiling when SPYDR_PROFILE holds a trace path
+    '''
+    trace = os.environ.get("SPYDR_PROFILE")
+    if trace and not is_enabled():
+        return enable(trace)
+    return None
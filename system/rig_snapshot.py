@@ -0,0 +1,418 @@
+'''
+Compact binary rig snapshots.
+A built rig (the nodes, their types and DAG parents, non default attribute values including matrices and strings, user
+attributes, connections and control curve shapes) is stored as NumPy arrays in a single .npz file. Loading records the
+whole rig as a BuildPlan and applies it in one modifier pass, so a rig comes back much faster than rebuilding it or
+opening the scene it was built in, and two snapshots can be diffed without Maya. Attributes holding other data (mesh,
+array data...) aren't stored, capture warns about them and RigSnapshot.skipped lists them.
+
+    snapshot = rig_snapshot.RigSnapshot.capture(rig_snapshot.result_nodes(arm.rig_info))
+    snapshot.save("Left_arm.npz")
+    ...
+    rig_snapshot.RigSnapshot.load("Left_arm.npz").rebuild()
+'''
+
+import numpy as np
+
+import system.build_plan as build_plan
+import system.build_session as build_session
+import system.naming as naming
+
+FORMAT_VERSION = 2
+
+ARRAYS = ["names", "types", "parents", "dag",
+          "attr_nodes", "attr_names", "attr_values",
+          "matrix_nodes", "matrix_names", "matrix_values", "string_nodes", "string_names", "string_values",
+          "skipped_nodes", "skipped_names",
+          "conn_sources", "conn_source_attrs", "conn_destinations", "conn_destination_attrs", "external",
+          "ud_nodes", "ud_names", "ud_types", "ud_min", "ud_max", "ud_default", "ud_keyable", "ud_enums", "ud_strings",
+          "curve_nodes", "curve_degrees", "curve_forms", "curve_cv_offsets", "curve_cvs", "curve_knot_offsets",
+          "curve_knots"]
+# User attribute types added with addAttr -dataType, their values are stored with the other typed values
+UD_DATA_TYPES = ["string", "matrix", "stringArray", "doubleArray", "Int32Array", "vectorArray", "pointArray"]
+
+
+def result_nodes(value):
+    '''
+    Every node name inside a build result (rig_info, the tuples returned by fk_ik_hinge/create_ik_rig...)
+    '''
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return [node for i in value for node in result_nodes(i)]
+    if hasattr(value, "name"):
+        return [value.name()]
+    return []
+
+
+def _strings(values):
+    return np.array(values, dtype=np.str_) if values else np.zeros(0, dtype="<U1")
+
+
+def _data_type(om2, attr):
+    if attr.hasFn(om2.MFn.kMatrixAttribute):
+        return om2.MFnData.kMatrix
+    if attr.hasFn(om2.MFn.kTypedAttribute):
+        return om2.MFnTypedAttribute(attr).attrType()
+    return None
+
+
+def _plug_values(om2, plug, values, element=False):
+    '''
+    Collect the non default, unconnected values of a plug, its children and its array elements
+    Args:
+        values(Dict): "attr", "matrix" and "string" lists of (name, value), plugs holding data that can't be stored
+            are added to "skipped" by name
+    '''
+    if plug.isArray:
+        for index in plug.getExistingArrayAttributeIndices():
+            _plug_values(om2, plug.elementByLogicalIndex(index), values, True)
+        return
+    if plug.isCompound:
+        for i in range(plug.numChildren()):
+            _plug_values(om2, plug.child(i), values, element)
+        return
+    if plug.isDestination or plug.isDefaultValue():
+        return
+
+    attr = plug.attribute()
+    # Plain children like translateX are found directly on load, only array elements need their full path
+    name = plug.partialName(includeNonMandatoryIndices=True, useLongNames=True, useFullAttributePath=element)
+    data_type = _data_type(om2, attr)
+    if attr.hasFn(om2.MFn.kUnitAttribute):
+        unit_type = om2.MFnUnitAttribute(attr).unitType()
+        if unit_type == om2.MFnUnitAttribute.kAngle:
+            values["attr"].append((name, plug.asMAngle().asUnits(om2.MAngle.kDegrees)))
+        elif unit_type == om2.MFnUnitAttribute.kDistance:
+            values["attr"].append((name, plug.asMDistance().asUnits(om2.MDistance.uiUnit())))
+        else:
+            values["attr"].append((name, plug.asDouble()))
+    elif attr.hasFn(om2.MFn.kNumericAttribute) or attr.hasFn(om2.MFn.kEnumAttribute):
+        values["attr"].append((name, plug.asDouble()))
+    elif data_type == om2.MFnData.kMatrix:
+        values["matrix"].append((name, list(om2.MFnMatrixData(plug.asMObject()).matrix())))
+    elif data_type == om2.MFnData.kString:
+        # User strings are stored with their attribute
+        if not om2.MFnAttribute(attr).dynamic:
+            values["string"].append((name, plug.asString()))
+    elif not attr.hasFn(om2.MFn.kMessageAttribute):
+        values["skipped"].append(name)
+
+
+class RigSnapshot(object):
+    '''
+    A rig as flat arrays, see ARRAYS for what is stored
+    '''
+    def __init__(self, arrays, name=""):
+        self.arrays = arrays
+        self.name = name
+
+    def __len__(self):
+        return len(self.arrays["names"])
+
+    ###########
+    ##Capture##
+    ###########
+
+    @classmethod
+    def capture(cls, nodes, name=""):
+        '''
+        Snapshot nodes, every DAG descendant and every DG node connected to them
+        Args:
+            nodes(List): Node names or PyNodes, e.g. from result_nodes
+        '''
+        import maya.cmds as cmds
+        import maya.api.OpenMaya as om2
+
+        nodes = cmds.ls([str(i) for i in nodes], long=True)
+        below = cmds.listRelatives(nodes, allDescendents=True, fullPath=True) or []
+        dag = cmds.ls(nodes + below, long=True, dag=True)
+        # Parents before children so the plan can create them in order
+        dag = sorted(set(dag), key=lambda i: (i.count("|"), i))
+
+        shared = naming.shared_nodes(long=True)
+        dg = [i for i in nodes if i not in dag]
+        found = set(dag) | set(dg)
+        pending = list(dag) + dg
+        while pending:
+            connected = cmds.listConnections(pending, skipConversionNodes=False) or []
+            pending = []
+            for node in cmds.ls(connected, long=True):
+                if node in found or node in shared or cmds.ls(node, dag=True):
+                    continue
+                found.add(node)
+                dg.append(node)
+                pending.append(node)
+        ordered = dag + [i for i in dg if i not in dag]
+
+        selection = om2.MSelectionList()
+        for node in ordered:
+            selection.add(node)
+        index = {node: i for i, node in enumerate(ordered)}
+        short = {}
+
+        arrays = {i: [] for i in ARRAYS}
+        curve_cvs = []
+        curve_knots = []
+        arrays["curve_cv_offsets"] = [0]
+        arrays["curve_knot_offsets"] = [0]
+
+        for i, node in enumerate(ordered):
+            obj = selection.getDependNode(i)
+            fn = om2.MFnDependencyNode(obj)
+            short[node] = fn.name()
+            arrays["names"].append(fn.name())
+            arrays["types"].append(fn.typeName)
+            parent = node.rsplit("|", 1)[0] if "|" in node.lstrip("|") else None
+            arrays["parents"].append(index.get(parent, -1))
+            arrays["dag"].append(obj.hasFn(om2.MFn.kDagNode))
+
+            values = {"attr": [], "matrix": [], "string": [], "skipped": []}
+            for a in range(fn.attributeCount()):
+                plug = om2.MPlug(obj, fn.attribute(a))
+                # Children and elements are reached through their top level attribute
+                if plug.isChild or plug.isElement:
+                    continue
+                attr_fn = om2.MFnAttribute(plug.attribute())
+                if not attr_fn.writable or not attr_fn.storable:
+                    continue
+                _plug_values(om2, plug, values)
+            for kind in ["attr", "matrix", "string"]:
+                for attr, value in values[kind]:
+                    arrays[kind + "_nodes"].append(i)
+                    arrays[kind + "_names"].append(attr)
+                    arrays[kind + "_values"].append(value)
+            arrays["skipped_nodes"].extend([i] * len(values["skipped"]))
+            arrays["skipped_names"].extend(values["skipped"])
+
+            for attr in cmds.listAttr(node, userDefined=True) or []:
+                plug = "{}.{}".format(node, attr)
+                if cmds.attributeQuery(attr, node=node, listParent=True):
+                    continue
+                attr_type = cmds.getAttr(plug, type=True)
+                query = lambda **flags: cmds.attributeQuery(attr, node=node, **flags)
+                arrays["ud_nodes"].append(i)
+                arrays["ud_names"].append(attr)
+                arrays["ud_types"].append(attr_type)
+                arrays["ud_min"].append(query(minimum=True)[0] if query(minExists=True) else np.nan)
+                arrays["ud_max"].append(query(maximum=True)[0] if query(maxExists=True) else np.nan)
+                default = query(listDefault=True) if attr_type not in UD_DATA_TYPES + ["message"] else None
+                arrays["ud_default"].append(default[0] if default else 0.0)
+                arrays["ud_keyable"].append(bool(query(keyable=True)))
+                arrays["ud_enums"].append(":".join(query(listEnum=True) or []) if attr_type == "enum" else "")
+                arrays["ud_strings"].append((cmds.getAttr(plug) or "") if attr_type == "string" else "")
+
+            if obj.hasFn(om2.MFn.kNurbsCurve):
+                curve = om2.MFnNurbsCurve(obj)
+                arrays["curve_nodes"].append(i)
+                arrays["curve_degrees"].append(curve.degree)
+                arrays["curve_forms"].append(curve.form)
+                curve_cvs.extend([p.x, p.y, p.z] for p in curve.cvPositions(om2.MSpace.kObject))
+                curve_knots.extend(curve.knots())
+                arrays["curve_cv_offsets"].append(len(curve_cvs))
+                arrays["curve_knot_offsets"].append(len(curve_knots))
+
+        # Connections, each once, with nodes outside the rig kept by name
+        external = []
+        pairs = cmds.listConnections(ordered, source=True, destination=False, connections=True, plugs=True,
+                                     skipConversionNodes=False) or []
+        long_index = {short[i]: index[i] for i in ordered}
+        for i in range(0, len(pairs), 2):
+            destination, source = pairs[i], pairs[i + 1]
+            for plug, nodes_key, attrs_key in [(source, "conn_sources", "conn_source_attrs"),
+                                               (destination, "conn_destinations", "conn_destination_attrs")]:
+                node, _, attr = plug.partition(".")
+                if node in long_index:
+                    arrays[nodes_key].append(long_index[node])
+                else:
+                    if node not in external:
+                        external.append(node)
+                    arrays[nodes_key].append(-1 - external.index(node))
+                arrays[attrs_key].append(attr)
+        arrays["external"] = external
+
+        result = {}
+        for key, value in arrays.items():
+            if key in ("names", "types", "attr_names", "matrix_names", "string_names", "string_values", "skipped_names",
+                       "conn_source_attrs", "conn_destination_attrs", "external", "ud_names", "ud_types", "ud_enums",
+                       "ud_strings"):
+                result[key] = _strings(value)
+            elif key in ("attr_values", "ud_min", "ud_max", "ud_default"):
+                result[key] = np.array(value, dtype=np.float64)
+            elif key in ("dag", "ud_keyable"):
+                result[key] = np.array(value, dtype=bool)
+            else:
+                result[key] = np.array(value, dtype=np.int32)
+        result["matrix_values"] = np.array(arrays["matrix_values"], dtype=np.float64).reshape(-1, 16)
+        result["curve_cvs"] = np.array(curve_cvs, dtype=np.float64).reshape(-1, 3)
+        result["curve_knots"] = np.array(curve_knots, dtype=np.float64)
+        snapshot = cls(result, name)
+        if len(result["skipped_names"]):
+            cmds.warning("Rig snapshot skipped {} attributes holding data it can't store, see RigSnapshot.skipped"
+                         .format(len(result["skipped_names"])))
+        return snapshot
+
+    def skipped(self):
+        '''
+        Returns:
+            plugs(List): The non default attributes the capture couldn't store, e.g. mesh or array data
+        '''
+        names = self.arrays["names"].tolist()
+        return ["{}.{}".format(names[n], attr) for n, attr in zip(self.arrays["skipped_nodes"].tolist(),
+                                                                   self.arrays["skipped_names"].tolist())]
+
+    ########
+    ##File##
+    ########
+
+    def save(self, fileName):
+        np.savez_compressed(fileName, version=np.int32(FORMAT_VERSION), name=np.str_(self.name), **self.arrays)
+
+    @classmethod
+    def load(cls, fileName):
+        with np.load(fileName, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != FORMAT_VERSION:
+                raise RuntimeError("{} is a version {} rig snapshot, expected {}".format(fileName, version,
+                                                                                          FORMAT_VERSION))
+            return cls({i: data[i] for i in ARRAYS}, str(data["name"]))
+
+    ###########
+    ##Rebuild##
+    ###########
+
+    def _node(self, index):
+        if index < 0:
+            return str(self.arrays["external"][-1 - index])
+        return str(self.arrays["names"][index])
+
+    def to_plan(self):
+        '''
+        Record the rig as a BuildPlan, connections to nodes outside of the rig are only made if they exist
+        '''
+        import maya.cmds as cmds
+
+        a = self.arrays
+        plan = build_plan.BuildPlan(self.name)
+        names = [str(i) for i in a["names"]]
+        for name, node_type, parent, dag in zip(names, a["types"], a["parents"], a["dag"]):
+            plan.create_node(str(node_type), name, parent=names[parent] if parent >= 0 else None, dag=bool(dag))
+
+        for i in range(len(a["ud_nodes"])):
+            node = names[a["ud_nodes"][i]]
+            attr_type = str(a["ud_types"][i])
+            minimum = None if np.isnan(a["ud_min"][i]) else float(a["ud_min"][i])
+            maximum = None if np.isnan(a["ud_max"][i]) else float(a["ud_max"][i])
+            if attr_type == "double":
+                plan.add_attr(node, str(a["ud_names"][i]), min=minimum, max=maximum,
+                              default=float(a["ud_default"][i]), keyable=bool(a["ud_keyable"][i]))
+                continue
+            flags = {"longName": str(a["ud_names"][i]), "keyable": bool(a["ud_keyable"][i])}
+            if attr_type in UD_DATA_TYPES:
+                flags["dataType"] = attr_type
+            else:
+                flags["attributeType"] = attr_type
+                flags["defaultValue"] = float(a["ud_default"][i])
+                if minimum is not None:
+                    flags["min"] = minimum
+                if maximum is not None:
+                    flags["max"] = maximum
+                if attr_type == "enum":
+                    flags["enumName"] = str(a["ud_enums"][i])
+            plan.command("addAttr", node, **flags)
+            if a["ud_strings"][i]:
+                plan.command("setAttr", "{}.{}".format(node, flags["longName"]), str(a["ud_strings"][i]), type="string")
+
+        for node, attr, value in zip(a["attr_nodes"], a["attr_names"], a["attr_values"]):
+            plan.set_attr("{}.{}".format(names[node], attr), float(value))
+        for node, attr, value in zip(a["matrix_nodes"], a["matrix_names"], a["matrix_values"]):
+            plan.set_attr("{}.{}".format(names[node], attr), value.tolist())
+        for node, attr, value in zip(a["string_nodes"], a["string_names"], a["string_values"]):
+            plan.set_attr("{}.{}".format(names[node], attr), str(value))
+
+        connections = zip(a["conn_sources"], a["conn_source_attrs"], a["conn_destinations"],
+                          a["conn_destination_attrs"])
+        for source, source_attr, destination, destination_attr in connections:
+            source_node, destination_node = self._node(source), self._node(destination)
+            if any(i < 0 and not cmds.objExists(node) for i, node in [(source, source_node),
+                                                                       (destination, destination_node)]):
+                continue
+            plan.connect("{}.{}".format(source_node, source_attr), "{}.{}".format(destination_node, destination_attr))
+        return plan
+
+    def rebuild(self):
+        '''
+        Recreate the rig in the current scene
+        Returns:
+            nodes(Dict): The MObjectHandle of every created node keyed by name
+        '''
+        import maya.api.OpenMaya as om2
+
+        naming.check_collisions([str(i) for i in self.arrays["names"]])
+        nodes = self.to_plan().apply()
+
+        # Curve shapes get their geometry as curve data on their create plug, history connected to it still wins
+        a = self.arrays
+        modifier = build_session.record_modifier(om2.MDGModifier())
+        for k, index in enumerate(a["curve_nodes"]):
+            cvs = a["curve_cvs"][a["curve_cv_offsets"][k]:a["curve_cv_offsets"][k + 1]]
+            knots = a["curve_knots"][a["curve_knot_offsets"][k]:a["curve_knot_offsets"][k + 1]]
+            data = om2.MFnNurbsCurveData().create()
+            om2.MFnNurbsCurve().create([om2.MPoint(*i) for i in cvs.tolist()], knots.tolist(),
+                                       int(a["curve_degrees"][k]), int(a["curve_forms"][k]), False, True, data)
+            plug = om2.MFnDependencyNode(nodes[str(a["names"][index])].object()).findPlug("create", False)
+            if not plug.isDestination:
+                modifier.newPlugValue(plug, data)
+        modifier.doIt()
+        naming.get_scene_index().reserve([str(i) for i in a["names"]])
+        return nodes
+
+    ########
+    ##Diff##
+    ########
+
+    def diff(self, other):
+        '''
+        Compare with another snapshot without Maya
+        Returns:
+            lines(List): One line per added/removed node, changed value and added/removed connection
+        '''
+        def node_set(snapshot):
+            return dict(zip(snapshot.arrays["names"].tolist(), snapshot.arrays["types"].tolist()))
+
+        def values(snapshot):
+            a = snapshot.arrays
+            names = a["names"].tolist()
+            result = {}
+            for kind in ["attr", "matrix", "string"]:
+                plugs = zip(a[kind + "_nodes"].tolist(), a[kind + "_names"].tolist(), a[kind + "_values"].tolist())
+                result.update(("{}.{}".format(names[n], attr), value) for n, attr, value in plugs)
+            return result
+
+        def same(mine, theirs):
+            if isinstance(mine, str) or isinstance(theirs, str):
+                return mine == theirs
+            return np.allclose(mine, theirs, equal_nan=True)
+
+        def connections(snapshot):
+            a = snapshot.arrays
+            return set("{}.{} -> {}.{}".format(snapshot._node(s), sa, snapshot._node(d), da) for s, sa, d, da in
+                       zip(a["conn_sources"].tolist(), a["conn_source_attrs"].tolist(), a["conn_destinations"].tolist(),
+                           a["conn_destination_attrs"].tolist()))
+
+        lines = []
+        mine, theirs = node_set(self), node_set(other)
+        lines.extend("- node {} ({})".format(i, mine[i]) for i in sorted(set(mine) - set(theirs)))
+        lines.extend("+ node {} ({})".format(i, theirs[i]) for i in sorted(set(theirs) - set(mine)))
+
+        mine, theirs = values(self), values(other)
+        for plug in sorted(set(mine) | set(theirs)):
+            if plug not in mine or plug not in theirs or not same(mine[plug], theirs[plug]):
+                lines.append("~ {} {} -> {}".format(plug, mine.get(plug, "default"), theirs.get(plug, "default")))
+
+        mine, theirs = connections(self), connections(other)
+        lines.extend("- {}".format(i) for i in sorted(mine - theirs))
+        lines.extend("+ {}".format(i) for i in sorted(theirs - mine))
+        return lines
@@ -0,0 +1,140 @@
+'''
+Bulk scene snapshot of DAG node transforms.
+World matrices of any set of DAG nodes are collected in one pass into a NumPy array, and world translations and
+rotations are derived from it in one vectorized step. Components read positions from the snapshot instead of
+querying the scene once per node.
+'''
+
+import numpy as np
+
+
+def matrices_to_euler(matrices):
+    '''
+    Extract XYZ rotate order euler rotations from Maya (row vector) matrices, scale is removed first
+    Args:
+        matrices: An (N, 4, 4) or (N, 3, 3) array
+
+    Returns:
+        An (N, 3) array of rotations in degrees
+    '''
+    rotation = np.array(matrices, dtype=np.float64)[:, :3, :3]
+    lengths = np.linalg.norm(rotation, axis=2)
+    rotation = rotation / np.where(lengths > 1e-12, lengths, 1.0)[:, :, np.newaxis]
+
+    # In row vector form the XYZ rotation is Rx * Ry * Rz, so sin(ry) is -m[0][2]
+    sin_y = np.clip(-rotation[:, 0, 2], -1.0, 1.0)
+    ry = np.arcsin(sin_y)
+    rx = np.arctan2(rotation[:, 1, 2], rotation[:, 2, 2])
+    rz = np.arctan2(rotation[:, 0, 1], rotation[:, 0, 0])
+
+    # Gimbal lock: X and Z rotate around the same axis, put it all on X
+    locked = np.abs(sin_y) > 1.0 - 1e-9
+    if locked.any():
+        rx[locked] = np.arctan2(-rotation[locked, 2, 1], rotation[locked, 1, 1])
+        rz[locked] = 0.0
+
+    return np.degrees(np.stack([rx, ry, rz], axis=1))
+
+
+class SceneSnapshot(object):
+    '''
+    World matrices, translations and rotations of a set of DAG nodes, captured at one point in time
+    A node passed more than once has one row
+    '''
+    def __init__(self, nodes):
+        '''
+        Args:
+            nodes(List): Node names, PyNodes or MObjects of DAG nodes
+        '''
+        import maya.api.OpenMaya as om2
+
+        # MSelectionList.add merges nodes that are already in the list, so each node is resolved on its own and the
+        # rows are deduplicated here, rows[i] is the row of the i-th node
+        paths = []
+        self.rows = []
+        self.names = []
+        self.handles = []
+        self._index = {}
+        for node in nodes:
+            if isinstance(node, om2.MObject):
+                path = om2.MDagPath.getAPathTo(node)
+            else:
+                selection = om2.MSelectionList()
+                selection.add(str(node))
+                if selection.length() > 1:
+                    raise RuntimeError("More than one node matches {}".format(node))
+                path = selection.getDagPath(0)
+            full_path = path.fullPathName()
+            if full_path not in self._index:
+                handle = om2.MObjectHandle(path.node())
+                name = path.partialPathName()
+                self._index[name] = self._index[full_path] = self._index[handle.hashCode()] = len(paths)
+                paths.append(path)
+                self.names.append(name)
+                self.handles.append(handle)
+            self.rows.append(self._index[full_path])
+
+        self.matrices = np.empty((len(paths), 4, 4), dtype=np.float64)
+        for i, path in enumerate(paths):
+            self.matrices[i] = np.array(path.inclusiveMatrix(), dtype=np.float64).reshape(4, 4)
+
+        self.translations = self.matrices[:, 3, :3].copy()
+        self.rotations = matrices_to_euler(self.matrices)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, node):
+        return self._key(node) in self._index
+
+    def _key(self, node):
+        if hasattr(node, "hashCode"):
+            return node.hashCode()
+        return str(node)
+
+    def index(self, node):
+        '''
+        Get the row of a node in the snapshot arrays
+        Args:
+            node: A node name, PyNode or MObjectHandle
+        '''
+        try:
+            return self._index[self._key(node)]
+        except KeyError:
+            raise RuntimeError("{} is not in the snapshot".format(node))
+
+    def translation(self, node):
+        return self.translations[self.index(node)]
+
+    def rotation(self, node):
+        return self.rotations[self.index(node)]
+
+    def matrix(self, node):
+        return self.matrices[self.index(node)]
+
+    def positions(self, nodes):
+        '''
+        Returns:
+            An (N, 3) array of world translations for the nodes, in order
+        '''
+        return self.translations[[self.index(i) for i in nodes]]
+
+
+def snapshot_selection(node_type=None):
+    '''
+    Snapshot the current selection, optionally filtered by node type, in selection order
+    '''
+    import maya.cmds as cmds
+    if node_type:
+        return SceneSnapshot(cmds.ls(sl=True, long=True, type=node_type))
+    return SceneSnapshot(cmds.ls(sl=True, long=True))
+
+
+def snapshot_hierarchy(roots, node_type="joint"):
+    '''
+    Snapshot some roots and every descendant of a node type, e.g. a whole skeleton
+    '''
+    import maya.cmds as cmds
+    nodes = cmds.ls(roots, long=True) + (cmds.listRelatives(roots, allDescendents=True, fullPath=True,
+                                                            type=node_type) or [])
+    return SceneSnapshot(nodes)
@@ -0,0 +1,149 @@
+'''
+Registry of the module templates under data/rig/ and layout/.
+Templates are discovered once, validated, frozen and kept in memory. A template is only re-read when its file
+changes on disk, so building many limbs from the same template parses the JSON once.
+'''
+
+import json
+import os
+import types
+
+TEMPLATE_DIRS = ["data/rig", "layout"]
+
+# Keys every template needs and the joint lists that must line up with the positions
+NAME_LIST_KEYS = ["fk_controls", "ik_controls", "fk_joints", "ik_joints", "rig_joints", "bind_joints"]
+JOINT_LIST_KEYS = ["fk_joints", "ik_joints", "rig_joints", "bind_joints"]
+OPTIONAL_STRING_KEYS = ["joint_orientation", "secondary_axis_orient"]
+
+
+class TemplateError(RuntimeError):
+    pass
+
+
+def validate_template(data, name=""):
+    '''
+    Check that a template has the keys and value types the rig modules expect
+    Args:
+        data(Dict): The parsed template
+        name(String): Template name used in error messages
+
+    Returns:
+        None, raises TemplateError when the template is invalid
+    '''
+    if not isinstance(data, dict):
+        raise TemplateError("Template {} must be a JSON object".format(name))
+
+    for key in NAME_LIST_KEYS:
+        if key not in data:
+            raise TemplateError("Template {} is missing '{}'".format(name, key))
+        if not all(isinstance(i, str) for i in data[key]):
+            raise TemplateError("Template {}: '{}' must be a list of names".format(name, key))
+
+    positions = data.get("positions")
+    if not isinstance(positions, list) or not positions:
+        raise TemplateError("Template {} is missing 'positions'".format(name))
+    for position in positions:
+        if (not isinstance(position, list) or len(position) != 3 or
+                not all(isinstance(i, (int, float)) and not isinstance(i, bool) for i in position)):
+            raise TemplateError("Template {}: every position must be three numbers, got {}".format(name, position))
+
+    for key in JOINT_LIST_KEYS:
+        if len(data[key]) != len(positions):
+            raise TemplateError("Template {}: '{}' has {} joints for {} positions".format(name, key, len(data[key]),
+                                                                                         len(positions)))
+
+    for key in OPTIONAL_STRING_KEYS:
+        if key in data and not isinstance(data[key], str):
+            raise TemplateError("Template {}: '{}' must be a string".format(name, key))
+
+
+def freeze(data):
+    '''
+    Make a read only copy of parsed JSON, dictionaries become mapping proxies and lists become tuples
+    '''
+    if isinstance(data, dict):
+        return types.MappingProxyType({k: freeze(v) for k, v in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze(i) for i in data)
+    return data
+
+
+class TemplateRegistry(object):
+    '''
+    Discovers, validates and caches every template under a data root
+    '''
+    def __init__(self, root):
+        self.root = root
+        self.paths = {}
+        self._cache = {}
+        self.discover()
+
+    def discover(self):
+        '''
+        Find every template file, templates are named by their folder and file name, e.g. "rig/arm"
+        '''
+        self.paths = {}
+        for template_dir in TEMPLATE_DIRS:
+            folder = os.path.join(self.root, template_dir)
+            if not os.path.isdir(folder):
+                continue
+            for file_name in sorted(os.listdir(folder)):
+                if file_name.endswith(".json"):
+                    name = "{}/{}".format(os.path.basename(template_dir), os.path.splitext(file_name)[0])
+                    self.paths[name] = os.path.join(folder, file_name)
+        return sorted(self.paths)
+
+    def names(self):
+        return sorted(self.paths)
+
+    def get(self, name):
+        '''
+        Get a frozen, validated template, re-reading it only when the file changed since the last read
+        Args:
+            name(String): The template name, e.g. "rig/arm"
+
+        Returns:
+            The frozen template
+        '''
+        if name not in self.paths:
+            self.discover()
+            if name not in self.paths:
+                raise TemplateError("No template named {} under {}".format(name, self.root))
+
+        path = self.paths[name]
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, 'r') as infile:
+            data = json.load(infile)
+        validate_template(data, name)
+        template = freeze(data)
+        self._cache[name] = (mtime, template)
+        return template
+
+    def invalidate(self, name=None):
+        if name:
+            self._cache.pop(name, None)
+        else:
+            self._cache.clear()
+
+
+_registries = {}
+
+
+def get_registry(root=None):
+    '''
+    Get the shared registry for a data root, defaults to RDOJO_DATA or the repository root
+    '''
+    if root is None:
+        root = os.environ.get("RDOJO_DATA") or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    root = os.path.normpath(root)
+    if root not in _registries:
+        _registries[root] = TemplateRegistry(root)
+    return _registries[root]
+
+
+def get_template(name, root=None):
+    return get_registry(root).get(name)
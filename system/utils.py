@@ -1,15 +1,36 @@
-import maya.cmds as cmds
 import json
 import tempfile
+import system.lazy as lazy
+
+#maya.cmds is only imported on first use, so plans can be recorded outside of Maya (see benchmarks/bench_components.py)
+cmds = lazy.lazy_import("maya.cmds")
+curve_text = lazy.lazy_import("system.curve_text")
+orient = lazy.lazy_import("system.orient")
+
+#Which backend builds joints and controls, "cmds" or "openmaya" (see system/om_backend.py)
+BACKEND = "cmds"
+
+def setBackend(backend):
+	'''
+	Switch the backend used by createJoint and createControl
+	Args:
+		backend(String): "cmds" for one command per node or "openmaya" to build in bulk through OpenMaya 2.0
+	'''
+	global BACKEND
+	if backend not in ("cmds", "openmaya"):
+		raise RuntimeError("Unknown backend: {}".format(backend))
+	BACKEND = backend
 
 def writeJson(fileName,data):
 	with open(fileName, 'w') as outfile:
 		json.dump(data, outfile)
-	file.close(outfile)
 
 def readJson(fileName):
-	with open(fileName, 'r') as outfile:
-		data = (open(fileName, 'r').read())
+	'''
+	Read a json file as a string, rig templates should come from system.templates.get_template instead
+	'''
+	with open(fileName, 'r') as infile:
+		data = infile.read()
 	return data
 
 
@@ -17,6 +38,9 @@ def createJoint(name, position, instance):
 	'''
 	Takes in joint info as an argument and iterates through the name and position to create joint
 	'''
+	if BACKEND == "openmaya":
+		import system.om_backend as om_backend
+		return om_backend.createJoint(name, position, instance)
 	joint_list = [cmds.joint(n=name[i].replace('s_', instance), p=position[i]) for i in range(len(name))]
 	cmds.select(cl=True)
 	return(joint_list)
@@ -26,6 +50,9 @@ def createControl(ctrlInfo, flip=True):
 	'''
 	Iterates through joint_names+positions to create control curves
 	'''
+	if BACKEND == "openmaya":
+		import system.om_backend as om_backend
+		return om_backend.createControl(ctrlInfo, flip=flip)
 	control_info = []
 	for info in ctrlInfo:
 		#Create an empty group
@@ -37,7 +64,7 @@ def createControl(ctrlInfo, flip=True):
 		#Parent the control under the group
 		cmds.parent(ctrl,ctrl_group)
 		#Move the group to the joint, if it's a list of translations; use those, else match the transforms
-		if type(info[0]) == list:
+		if isinstance(info[0], (list, tuple)):
 			cmds.xform(ctrl_group, t = info[0], ws = True)
 		else:
 			cmds.matchTransform(ctrl_group, info[0])
@@ -46,58 +73,69 @@ def createControl(ctrlInfo, flip=True):
 	return(control_info)
 
 def calculatePoleVectorPosition(joints):
-	from maya import cmds , OpenMaya
 	start = cmds.xform(joints[0], q = True, ws = True, t = True)
 	mid = cmds.xform(joints[1], q = True, ws = True, t = True)
 	end = cmds.xform(joints[2], q = True, ws = True, t = True)
-	
-	startVector = OpenMaya.MVector(start[0], start[1], start[2])
-	midVector = OpenMaya.MVector(mid[0], mid[1], mid[2])
-	endVector = OpenMaya.MVector(end[0], end[1], end[2])
-	
-	startEnd = endVector - startVector
-	startMid = midVector - startVector
-	dotP = startMid * startEnd
-	proj = float(dotP) / float(startEnd.length())
-	startEndN = startEnd.normal()
-	projV = startEndN * proj
-	arrowV = startMid - projV
-	arrowV *= 5
-	finalV = arrowV + midVector
-	return([finalV.x, finalV.y, finalV.z])
-
-def connectThroughBlendColors(parentsA, parentsB, children, instance, switchattr):
-	constraints = []
+	return poleVectorFromPositions(start, mid, end)
+
+def poleVectorFromPositions(start, mid, end, distance=5):
+	'''
+	Calculate the pole vector position from three world space positions, without querying the scene
+	Args:
+		start(List): Position of the start joint
+		mid(List): Position of the middle joint
+		end(List): Position of the end joint
+		distance(Float): How far to push the pole vector out from the middle joint
+
+	Returns:
+		The pole vector position as a list
+	'''
+	import system.pole_vector as pole_vector
+	return pole_vector.calculate_pole_vector_positions([start, mid, end], pv_distance=distance).tolist()
+
+def connectThroughBlendColors(parentsA, parentsB, children, instance, switchattr, batch=None):
+	'''
+	Blend the translate, rotate and scale of each child between two parents with blendColors nodes
+	Args:
+		parentsA(List): The parents followed with the switch at 1
+		parentsB(List): The parents followed with the switch at 0, None to only drive the children from parentsA
+		children(List): The nodes to drive, one per parent
+		instance(String): The instance prefix of the children, the rest of each name names its nodes
+		switchattr(Attr): The attribute connected to the blender of every node
+		batch(Wiring): Queue the connections on this batch instead of wiring them here (see system/wiring.py)
+
+	Returns:
+		blend_nodes(List): The translate, rotate and scale blendColors nodes of each child
+	'''
+	import system.wiring as wiring
+
+	wires = batch if batch is not None else wiring.Wiring()
+	blend_nodes = []
 	for i in range(len(children)):
 		#Separate joint name with partition and store in a variable
-		switch_Prefix = children[i].partition[2]
-		#Create blend color nodes for Translate, Rotate and 
-		#Scale and connect to the arm settings CTRL IK/FK attribute
-		bcNode_Translate = cmds.shadingNode("blendColors", asUtility = True, name = "bcNode_Translate_Switch_" + switch_Prefix)
-		cmds.connectAttr(switchattr, bcNode_Translate + ".blender")
-		bcNode_Rotate = cmds.shadingNode("blendColors", asUtility = True, name = "bcNode_Rotate_Switch_" + switch_Prefix)
-		cmds.connectAttr(switchattr, bcNode_Rotate + ".blender")
-		bcNode_Scale = cmds.shadingNode("blendColors", asUtility = True, name = "bcNode_Scale_Switch_" + switch_Prefix)
-		cmds.connectAttr(switchattr, bcNode_Scale + ".blender")
-		constraints.append(bcNode_Translate, bcNode_Rotate, bcNode_Scale)
-
-		#Input Parents
-		cmds.connectAttr(parentsA[i] + ".translate", bcNode_Translate + ".color1")
-		cmds.connectAttr(parentsA[i] + ".rotate", bcNode_Rotate + ".color1")
-		cmds.connectAttr(parentsA[i] + ".scale", bcNode_Scale + ".color1")
-		if parentsB != "None":
-			cmds.connectAttr(parentsB[i] + ".translate", bcNode_Translate + ".color2")
-			cmds.connectAttr(parentsB[i] + ".rotate", bcNode_Rotate + ".color2")
-			cmds.connectAttr(parentsB[i] + ".scale", bcNode_Scale + ".color2")
-
-		#Output to children
-		cmds.connectAttr(bcNode_Translate + ".output", children[i] + ".translate")
-		cmds.connectAttr(bcNode_Rotate + ".output", children[i] + ".rotate")
-		cmds.connectAttr(bcNode_Scale + ".output", children[i] + ".scale")
-	return(constraints)
-
-
-def connectBlendColors(blend_attr, direct_conn_attrs, blend_conn_attrs, instance):
+		switch_Prefix = children[i].partition(instance)[2]
+		nodes = []
+		for attr in ["Translate", "Rotate", "Scale"]:
+			#Create blend color nodes for Translate, Rotate and Scale, connected to the switch attribute
+			bcNode = cmds.shadingNode("blendColors", asUtility = True,
+									  name = "bcNode_{}_Switch_{}".format(attr, switch_Prefix))
+			plug = attr.lower()
+			wires.connect(switchattr, bcNode + ".blender")
+			#Input Parents
+			wires.connect("{}.{}".format(parentsA[i], plug), bcNode + ".color1")
+			if parentsB not in (None, "None"):
+				wires.connect("{}.{}".format(parentsB[i], plug), bcNode + ".color2")
+			#Output to children
+			wires.connect(bcNode + ".output", "{}.{}".format(children[i], plug))
+			nodes.append(bcNode)
+		blend_nodes.append(nodes)
+
+	if batch is None:
+		wires.apply()
+	return blend_nodes
+
+
+def connectBlendColors(blend_attr, direct_conn_attrs, blend_conn_attrs, instance, batch=None):
 	'''
 	Connects a blender attribute to two additional attributes using a blendColors node, intended for IK/FK switching
 	Args:
@@ -105,29 +143,35 @@ def connectBlendColors(blend_attr, direct_conn_attrs, blend_conn_attrs, instance
 		direct_conn_attrs(List:Attrs): A list of attributes that the blend_attr will directly connect to
 		blend_conn_attrs(List:Attrs): A list of attributes that the outputR attribute of the blendColors will directly connect to
 		instance(String): The instance the attribute is part of, typically left or right
+		batch(Wiring): Queue the connections on this batch instead of wiring them here (see system/wiring.py)
 
 	Returns:
 		bcNode: The blendColors node
 	'''
+	import system.wiring as wiring
+
 	# Create blend colors node
-	bcNode = cmds.shadingNode("blendColors", asUtility = True, name = "{}_{}_blendColors".format(instance, blend_attr))
+	bcNode = cmds.shadingNode("blendColors", asUtility = True,
+							  name = "{}_{}_blendColors".format(instance, str(blend_attr).replace(".", "_")))
 
+	wires = batch if batch is not None else wiring.Wiring()
 	# Set Color 1R, 1G & 1B to 0 and Color 2R, 2G, & 2B to 1
-	for i in ["R", "G", "B"]:
-		cmds.setAttr("{}.color1{}".format(bcNode, i), 0)
-		cmds.setAttr("{}.color2{}".format(bcNode, i), 1)
+	wires.set_attr("{}.color1".format(bcNode), [0, 0, 0])
+	wires.set_attr("{}.color2".format(bcNode), [1, 1, 1])
 
 	# Connect the blending attribute to the Blender attribute on the BC node
-	cmds.connectAttr("{}".format(blend_attr), "{}.blender".format(bcNode))
+	wires.connect(blend_attr, "{}.blender".format(bcNode))
 
 	# Connect the blending attribute to the direct connection attributes
 	for i in direct_conn_attrs:
-		cmds.connectAttr("{}".format(blend_attr), "{}".format(i))
+		wires.connect(blend_attr, i)
 
 	# Connect the output R attribute from the blend colors node to the blend connection attributes
 	for i in blend_conn_attrs:
-		cmds.connectAttr("{}.outputR".format(bcNode), "{}".format(i))
+		wires.connect("{}.outputR".format(bcNode), i)
 
+	if batch is None:
+		wires.apply()
 	return bcNode
 
 
@@ -136,26 +180,20 @@ def re_orient_joints(joints=[], primary_orient="xzy", secondary_orient="zup", cl
 	Set the joint orientations for specified joints and zero out rotations and joint orientations on remaining floating
 	joints
 	Args:
-		joints(List): Joints to re-orient
-		orient(String): Preferred primary and secondary axes
+		joints(List): Joints to re-orient, with every joint below them (see system/orient.py)
+		primary_orient(String): Preferred primary and secondary axes
 		secondary_orient(String): Preferred seccondary axis orient/world direction
 		clean_zero(List): Any joints that need to be zeroed out in rotations and joint orients
 	Returns:
 		None
 	'''
-	# Set the orientation and secondary axis orientation
+	# Set the orientation and secondary axis orientation, solved for every joint below the roots in one pass
 	if joints:
-		for i in joints:
-			cmds.joint(i, edit=True, orientJoint=primary_orient,
-					   secondaryAxisOrient=secondary_orient,
-					   children=True,
-					   zeroScaleOrient=True)
+		orient.orient_joints(joints, primary_orient, secondary_orient)
 
 	# Zero out the rotations and joint orients on any specified joints
 	if clean_zero:
-		for i in clean_zero:
-			cmds.setAttr("{}.jointOrient".format(i), 0, 0, 0)
-			cmds.setAttr("{}.rotate".format(i), 0, 0, 0)
+		orient.apply_orients(clean_zero, [[0, 0, 0]] * len(clean_zero))
 
 
 def text_to_hex(txt = ''):
@@ -167,39 +205,19 @@ def text_to_hex(txt = ''):
 	Returns:
 		A list of encoded characters
 	'''
-	out = []
-	for c in txt:
-		hx = c.encode('hex')
-		out.append(hx)
-	return ' '.join(out)
+	return ' '.join('{:x}'.format(ord(c)) for c in txt)
 
-def make_curve_text(txt):
+def make_curve_text(txt, name=None, font="Arial", size=1.0):
 	'''
-	Create curve text from Polygon TypeMesh for controls
+	Create curve text for controls from cached glyphs, each character's outline is only generated once per font
+	(see system/curve_text.py)
 	Args:
 		txt(String): The text that will be turned into control curves
+		name(String): The name of the text transform
+		font(String): The font of the outlines
+		size(Float): Scale of the text
 
 	Returns:
-		TxtObjects(Mesh): The TypeMesh created from the text
+		TxtObjects(List): The text transform, holding one curve shape per outline
 	'''
-	# A list to store all the newly created Geo.
-	TxtObjects = []
-
-	# Converting our text to Hex code so the Maya type node will read it.
-	hx = text_to_hex(txt)
-
-	# Creating the Polygon Type
-	cmds.CreatePolygonType()
-	# Getting the node name from selection because the CreatePolygonType() command doesn't actually return the node name.
-	NewTextObj = cmds.ls(sl=True)[0]
-	# Listing connections on the New Text object node to find the type node.
-	TypeNode = cmds.listConnections(NewTextObj + ".message")
-
-	# If we find it, Set attributes on it.
-	if TypeNode:
-		# Place any other preset settings in here.
-		cmds.setAttr(TypeNode[0]+".textInput", hx, type="string")
-	# Adding the New text object to the TxtObjects List
-	TxtObjects.append(NewTextObj)
-
-	return TxtObjects
\ No newline at end of file
+	return [curve_text.make_label(txt, name=name, font=font, size=size)]
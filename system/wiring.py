@@ -0,0 +1,138 @@
+'''
+Bulk wiring for nodes that already exist.
+Connections and attribute values are collected as (source, destination) and (plug, value) pairs, every plug is
+resolved and checked in one pass before anything changes, and the whole batch is applied with one MDGModifier. A bad
+plug, a locked destination or an unexpected existing connection fails the batch up front with every problem listed,
+instead of leaving a switch half wired.
+
+    batch = wiring.Wiring()
+    batch.connect("L_arm_settings_CTRL.IK_FK", "L_arm_blendColors.blender")
+    batch.set_attr("L_arm_blendColors.color1", [0, 0, 0])
+    batch.apply()
+Or in one call:
+    wiring.wire(connections=[(source, destination)], values=[(plug, value)])
+'''
+
+import system.build_plan as build_plan
+import system.build_session as build_session
+
+
+class WiringError(RuntimeError):
+    pass
+
+
+class Wiring(object):
+    '''
+    A batch of connections and attribute values applied together
+    Args:
+        force(Bool): Replace existing connections into destinations instead of failing
+    '''
+    def __init__(self, force=False):
+        self.force = force
+        self.connections = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.connections) + len(self.values)
+
+    def connect(self, source, destination):
+        self.connections.append((str(source), str(destination)))
+
+    def set_attr(self, plug, value):
+        self.values.append((str(plug), value))
+
+    def extend(self, connections=(), values=()):
+        for source, destination in connections:
+            self.connect(source, destination)
+        for plug, value in values:
+            self.set_attr(plug, value)
+
+    def validate(self):
+        '''
+        Resolve and check every plug of the batch
+        Returns:
+            plugs(Dict): The MPlug of each plug name
+
+        Raises:
+            WiringError: With every problem found
+        '''
+        import maya.api.OpenMaya as om2
+
+        names = set(i for pair in self.connections for i in pair) | set(plug for plug, _ in self.values)
+        plugs = {}
+        errors = []
+        for name in sorted(names):
+            plug = _get_plug(om2, name)
+            if plug is None:
+                errors.append("{} doesn't exist".format(name))
+            else:
+                plugs[name] = plug
+        if errors:
+            raise WiringError("Wiring failed:\n  " + "\n  ".join(errors))
+
+        destinations = set()
+        for source, destination in self.connections:
+            plug = plugs[destination]
+            if destination in destinations:
+                errors.append("{} is connected more than once".format(destination))
+            destinations.add(destination)
+            if plug.isLocked:
+                errors.append("{} is locked".format(destination))
+            elif plug.isDestination and not self.force and plug.source() != plugs[source]:
+                errors.append("{} is already connected from {}".format(destination, plug.source().name()))
+        for name, _ in self.values:
+            plug = plugs[name]
+            if plug.isLocked:
+                errors.append("{} is locked".format(name))
+            elif plug.isDestination or name in destinations:
+                errors.append("{} is connected, it can't be set".format(name))
+        if errors:
+            raise WiringError("Wiring failed:\n  " + "\n  ".join(errors))
+        return plugs
+
+    def apply(self):
+        '''
+        Validate the batch and apply it with a single doIt
+        Returns:
+            modifier(MDGModifier): The modifier that ran, undoIt reverts the whole batch
+        '''
+        import maya.api.OpenMaya as om2
+
+        plugs = self.validate()
+        modifier = build_session.record_modifier(om2.MDGModifier())
+        for name, value in self.values:
+            build_plan._set_plug(om2, modifier, plugs[name], value)
+        for source, destination in self.connections:
+            source, destination = plugs[source], plugs[destination]
+            if destination.isDestination:
+                if destination.source() == source:
+                    continue
+                modifier.disconnect(destination.source(), destination)
+            modifier.connect(source, destination)
+        modifier.doIt()
+        return modifier
+
+
+def _get_plug(om2, name):
+    selection = om2.MSelectionList()
+    try:
+        selection.add(name)
+        return selection.getPlug(0)
+    except (RuntimeError, TypeError):
+        return None
+
+
+def wire(connections=(), values=(), force=False):
+    '''
+    Apply connections and attribute values in one validated batch
+    Args:
+        connections(List): (source, destination) plug pairs
+        values(List): (plug, value) pairs, compound plugs take a list of values
+        force(Bool): Replace existing connections into destinations instead of failing
+
+    Returns:
+        modifier(MDGModifier): The modifier that ran
+    '''
+    batch = Wiring(force=force)
+    batch.extend(connections, values)
+    return batch.apply()